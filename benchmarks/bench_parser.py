@@ -0,0 +1,40 @@
+"""
+Compares chem3.parser.read_data and chem3.parser.read_data_stream on
+synthetic mechanisms: wall time and peak traced memory.
+
+Usage: python benchmarks/bench_parser.py [n_reactions ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import chem3.parser
+from synthetic import DB_NAME, write_mechanism
+
+
+def measure(reader, filename, db_name=DB_NAME):
+    """returns (seconds, peak traced bytes) of one reader call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    reader(filename, db_name)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(sizes):
+    print('{0:>10} {1:>18} {2:>12} {3:>12}'.format('reactions', 'reader', 'time [s]', 'peak [MB]'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            filename = write_mechanism(os.path.join(tmp, 'mech_{0}.xml'.format(n)), n)
+            for reader in (chem3.parser.read_data, chem3.parser.read_data_stream):
+                elapsed, peak = measure(reader, filename)
+                print('{0:>10} {1:>18} {2:>12.4f} {3:>12.2f}'.format(n, reader.__name__, elapsed, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,158 @@
+"""
+Times the hot paths of chem3 on synthetic mechanisms of increasing size
+and on batches of increasing size, and optionally compares the timings
+with a baseline saved by an earlier run.
+
+Benchmarks (per mechanism size):
+    read_data, get_coeffs:          parsing and database queries
+    ReactionSystem.__init__, init_matrices
+    progress_rate, reaction_rate, backward_coeffs, equilibrium_coeffs:
+                                    one state at a time
+    reaction_rate_batch:            one call per batch size
+
+Rate evaluations are timed with the temperature cache disabled, so they
+measure the computation rather than cache lookups.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --threshold 1.25
+
+With --baseline, the exit status is 1 if any benchmark is slower than
+threshold times its baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+
+import chem3.parser
+from chem3.chemkin import ReactionSystem
+from synthetic import DB_NAME, database_species, write_mechanism
+
+SIZES = [5, 50, 500, 5000, 10000]
+BATCH_SIZES = [1, 100, 10000]
+T = 1500.0
+
+
+def best_time(func, repeat=5, budget=0.2):
+    """returns the best time per call of func in seconds
+
+    Each of the repeat measurements runs func as many times as needed to
+    last about budget seconds.
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * budget / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def bench_mechanism(filename, n_reactions, batch_sizes, repeat):
+    """returns the results of all benchmarks on one mechanism file"""
+    results = []
+
+    def record(name, seconds, batch=None):
+        results.append({'name': name, 'n_reactions': n_reactions, 'batch': batch, 'seconds': seconds})
+        print('{0:>24} {1:>8} {2:>8} {3:>14.6e}'.format(name, n_reactions, batch or '', seconds))
+
+    data = chem3.parser.read_data(filename, DB_NAME)
+    reactions = data['reactions']['synthetic_mechanism']
+    species = data['species']
+    args = (reactions, species, data['low'], data['high'], data['T_cutoff'], data['T_range'])
+
+    record('read_data', best_time(lambda: chem3.parser.read_data(filename, DB_NAME), repeat))
+    record('get_coeffs', best_time(lambda: chem3.parser.get_coeffs(DB_NAME, species), repeat))
+    record('ReactionSystem.__init__', best_time(lambda: ReactionSystem(*args, cache_size=0), repeat))
+
+    system = ReactionSystem(*args, cache_size=0)
+    record('init_matrices', best_time(lambda: system.init_matrices(reactions), repeat))
+
+    concs = np.ones(len(species))
+    kf = system._forward_coeffs(T)
+    nuij = system.nu_prod - system.nu_react
+    system.concs = concs
+    record('progress_rate', best_time(lambda: system.progress_rate(T), repeat))
+    record('reaction_rate', best_time(lambda: system.reaction_rate(concs, T), repeat))
+    record('backward_coeffs', best_time(lambda: system.backward_coeffs(nuij, kf, T), repeat))
+    record('equilibrium_coeffs', best_time(lambda: system.equilibrium_coeffs(T), repeat))
+
+    rng = np.random.RandomState(0)
+    for batch in batch_sizes:
+        batch_concs = rng.rand(batch, len(species))
+        batch_T = rng.uniform(500., 2500., batch)
+        record('reaction_rate_batch', best_time(lambda: system.reaction_rate_batch(batch_concs, batch_T), repeat),
+               batch)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """prints the ratio of each result to its baseline and returns the
+    regressions, the results slower than threshold times their baseline
+    """
+    reference = {(r['name'], r['n_reactions'], r['batch']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print('\n{0:>24} {1:>8} {2:>8} {3:>10}'.format('benchmark', 'size', 'batch', 'ratio'))
+    for r in results:
+        key = (r['name'], r['n_reactions'], r['batch'])
+        if key not in reference:
+            continue
+        ratio = r['seconds'] / reference[key]
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print('{0:>24} {1:>8} {2:>8} {3:>10.3f}{4}'.format(r['name'], r['n_reactions'], r['batch'] or '', ratio, flag))
+        if ratio > threshold:
+            regressions.append(dict(r, baseline=reference[key], ratio=ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='numbers of reactions')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES, help='numbers of states')
+    parser.add_argument('--repeat', type=int, default=5, help='measurements per benchmark, the best is kept')
+    parser.add_argument('--output', help='JSON file the results are written to')
+    parser.add_argument('--baseline', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    n_species = len(database_species())
+    print('{0:>24} {1:>8} {2:>8} {3:>14}'.format('benchmark', 'size', 'batch', 'seconds'))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            filename = write_mechanism(os.path.join(tmp, 'mech_{0}.xml'.format(n)), n, n_species)
+            results += bench_mechanism(filename, n, args.batch_sizes, args.repeat)
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'n_species': n_species,
+            'T': T,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('\n{0} benchmark(s) slower than {1}x the baseline'.format(len(regressions), args.threshold))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Synthetic reaction mechanisms for the benchmarks in this directory.
+
+Mechanisms are drawn at random from the species of the NASA coefficient
+database shipped with chem3, so they can be read with chem3.parser and
+evaluated with chem3.chemkin.ReactionSystem.
+"""
+
+import os
+import sqlite3
+
+import numpy as np
+
+import chem3
+
+DB_NAME = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+RATE_COEFFS = [
+    ('modifiedArrhenius', '<A>{A:.6e}</A><b>{b:.3f}</b><E>{E:.6e}</E>'),
+    ('Arrhenius', '<A>{A:.6e}</A><E>{E:.6e}</E>'),
+    ('Constant', '<k>{A:.6e}</k>'),
+]
+
+
+def database_species(db_name=DB_NAME):
+    """returns the names of all species of the NASA coefficient database"""
+    db = sqlite3.connect(db_name)
+    try:
+        return [row[0] for row in db.execute('SELECT SPECIES_NAME FROM LOW')]
+    finally:
+        db.close()
+
+
+def mechanism_xml(n_reactions, n_species=None, seed=0, db_name=DB_NAME):
+    """returns the .xml text of a random mechanism
+
+    INPUTS:
+    =======
+    n_reactions:    int
+                    Number of reactions
+    n_species:      int, optional
+                    Number of species, by default all database species
+    seed:           int
+                    Seed of the random number generator
+
+    RETURNS:
+    =======
+    xml:            str
+    """
+    rng = np.random.RandomState(seed)
+    species = database_species(db_name)[:n_species]
+    lines = ['<?xml version="1.0"?>', '<ctml>', '  <phase>',
+             '    <speciesArray> {0} </speciesArray>'.format(' '.join(species)),
+             '  </phase>', '  <reactionData id="synthetic_mechanism">']
+    for j in range(n_reactions):
+        picked = rng.choice(len(species), 4, replace=False)
+        reactants = [species[i] for i in picked[:rng.randint(1, 3)]]
+        products = [species[i] for i in picked[2:2 + rng.randint(1, 3)]]
+        coef_type, params = RATE_COEFFS[j % len(RATE_COEFFS)]
+        params = params.format(A=10**rng.uniform(3, 13), b=rng.uniform(-1, 2), E=rng.uniform(0, 5e4))
+        reversible = 'yes' if coef_type != 'Constant' else 'no'
+        lines += ['    <reaction reversible="{0}" type="Elementary" id="reaction{1:05d}">'.format(reversible, j),
+                  '      <equation>{0} [=] {1}</equation>'.format(' + '.join(reactants), ' + '.join(products)),
+                  '      <rateCoeff><{0}>{1}</{0}></rateCoeff>'.format(coef_type, params),
+                  '      <reactants>{0}</reactants>'.format(' '.join(s + ':1' for s in reactants)),
+                  '      <products>{0}</products>'.format(' '.join(s + ':1' for s in products)),
+                  '    </reaction>']
+    lines += ['  </reactionData>', '</ctml>', '']
+    return '\n'.join(lines)
+
+
+def write_mechanism(filename, n_reactions, n_species=None, seed=0, db_name=DB_NAME):
+    """writes a random mechanism to filename, see mechanism_xml"""
+    with open(filename, 'w') as f:
+        f.write(mechanism_xml(n_reactions, n_species, seed, db_name))
+    return filename
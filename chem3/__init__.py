@@ -1,7 +1,32 @@
 # -*- coding: utf-8 -*-
-import pkg_resources
+"""
+chem3, a chemical kinetics library.
 
-try:
-    __version__ = pkg_resources.get_distribution(__name__).version
-except:
-    __version__ = 'unknown'
+Submodules are imported on first attribute access (PEP 562), e.g.
+chem3.parser only imports the parser, ElementTree and sqlite3 when it is
+used, and __version__ is read with importlib.metadata on first access, so
+that importing chem3 stays cheap for short-lived worker processes.
+"""
+import importlib
+
+_SUBMODULES = ('chemkin', 'compiled', 'ensemble', 'incremental', 'integrate', 'parallel', 'parser',
+               'profiling', 'reduction', 'registry', 'service', 'stoich', 'tables')
+
+
+def __getattr__(name):
+    """imports submodules and reads __version__ on first access"""
+    global __version__
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    if name == '__version__':
+        try:
+            from importlib.metadata import version
+            __version__ = version(__name__)
+        except Exception:
+            __version__ = 'unknown'
+        return __version__
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES) | {'__version__'})
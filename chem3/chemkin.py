@@ -2,36 +2,141 @@
 This is a chemical kinetics module which can be used to calculate the reaction
 rate of a system of elementary, reversible and irreversible reactions.
 
-Future updates are intended to address more reaciton types (duplicate,
-three-body).
+Duplicate reactions, three-body reactions with species efficiencies and
+Lindemann or Troe falloff reactions are also supported. The third-body
+concentrations of all reactions are one sparse efficiency product per
+evaluation, and the falloff blending is vectorized across reactions.
 
 For more infomation regarding chemical kinetics, please visit:
 https://en.wikipedia.org/wiki/Chemical_kinetics
 """
+import sys
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from itertools import chain
+
 import numpy as np
 
+class SpeciesTable():
+	"""Interned species names, shared by Reaction objects which store their
+	species as integer indices into the table
+
+	Names are added on first use and never removed, so indices stay valid.
+	chem3.parser builds one table per file, starting with the species of
+	the phase, so the indices of its reactions are the species indices of
+	the system.
+
+	ATRIBUTES:
+	=========
+	names:	list of str
+			Interned species names, in order of addition
+	index:	dict
+			Index of each name
+
+	METHODS:
+	=======
+	.intern: returns the index of a name, adding it if needed
+
+	EXAMPLES:
+	========
+	>>> table = SpeciesTable(['H2', 'O2'])
+	>>> table.intern('OH'), table.intern('H2')
+	(2, 0)
+	>>> table.names
+	['H2', 'O2', 'OH']
+	"""
+	def __init__(self, names=()):
+		"""Sets class attributes and returns reference of the class object
+
+		INPUTS
+		======
+		names:	list of str, optional
+				Initial species names
+		"""
+		self.names = []
+		self.index = {}
+		self._lock = threading.Lock()
+		for name in names:
+			self.intern(name)
+
+	def __len__(self):
+		"""Returns the number of species names"""
+		return len(self.names)
+
+	def __contains__(self, name):
+		return name in self.index
+
+	def __getstate__(self):
+		"""Pickles the names only"""
+		return {'names': self.names}
+
+	def __setstate__(self, state):
+		self.__init__(state['names'])
+
+	def intern(self, name):
+		"""Returns the index of species name, adding it to the table if needed"""
+		i = self.index.get(name)
+		if i is None:
+			with self._lock:
+				i = self.index.get(name)
+				if i is None:
+					i = len(self.names)
+					self.names.append(sys.intern(name))
+					self.index[self.names[i]] = i
+		return i
+
+# Default table of the reactions built without one
+SPECIES_TABLE = SpeciesTable()
+
+# Shared tuples of coefficient names, e.g. ('A', 'b', 'E')
+_COEF_NAMES = {}
+
 class Reaction():
 	"""Reaction Class for chemical kinetics calculations
 
+	Reactions are compact: attributes are stored in __slots__, species as
+	integer indices into a shared SpeciesTable and coefficients as packed
+	arrays. The reactants, products, coef, efficiencies and low_coef dicts
+	are built on access. Equality ignores the ids, equations and duplicate
+	flags, and reactions are hashable, e.g. list(dict.fromkeys(reactions))
+	drops repeated reactions. The hash follows the species, coefficients
+	and third-body parameters: do not set reactants, products or coef of a
+	reaction held in a set or as a dict key.
+
 	ATRIBUTES:
 	=========
 	reactants: dict of reaction reactant species
 	products: dict of reaction product species
 	reversible: boolean
-	reac_type: reaction type (elementary, duplicate(not yet supported),
-				three-body(not yet supported)
+	reac_type: reaction type (Elementary, threeBody or falloff)
 	reac_id: ID of reaction
 	coef_type: Reaction rate coefficient (constant, Arrhenius, Modified Arrhenius)
-	coef: dict of reaction rate variables {A, E, b, T}
+	coef: dict of reaction rate variables {A, E, b, T}, the high-pressure
+		limit of falloff reactions
+	efficiencies: dict of third-body efficiencies of species, others have
+		default_efficiency
+	default_efficiency: third-body efficiency of species not in efficiencies
+	low_coef: dict of low-pressure limit variables {A, E, b} of falloff
+		reactions
+	falloff: ('Lindemann', ()) or ('Troe', (alpha, T3, T1[, T2])) for falloff
+		reactions, None otherwise
+	duplicate: boolean, whether the reaction is declared as a duplicate
+	species_table: SpeciesTable holding the species names
+	k: rate coefficient stored by set_reac_coefs, kept for backward
+		compatibility only
 
 	METHODS:
 	=======
 	.__init__: init attributes
 	.__eq__: Two reactions are same if the only different
 	attributes are their Ids
+	.__hash__: hash consistent with __eq__
 	.__ste__: Returns string representation of Reaction class
 	.set_reac_coefs: sets reaction coefficients as Contant, Arrhenius or
-	Modified Arrhenius
+	Modified Arrhenius, kept for backward compatibility, see rate_coef
+	.rate_coef: returns the reaction rate coefficient without storing it
 	.init_const_coef: returns k for constant reaction rate
 	.init_arr_coef: returns Arrhenius reaction rate
 	.init_marr_coef: returns Modified Arrhenius reaction rate
@@ -53,8 +158,17 @@ class Reaction():
 	1.9927962618542914
 
 	"""
+	COEF_TYPES = ('Constant', 'Arrhenius', 'modifiedArrhenius')
+	THIRD_BODY_TYPES = ('threeBody', 'falloff')
+	FALLOFF_TYPES = ('Lindemann', 'Troe')
+
+	__slots__ = ('species_table', '_species', '_nu', '_n_reactants', 'reversible', 'reac_type', 'reac_id',
+				 'coef_type', '_coef_names', '_coef', 'equation', '_pressure', 'duplicate', 'k', '_hash')
+
 	def __init__(self, reactants, products, reversible, 
-		         reac_type, reac_id, coef_type, coef, equation=''):
+		         reac_type, reac_id, coef_type, coef, equation='',
+		         efficiencies=None, default_efficiency=1.0, low_coef=None,
+		         falloff=None, duplicate=False, species_table=None):
 		"""Sets class attributes and returns reference of the class object
 
 		INPUTS
@@ -77,27 +191,177 @@ class Reaction():
 		equation:	str 
 					Equation of the reation
 					Optional
+		efficiencies:	dict, optional
+					Third-body efficiency (float) of species (str) of
+					threeBody and falloff reactions
+		default_efficiency:	float, default 1.0
+					Third-body efficiency of the other species
+		low_coef:	dict, optional
+					Low-pressure limit A, b, E of falloff reactions, coef
+					is then the high-pressure limit
+		falloff:	tuple, optional
+					(falloff type, parameters) of falloff reactions, see
+					FALLOFF_TYPES, by default Lindemann
+		duplicate:	boolean, default False
+					Whether the reaction is declared as a duplicate
+		species_table:	SpeciesTable, optional
+					Table the species are interned in, by default the
+					module-wide SPECIES_TABLE
 		"""
-		self.reactants = reactants
-		self.products = products
+		self.species_table = SPECIES_TABLE if species_table is None else species_table
+		self._hash = None
+		self._set_species(reactants, products)
 		self.reversible = reversible
-		self.reac_type = reac_type
+		self.reac_type = reac_type if reac_type is None else sys.intern(reac_type)
 		self.reac_id = reac_id
-		self.coef_type = coef_type
+		self.coef_type = coef_type if coef_type is None else sys.intern(coef_type)
 		self.coef = coef
 		self.equation = equation
+		if falloff is None and reac_type == 'falloff':
+			falloff = ('Lindemann', ())
+		self._set_pressure(efficiencies, default_efficiency, low_coef, falloff)
+		self.duplicate = duplicate
+
+	def _species_dict(self, start, stop):
+		names = self.species_table.names
+		return {names[i]: nu for i, nu in zip(self._species[start:stop], self._nu[start:stop])}
+
+	def _set_species(self, reactants, products):
+		"""Packs the reactant and then product species indices and coefficients"""
+		index, intern = self.species_table.index, self.species_table.intern
+		self._species = array('i', [index[name] if name in index else intern(name)
+									for species in (reactants, products) for name in species])
+		self._nu = array('d', list(reactants.values()) + list(products.values()))
+		self._n_reactants = len(reactants)
+		self._hash = None
+
+	@property
+	def reactants(self):
+		"""dict of reactant species and their coefficients"""
+		return self._species_dict(0, self._n_reactants)
+
+	@reactants.setter
+	def reactants(self, reactants):
+		self._set_species(reactants, self.products)
+
+	@property
+	def products(self):
+		"""dict of product species and their coefficients"""
+		return self._species_dict(self._n_reactants, len(self._species))
+
+	@products.setter
+	def products(self, products):
+		self._set_species(self.reactants, products)
+
+	@property
+	def coef(self):
+		"""dict of reaction rate variables"""
+		return dict(zip(self._coef_names, self._coef))
+
+	@coef.setter
+	def coef(self, coef):
+		names = tuple(coef)
+		self._coef_names = _COEF_NAMES.setdefault(names, names)
+		self._coef = array('d', coef.values())
+		self._hash = None
+
+	def _set_pressure(self, efficiencies, default_efficiency, low_coef, falloff):
+		"""Packs the third-body and falloff parameters, None for reactions
+		without any
+		"""
+		if not efficiencies and default_efficiency == 1.0 and low_coef is None and falloff is None:
+			self._pressure = None
+		else:
+			efficiencies = efficiencies or {}
+			self._pressure = (array('i', [self.species_table.intern(name) for name in efficiencies]),
+							  array('d', efficiencies.values()), default_efficiency,
+							  None if low_coef is None else dict(low_coef), falloff)
+		self._hash = None
+
+	@property
+	def efficiencies(self):
+		"""dict of third-body efficiencies of species"""
+		if self._pressure is None:
+			return {}
+		names = self.species_table.names
+		return {names[i]: eff for i, eff in zip(self._pressure[0], self._pressure[1])}
+
+	@property
+	def default_efficiency(self):
+		return 1.0 if self._pressure is None else self._pressure[2]
+
+	@property
+	def low_coef(self):
+		return None if self._pressure is None or self._pressure[3] is None else dict(self._pressure[3])
+
+	@property
+	def falloff(self):
+		return None if self._pressure is None else self._pressure[4]
+
+	@property
+	def third_body(self):
+		"""Whether the rate depends on the third-body concentration"""
+		return self.reac_type in self.THIRD_BODY_TYPES
+
+	def _eq_key(self, names=None):
+		"""Returns the species, coefficients and third-body parameters
+		compared by __eq__, built on each call so that reactions only keep
+		their packed arrays
+
+		Species are identified by their index in the species table, or by
+		name when names, the names of the table, is given.
+		"""
+		species = self._species if names is None else [names[i] for i in self._species]
+		n = self._n_reactants
+		pressure = self._pressure
+		if pressure is not None:
+			eff_species = pressure[0] if names is None else [names[i] for i in pressure[0]]
+			pressure = (tuple(sorted(zip(eff_species, pressure[1]))), pressure[2],
+						None if pressure[3] is None else tuple(sorted(pressure[3].items())), pressure[4])
+		return (tuple(sorted(zip(species[:n], self._nu[:n]))),
+				tuple(sorted(zip(species[n:], self._nu[n:]))),
+				tuple(sorted(zip(self._coef_names, self._coef))), pressure)
+
+	def _content_hash(self):
+		"""Returns the hash of the species, coefficients and third-body
+		parameters, an int cached until the setters change them
+		"""
+		if self._hash is None:
+			self._hash = hash(self._eq_key(self.species_table.names))
+		return self._hash
 
 	def __eq__(self, other):
 		"""Overrides equality operator:
 		Two reactions are same if the only different
 		attributes are their Ids
 		"""
-		return self.reactants == other.reactants \
-			and self.products == other.products \
-			and self.reversible == other.reversible \
-			and self.reac_type == other.reac_type \
-			and self.coef_type  == other.coef_type \
-			and self.coef == other.coef \
+		if not isinstance(other, Reaction):
+			return NotImplemented
+		if self is other:
+			return True
+		if not (self.reversible == other.reversible and self.reac_type == other.reac_type
+				and self.coef_type == other.coef_type):
+			return False
+		if self._hash is not None and other._hash is not None and self._hash != other._hash:
+			return False
+		if self.species_table is other.species_table:
+			return self._eq_key() == other._eq_key()
+		return self._eq_key(self.species_table.names) == other._eq_key(other.species_table.names)
+
+	def __hash__(self):
+		"""Returns a hash consistent with __eq__"""
+		return hash((self.reac_type, self.coef_type, self._content_hash()))
+
+	def __getstate__(self):
+		"""Pickles the slots but the cached hash, string hashes differ
+		between processes
+		"""
+		return {name: getattr(self, name) for name in self.__slots__ if name != '_hash' and hasattr(self, name)}
+
+	def __setstate__(self, state):
+		for name, value in state.items():
+			setattr(self, name, value)
+		self._hash = None
 
 	def __str__(self):
 		"""Returns string representation of Reaction class"""
@@ -115,18 +379,47 @@ class Reaction():
 		"""Sets reaction coefficients as:
 		Constant, Arrhenius, or Modified Arrhenius
 
+		Kept for backward compatibility only: the coefficient is stored in
+		the k slot, the one piece of per-call state of a Reaction, which
+		ReactionSystem never reads. Use rate_coef instead.
+
 		INPUTS:
 		======
 		T: 	float
 			Temperature
 			Must be positive
 		"""
+		if self.coef_type in self.COEF_TYPES:
+			self.k = self.rate_coef(T)
+
+	def rate_coef(self, T):
+		"""Returns the reaction rate coefficient at temperature T
+
+		Unlike set_reac_coefs, the coefficient is not stored on the
+		reaction, so a Reaction can be shared between threads. For
+		threeBody reactions the coefficient excludes the third-body
+		concentration, and for falloff reactions it is the high-pressure
+		limit, see ReactionSystem for the pressure-dependent rates.
+
+		INPUTS:
+		======
+		T: 	float
+			Temperature
+			Must be positive
+
+		RETURNS:
+		========
+		k: float
+		   Reaction rate coefficient
+		"""
+		coef = self.coef
 		if self.coef_type == 'Constant':
-			self.k = self.init_const_coef(self.coef['k'])
+			return self.init_const_coef(coef['k'])
 		elif self.coef_type == 'Arrhenius':
-			self.k = self.init_arr_coef(self.coef['A'], self.coef['E'], T)
+			return self.init_arr_coef(coef['A'], coef['E'], T)
 		elif self.coef_type == 'modifiedArrhenius':
-			self.k = self.init_marr_coef(self.coef['A'], self.coef['b'], self.coef['E'], T)
+			return self.init_marr_coef(coef['A'], coef['b'], coef['E'], T)
+		raise ValueError("Unknown coefficient type {0!r}".format(self.coef_type))
 
 	def init_const_coef(self, k):
 		"""Returns a constant reaction rate coefficient
@@ -156,7 +449,7 @@ class Reaction():
 		   Must be positive
 		E: float
 		   Activation energy
-		T: float
+		T: float or numpy array of floats
 		   Temperature
 		   Must be positive
 		R: float, default value = 8.314
@@ -172,8 +465,8 @@ class Reaction():
 		if A < 0.0:
 			raise ValueError("A = {0:18.16e}:  Negative Arrhenius prefactor is prohibited!".format(A))
 
-		if T < 0.0:
-			raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(T))
+		if np.any(np.less(T, 0.0)):
+			raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(np.min(T)))
 
 		if R < 0.0:
 			raise ValueError("R = {0:18.16e}:  Negative ideal gas constant is prohibited!".format(R))
@@ -192,7 +485,7 @@ class Reaction():
 		   Modified Arrhenius parameter
 		E: float
 		   Activation energy
-		T: float
+		T: float or numpy array of floats
 		   Temperature
 		   Must be positive
 		R: float, default value = 8.314
@@ -207,8 +500,8 @@ class Reaction():
 		if A < 0.0:
 			raise ValueError("A = {0:18.16e}:  Negative Arrhenius prefactor is prohibited!".format(A))
 
-		if T < 0.0:
-			raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(T))
+		if np.any(np.less(T, 0.0)):
+			raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(np.min(T)))
 
 		if R < 0.0:
 			raise ValueError("R = {0:18.16e}:  Negative ideal gas constant is prohibited!".format(R))
@@ -217,7 +510,199 @@ class Reaction():
 
 import chem3
 import os
-import chem3.parser
+from chem3.stoich import SparseStoichiometry
+from chem3.profiling import Profiler
+from chem3.tables import RateTable
+
+class _NullStage():
+	"""No-op context manager, the stage of systems without a profiler"""
+	__slots__ = ()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		return False
+
+# Shared no-op stage of systems without a profiler
+_NO_PROFILING = _NullStage()
+
+def _writable(arr):
+	"""Returns arr, or a copy of it if it is a read-only cached array"""
+	return arr if arr.flags.writeable else arr.copy()
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# Packed third-body and falloff parameters, see ReactionSystem.pack_pressure_coefs
+PressureCoefs = namedtuple('PressureCoefs', ['third_body', 'efficiency_default', 'efficiencies',
+											 'falloff', 'A0', 'b0', 'E0', 'troe', 'troe_params'])
+
+class TemperatureCache():
+	"""Bounded LRU cache of temperature dependent quantities
+
+	Entries are keyed by temperature, and each entry holds the named
+	quantities (e.g. 'H_RT', 'ke') computed at that temperature. When more
+	than maxsize temperatures are stored, the least recently used one is
+	evicted. Cached arrays are made read-only since they are shared
+	between callers; the public ReactionSystem methods return writable
+	copies of them.
+
+	METHODS:
+	=======
+	.get: returns a cached quantity, computing it on a miss
+	.info: returns hit/miss statistics
+	.clear: empties the cache and resets the statistics
+
+	EXAMPLES:
+	========
+	>>> cache = TemperatureCache(maxsize=2)
+	>>> cache.get(300.0, 'x', lambda: 1.0)
+	1.0
+	>>> cache.get(300.0, 'x', lambda: 2.0)
+	1.0
+	>>> cache.info()
+	CacheInfo(hits=1, misses=1, maxsize=2, currsize=1)
+	"""
+	def __init__(self, maxsize=128):
+		"""Sets class attributes and returns reference of the class object
+
+		INPUTS
+		======
+		maxsize:	int
+					Maximum number of temperatures kept in the cache
+					Must be positive
+		"""
+		if maxsize <= 0:
+			raise ValueError("Cache size must be positive!")
+
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		"""Returns the number of temperatures in the cache"""
+		return len(self._entries)
+
+	def __getstate__(self):
+		"""Pickles the cache size only, e.g. when a ReactionSystem is sent
+		to worker processes
+		"""
+		return {'maxsize': self.maxsize}
+
+	def __setstate__(self, state):
+		self.__init__(state['maxsize'])
+
+	def get(self, T, name, compute):
+		"""Returns quantity name at temperature T, calling compute() on a miss
+
+		INPUTS
+		======
+		T:			float
+					Temperature
+		name:		str
+					Name of the quantity
+		compute:	callable without arguments
+					Computes the quantity at temperature T
+		"""
+		with self._lock:
+			entry = self._entries.get(T)
+			if entry is not None and name in entry:
+				self._entries.move_to_end(T)
+				self.hits += 1
+				return entry[name]
+			self.misses += 1
+
+		value = compute()
+		for arr in (value if isinstance(value, tuple) else (value,)):
+			if isinstance(arr, np.ndarray):
+				arr.setflags(write=False)
+
+		with self._lock:
+			self._entries.setdefault(T, {})[name] = value
+			self._entries.move_to_end(T)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+		return value
+
+	def info(self):
+		"""Returns the hit/miss statistics of the cache"""
+		with self._lock:
+			return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+	def clear(self):
+		"""Empties the cache and resets the statistics"""
+		with self._lock:
+			self._entries.clear()
+			self.hits = 0
+			self.misses = 0
+
+class SpeciesThermo():
+	"""Species list and NASA coefficients shared by the reaction systems of
+	several mechanisms over the same species
+
+	ATRIBUTES:
+	=========
+	order:			list of str
+					Species names
+	index:			dict
+					Index of each species
+	nasa7_coeffs:	numpy array of floats, shape (2, number of species, 7)
+					Low and high temperature NASA coefficients
+	tmid:			numpy array of floats
+					Temperature cutoff of each species
+	trange:			numpy array of floats, shape (number of species, 2)
+					Valid temperature range of each species
+
+	METHODS:
+	=======
+	.from_data: builds the tables from the output of chem3.parser.read_data
+	.from_arrays: uses already stacked tables without copying them
+	"""
+	def __init__(self, order, nasa7_coeffs_low=[], nasa7_coeffs_high=[], tmid=[], trange=[]):
+		"""Sets class attributes and returns reference of the class object
+
+		INPUTS
+		======
+		order:		list of str
+					Species names
+		nasa7_coeffs_low, nasa7_coeffs_high: arrays of floats
+					Low and high temperature NASA coefficients of each species
+		tmid, trange: arrays of floats
+					Temperature cutoff and range of each species
+		"""
+		self.order = list(order)
+		self.index = {name: i for i, name in enumerate(self.order)}
+
+		# The low and high temperature NASA coefficients are stacked into a
+		# (2, number of species, 7) table
+		self.nasa7_coeffs = np.stack([np.asarray(nasa7_coeffs_low, dtype=float).reshape(-1, 7),
+									  np.asarray(nasa7_coeffs_high, dtype=float).reshape(-1, 7)])
+		self.tmid = np.asarray(tmid, dtype=float)
+		self.trange = np.asarray(trange, dtype=float).reshape(-1, 2)
+
+	@classmethod
+	def from_data(cls, data):
+		"""Builds the tables from the output of chem3.parser.read_data"""
+		return cls(data['species'], data['low'], data['high'], data['T_cutoff'], data['T_range'])
+
+	@classmethod
+	def from_arrays(cls, order, nasa7_coeffs, tmid, trange):
+		"""Uses already stacked (2, number of species, 7) NASA coefficients,
+		e.g. memory-mapped from a compiled mechanism file, without copying
+		"""
+		thermo = cls.__new__(cls)
+		thermo.order = list(order)
+		thermo.index = {name: i for i, name in enumerate(thermo.order)}
+		thermo.nasa7_coeffs = nasa7_coeffs
+		thermo.tmid = tmid
+		thermo.trange = np.asarray(trange).reshape(-1, 2)
+		return thermo
+
+	def __len__(self):
+		"""Returns the number of species"""
+		return len(self.order)
 
 class ReactionSystem():
 	"""ReactionSystem Class for chemical kinetics calculations
@@ -227,20 +712,57 @@ class ReactionSystem():
 	concs: 		list of floats
 				Reactant concentrations
 				Must be positive
-	nu_react: 	list of floats
+	nu_react: 	array of floats
 	 			Stoichiometric coefficients for reactants
-	nu_prod: 	list of floats
+				Dense matrix, only built when accessed
+	nu_prod: 	array of floats
 				Stoichiometric coefficients for products
+				Dense matrix, only built when accessed
+	stoich_react, stoich_prod, stoich_net: SparseStoichiometry
+				Sparse reactant, product and net (product - reactant)
+				stoichiometric coefficients used by all computations
 	ks:			list of floats
 				Reaction rate coefficients
+	A, b, E:	arrays of floats
+				Packed (modified) Arrhenius parameters of each reaction
+	k_const:	array of floats
+				Packed constant rate coefficients of each reaction
+	const_mask:	array of booleans
+				Whether each reaction has a constant rate coefficient
+	third_body:	array of booleans
+				Whether each reaction is a threeBody or falloff reaction
+	efficiency_default, efficiencies:
+				Default third-body efficiency of each reaction, and
+				SparseStoichiometry of the efficiencies differing from it
+	falloff, troe:	arrays of booleans
+				Whether each reaction is a falloff (Lindemann or Troe)
+				and a Troe falloff reaction
+	A0, b0, E0:	arrays of floats
+				Low-pressure limit parameters of falloff reactions
+	troe_params: array of floats, shape (number of reactions, 4)
+				Troe alpha, T3, T1 and T2 (inf if absent)
 
 	METHODS:
 	=======
 	.__init__: init attributes
 	.__len__: returns the number of reactions in the system
 	.init_matrices: returns reactant and product matrices
+	.init_sparse_matrices: returns sparse reactant and product matrices
+	.from_arrays: builds a system from its packed arrays
 	.progress_rate: returns progress rate of system of reactions
 	.reaction_rate: returns reaction rate of system of reactions
+	.reaction_rate_batch: returns reaction rates of many states at once
+	.jacobian: returns the analytical Jacobian of the reaction rates
+	.rate_sensitivities: returns d(rates)/d(ln A) and d(rates)/d(E)
+	.equilibrium_coeffs: returns equilibrium coefficients of all reactions
+	.thermo: returns Cp/R, H/RT and S/R of all species together
+	.cache_info: returns hit/miss statistics of the thermodynamic cache
+	.cache_clear: empties the thermodynamic cache
+	.enable_profiling: records per-stage statistics of the rate computations
+	.disable_profiling: stops recording per-stage statistics
+	.profiling: context manager enabling profiling within a block
+	.profile_stats: returns the recorded per-stage statistics
+	.build_rate_table: tabulates the coefficients for the 'table' mode
 
 	EXAMPLES:
 	========
@@ -257,8 +779,10 @@ class ReactionSystem():
 	[ -2.81117621e+08  -2.85597559e+08   5.66715180e+08   4.47993847e+06
 	  -4.47993847e+06]
 	"""
+	MODES = ('vectorized', 'loop', 'log', 'table')
+
 	def __init__(self, reactions=[], order=[], nasa7_coeffs_low=[], nasa7_coeffs_high=[], tmid=[], trange=[],\
-							 filename=''):
+							 filename='', mode='vectorized', cache_size=128, species_thermo=None, mechanism=None):
 		"""Sets class attributes and returns reference of the class object
 
 		INPUTS
@@ -275,41 +799,261 @@ class ReactionSystem():
 					Optional field
 					If filename is specified, we will use the data
 					read from the given file instead of reactions and order
-
-		Assumption
-		======
-		Current version assumes only one reaction system is read from the
-		.xml file, but we might extend this feature to multiple reaction
-		systems in the future based on our clients' requirements
+		mode:		str
+					Evaluation mode of progress_rate, default 'vectorized'
+					'vectorized' evaluates all reactions with array operations
+					'loop' is the reference per-reaction, per-species loop
+					'log' evaluates the rate coefficients, equilibrium
+					coefficients and concentration products as logarithms,
+					so that intermediate products neither overflow nor
+					underflow
+					'table' interpolates log kf and log ke in a RateTable
+					built on first use, see build_rate_table
+		cache_size:	int
+					Number of temperatures for which Cp/R, H/RT, S/R and
+					equilibrium coefficients are cached, default 128
+					0 or None disables the cache
+		species_thermo:	SpeciesThermo, optional
+					Species and NASA coefficients shared with other
+					systems, replaces order, nasa7_coeffs_low,
+					nasa7_coeffs_high, tmid and trange
+		mechanism:	str, optional
+					id of the reactionData block read from filename, by
+					default the first one. See chem3.registry to load
+					all mechanisms of a file
 
 		"""
 		db_name = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
 
 		if filename:
-			data = chem3.parser.read_data(filename, db_name)
-			reactions = next(iter(data['reactions'].values()))
-			order = data['species']
-			nasa7_coeffs_low = data['low']
-			nasa7_coeffs_high = data['high']
-			tmid = data['T_cutoff']
-			trange = data['T_range']
-
-		self.order = order
-		self.reactions = reactions
-		self.nu_react, self.nu_prod = self.init_matrices(reactions)
+			# Imported here, so that systems built in memory do not load the
+			# parser, ElementTree and sqlite3
+			from chem3 import parser
+			data = parser.read_data(filename, db_name)
+			if mechanism is None:
+				reactions = next(iter(data['reactions'].values()))
+			elif mechanism in data['reactions']:
+				reactions = data['reactions'][mechanism]
+			else:
+				raise ValueError("Mechanism {0!r} not found in {1}".format(mechanism, filename))
+			species_thermo = SpeciesThermo.from_data(data)
+
+		if species_thermo is None:
+			species_thermo = SpeciesThermo(order, nasa7_coeffs_low, nasa7_coeffs_high, tmid, trange)
+
+		self.order = species_thermo.order
+		self._reactions = reactions
+		self._reaction_info = None
+		stoich_react, stoich_prod = self.init_sparse_matrices(reactions, species_thermo.index)
+		reversible = np.array([reac.reversible for reac in reactions], dtype=bool)
+		self._compile(stoich_react, stoich_prod, reversible, self.pack_rate_coefs(reactions),
+					  species_thermo, mode, cache_size,
+					  self.pack_pressure_coefs(reactions, species_thermo.index))
+
+	def _compile(self, stoich_react, stoich_prod, reversible, rate_coefs, species_thermo, mode, cache_size,
+				 pressure_coefs=None):
+		"""Sets the packed arrays used by all computations"""
+		if mode not in self.MODES:
+			raise ValueError("Unknown evaluation mode {0!r}, must be one of {1}".format(mode, self.MODES))
+
+		self.order = species_thermo.order
+		self.species_thermo = species_thermo
+		self.stoich_react, self.stoich_prod = stoich_react, stoich_prod
+		self.stoich_net = self.stoich_prod - self.stoich_react
+		self._gamma = self.stoich_net.reduce(np.ones(len(self.order)))
+		self._nu_dense = None
+		self.reversible = np.asarray(reversible, dtype=bool)
+		self.A, self.b, self.E, self.k_const, self.const_mask = rate_coefs
+		if pressure_coefs is None:
+			pressure_coefs = self.pack_pressure_coefs([None] * len(self.reversible), species_thermo.index)
+		(self.third_body, self.efficiency_default, self.efficiencies, self.falloff,
+		 self.A0, self.b0, self.E0, self.troe, self.troe_params) = pressure_coefs
+		self._pressure_dependent = bool(np.any(self.third_body))
+		self.mode = mode
 		self.ks = []
 
-		# Coefficients for reversible reaction
-		self.trange = trange
-		self.tmid = tmid
+		# Coefficients for reversible reaction, shared with the other
+		# systems of the same SpeciesThermo
+		self.trange = species_thermo.trange
+		self.tmid = species_thermo.tmid
 		self.p0 = 1.0e+05
 		self.R = 8.3144598
-		self.nasa7_coeffs_low = nasa7_coeffs_low
-		self.nasa7_coeffs_high = nasa7_coeffs_high
+		self.nasa7_coeffs = species_thermo.nasa7_coeffs
+		self.nasa7_coeffs_low, self.nasa7_coeffs_high = self.nasa7_coeffs
+		self.thermo_cache = TemperatureCache(cache_size) if cache_size else None
+		self.profiler = None
+		self.rate_table = None
+
+	@classmethod
+	def from_arrays(cls, order, stoich_react, stoich_prod, reversible, rate_coefs, nasa7_coeffs, tmid, trange,
+					reaction_info=None, mode='vectorized', cache_size=128, species_thermo=None,
+					pressure_coefs=None):
+		"""Builds a system directly from its packed arrays, without Reaction
+		objects (e.g. from a compiled mechanism file, see chem3.compiled)
+
+		INPUTS
+		======
+		order:			list of str
+						Species of reactants and products in the system
+		stoich_react, stoich_prod: SparseStoichiometry
+						Reactant and product stoichiometric coefficients
+		reversible:		array of booleans
+		rate_coefs:		tuple (A, b, E, k_const, const_mask), see pack_rate_coefs
+		nasa7_coeffs:	array of floats, shape (2, number of species, 7)
+		tmid, trange:	arrays of floats
+						NASA temperature cutoffs and ranges of each species
+		reaction_info:	dict, optional
+						Lists 'reac_id', 'reac_type', 'coef_type',
+						'low_coef_type', 'equation' and 'duplicate' used
+						to rebuild the Reaction objects on first access
+						to .reactions
+		species_thermo:	SpeciesThermo, optional
+						Shared species and NASA coefficients, replaces
+						order, nasa7_coeffs, tmid and trange
+		pressure_coefs:	PressureCoefs, optional
+						Third-body and falloff parameters, see
+						pack_pressure_coefs, by default none
+
+		RETURNS:
+		========
+		system:			ReactionSystem
+		"""
+		if species_thermo is None:
+			species_thermo = SpeciesThermo.from_arrays(order, nasa7_coeffs, tmid, trange)
+		system = cls.__new__(cls)
+		system._reactions = None
+		system._reaction_info = reaction_info
+		system._compile(stoich_react, stoich_prod, reversible, rate_coefs, species_thermo, mode, cache_size,
+						pressure_coefs)
+		return system
+
+	@property
+	def reactions(self):
+		"""List of Reaction() of the system, rebuilt from the packed arrays
+		on first access if the system was built with from_arrays
+		"""
+		if self._reactions is None:
+			self._reactions = self._build_reactions()
+		return self._reactions
+
+	def _build_reactions(self):
+		"""Rebuilds Reaction objects from the packed arrays"""
+		n = len(self)
+		info = self._reaction_info or {}
+		reac_ids = info.get('reac_id') or ['reaction{0:02d}'.format(j + 1) for j in range(n)]
+		reac_types = info.get('reac_type') or ['Elementary'] * n
+		equations = info.get('equation') or [''] * n
+		duplicates = info.get('duplicate') or [False] * n
+		low_coef_types = info.get('low_coef_type') or \
+			['modifiedArrhenius' if b else 'Arrhenius' for b in self.b0]
+		coef_types = info.get('coef_type') or \
+			['Constant' if c else 'modifiedArrhenius' for c in self.const_mask]
+
+		def species_dicts(stoich):
+			dicts = [{} for _ in range(n)]
+			for i, j, nu in zip(stoich.species, stoich.reactions, stoich.coeffs):
+				dicts[j][self.order[i]] = float(nu)
+			return dicts
+
+		efficiencies = species_dicts(self.efficiencies)
+		table = SpeciesTable(self.order)
+		reactions = []
+		for j, (reactants, products) in enumerate(zip(species_dicts(self.stoich_react),
+													  species_dicts(self.stoich_prod))):
+			if coef_types[j] == 'Constant':
+				coef = {'k': float(self.k_const[j])}
+			elif coef_types[j] == 'Arrhenius':
+				coef = {'A': float(self.A[j]), 'E': float(self.E[j])}
+			else:
+				coef = {'A': float(self.A[j]), 'b': float(self.b[j]), 'E': float(self.E[j])}
+			pressure = {}
+			if self.third_body[j]:
+				default = float(self.efficiency_default[j])
+				pressure['default_efficiency'] = default
+				pressure['efficiencies'] = {name: default + eff for name, eff in efficiencies[j].items()}
+			if self.falloff[j]:
+				if low_coef_types[j] == 'Arrhenius':
+					pressure['low_coef'] = {'A': float(self.A0[j]), 'E': float(self.E0[j])}
+				else:
+					pressure['low_coef'] = {'A': float(self.A0[j]), 'b': float(self.b0[j]), 'E': float(self.E0[j])}
+				params = self.troe_params[j]
+				pressure['falloff'] = ('Troe', tuple(float(x) for x in params[:3 + bool(np.isfinite(params[3]))])) \
+					if self.troe[j] else ('Lindemann', ())
+			reactions.append(Reaction(reactants, products, bool(self.reversible[j]), reac_types[j],
+									  reac_ids[j], coef_types[j], coef, equation=equations[j],
+									  duplicate=bool(duplicates[j]), species_table=table, **pressure))
+		return reactions
 
 	def __len__(self):
 		"""Returns the number of reactions in the system"""
-		return len(self.reactions)
+		return len(self.reversible)
+
+	@property
+	def nu_react(self):
+		"""Dense reactant stoichiometric matrix, built on first access"""
+		return self._dense_matrices()[0]
+
+	@property
+	def nu_prod(self):
+		"""Dense product stoichiometric matrix, built on first access"""
+		return self._dense_matrices()[1]
+
+	def _dense_matrices(self):
+		if self._nu_dense is None:
+			self._nu_dense = (self.stoich_react.toarray(), self.stoich_prod.toarray())
+		return self._nu_dense
+
+	def init_sparse_matrices(self, reactions, index=None):
+		"""Initializes sparse reactant and product matrices in one pass over
+		the reactions
+
+		INPUTS
+		======
+		reactions: 	list of Reaction()
+					All reactions in the system
+		index:		dict, optional
+					Index of each species, by default built from self.order
+
+		RETURNS:
+		=======
+		stoich_react:	SparseStoichiometry
+		 				Stoichiometric coefficients for reactants
+		stoich_prod:	SparseStoichiometry
+						Stoichiometric coefficients for products
+		"""
+		if index is None:
+			index = {name: i for i, name in enumerate(self.order)}
+		if reactions and all(isinstance(reac, Reaction) and reac.species_table is reactions[0].species_table
+							 for reac in reactions):
+			return self._sparse_matrices_from_ids(reactions, index)
+		return (SparseStoichiometry.from_dicts([reac.reactants for reac in reactions], index),
+				SparseStoichiometry.from_dicts([reac.products for reac in reactions], index))
+
+	def _sparse_matrices_from_ids(self, reactions, index):
+		"""Builds the sparse matrices from the packed species indices of
+		reactions sharing one SpeciesTable, mapping table indices to
+		species indices with a single lookup
+		"""
+		table = reactions[0].species_table
+		lookup = np.array([index.get(name, -1) for name in table.names], dtype=np.intp)
+		counts = np.array([len(reac._species) for reac in reactions], dtype=np.intp)
+		n_reactants = np.array([reac._n_reactants for reac in reactions], dtype=np.intp)
+		total = int(counts.sum())
+		ids = np.fromiter(chain.from_iterable(reac._species for reac in reactions), dtype=np.intp, count=total)
+		coeffs = np.fromiter(chain.from_iterable(reac._nu for reac in reactions), dtype=float, count=total)
+
+		reaction_ids = np.repeat(np.arange(len(reactions)), counts)
+		position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+		is_reactant = position < np.repeat(n_reactants, counts)
+		species = lookup[ids]
+		if np.any(species < 0):
+			k = np.argmax(species < 0)
+			raise ValueError("Species {0} of reaction {1} is not in the species list!".format(
+				table.names[ids[k]], reaction_ids[k]))
+
+		shape = (len(index), len(reactions))
+		return (SparseStoichiometry(species[is_reactant], reaction_ids[is_reactant], coeffs[is_reactant], shape),
+				SparseStoichiometry(species[~is_reactant], reaction_ids[~is_reactant], coeffs[~is_reactant], shape))
 
 	def init_matrices(self, reactions):
 		"""Initializes reactant and product matrices for progress rate calculations
@@ -328,18 +1072,459 @@ class ReactionSystem():
 		nu_prod: 	array of floats
 					Stoichiometric coefficients for products
 		"""
-		nu_reac = np.zeros((len(self.order), len(reactions)))
-		nu_prod = np.zeros((len(self.order), len(reactions)))
-		for i in range(len(self.order)):
-			for j in range(len(reactions)):
-				if self.order[i] in reactions[j].reactants:
-					nu_reac[i, j] = reactions[j].reactants[self.order[i]]
-				if self.order[i] in reactions[j].products:
-					nu_prod[i, j] = reactions[j].products[self.order[i]]
-		return nu_reac, nu_prod
+		stoich_react, stoich_prod = self.init_sparse_matrices(reactions)
+		return stoich_react.toarray(), stoich_prod.toarray()
+
+	def pack_rate_coefs(self, reactions):
+		"""Packs the rate coefficient parameters of all reactions into
+		contiguous arrays, so that all forward rate coefficients can be
+		computed with a single vectorized expression
+
+		INPUTS
+		======
+		reactions: 	list of Reaction()
+					All reactions in the system
+
+		RETURNS:
+		=======
+		A, b, E:	arrays of floats
+					(Modified) Arrhenius parameters, b = 0 for Arrhenius
+					and all zero for constant reactions
+		k_const:	array of floats
+					Constant rate coefficients, zero for other reactions
+		const_mask:	array of booleans
+					Whether each reaction has a constant rate coefficient
+		"""
+		n = len(reactions)
+		A, b, E, k_const = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+		const_mask = np.zeros(n, dtype=bool)
+		for j, reac in enumerate(reactions):
+			if reac.coef_type == 'Constant':
+				const_mask[j] = True
+				k_const[j] = reac.coef['k']
+			elif reac.coef_type == 'Arrhenius':
+				A[j], E[j] = reac.coef['A'], reac.coef['E']
+			elif reac.coef_type == 'modifiedArrhenius':
+				A[j], b[j], E[j] = reac.coef['A'], reac.coef['b'], reac.coef['E']
+			else:
+				raise ValueError("Unknown coefficient type {0!r} of reaction {1}".format(reac.coef_type, reac.reac_id))
+		return A, b, E, k_const, const_mask
+
+	def pack_pressure_coefs(self, reactions, index):
+		"""Packs the third-body efficiencies and falloff parameters of all
+		reactions into contiguous arrays
+
+		The third-body concentration of reaction j is
+		[M]_j = default_j * sum_i concs_i + sum_i (eff_ij - default_j) concs_i,
+		where the explicitly listed efficiencies are stored as sparse entries,
+		zero for those equal to the default so that the listing survives a
+		save and load. Efficiencies of species that are not in index, e.g.
+		removed by a mechanism reduction, are ignored.
+
+		INPUTS
+		======
+		reactions: 	list of Reaction(), or None for elementary reactions
+		index:		dict
+					Index of each species
+
+		RETURNS:
+		=======
+		pressure_coefs: PressureCoefs
+					third_body, falloff, troe: arrays of booleans
+					efficiency_default: array of floats, zero for
+					reactions without third body
+					efficiencies: SparseStoichiometry of eff_ij - default_j
+					A0, b0, E0: low-pressure limit parameters
+					troe_params: array of floats, shape (number of reactions, 4)
+		"""
+		n = len(reactions)
+		third_body, falloff, troe = np.zeros(n, dtype=bool), np.zeros(n, dtype=bool), np.zeros(n, dtype=bool)
+		default, A0, b0, E0 = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+		troe_params = np.zeros((n, 4))
+		troe_params[:, 3] = np.inf
+		species, eff_reactions, effs = [], [], []
+		for j, reac in enumerate(reactions):
+			if reac is None or not reac.third_body:
+				continue
+			third_body[j] = True
+			default[j] = reac.default_efficiency
+			for name, eff in reac.efficiencies.items():
+				if name in index:
+					species.append(index[name])
+					eff_reactions.append(j)
+					effs.append(eff - reac.default_efficiency)
+
+			if reac.reac_type != 'falloff':
+				continue
+			if reac.low_coef is None or reac.coef_type == 'Constant':
+				raise ValueError("Falloff reaction {0} needs low and high pressure Arrhenius coefficients".format(reac.reac_id))
+			falloff[j] = True
+			A0[j], b0[j], E0[j] = reac.low_coef['A'], reac.low_coef.get('b', 0.0), reac.low_coef['E']
+			falloff_type, params = reac.falloff
+			if falloff_type not in Reaction.FALLOFF_TYPES:
+				raise ValueError("Unknown falloff type {0!r} of reaction {1}".format(falloff_type, reac.reac_id))
+			if falloff_type == 'Troe':
+				if len(params) not in (3, 4):
+					raise ValueError("Troe falloff of reaction {0} needs 3 or 4 parameters".format(reac.reac_id))
+				troe[j] = True
+				troe_params[j, :len(params)] = params
+		efficiencies = SparseStoichiometry(species, eff_reactions, effs, (len(index), n))
+		return PressureCoefs(third_body, default, efficiencies, falloff, A0, b0, E0, troe, troe_params)
 
 	def progress_rate(self, T):
-		"""Returns the progress rate of a system of irreversible, elementary reactions
+		"""Returns the progress rate of a system of elementary reactions
+
+		The computation is dispatched on self.mode, see __init__.
+
+		INPUTS
+		======
+		T:		float
+				Temperature
+				Must be positive
+
+		RETURNS:
+		========
+		omega: numpy array of floats
+			   size: number of reactions
+			   progress rate of each reaction
+		"""
+		if self.mode == 'loop':
+			return self._progress_rate_loop(T)
+		return self._progress_rate_vectorized(T)
+
+	def _forward_coeffs(self, T):
+		"""Returns the forward reaction rate coefficients of all reactions
+
+		T may be a float or an array of temperatures, the reactions are
+		stacked along the last axis of the result. The Arrhenius gas
+		constant matches Reaction.init_arr_coef.
+		"""
+		T = np.asarray(T, dtype=float)
+		T_col = T[..., np.newaxis]
+		with self._stage('rate_constants'):
+			ks = np.where(self.const_mask, self.k_const,
+						  self.A * T_col**self.b * np.exp(-self.E / 8.314 / T_col))
+		if T.ndim == 0:
+			self.ks = list(ks)
+		return ks
+
+	def _third_body_concs(self, concs, reactions=None):
+		"""Returns the third-body concentration [M]_j of every reaction,
+		default_j * sum_i concs_i + sum_i (eff_ij - default_j) concs_i, with a
+		single sparse product over the listed efficiencies
+
+		INPUTS
+		======
+		concs:		numpy array of floats, shape (..., number of species)
+		reactions:	array of ints, optional
+					Indices of the reactions to compute, by default all
+
+		RETURNS:
+		=======
+		M:		numpy array of floats, shape (..., number of reactions)
+				zero for reactions without third body
+		"""
+		concs = np.asarray(concs, dtype=float)
+		default = self.efficiency_default if reactions is None else self.efficiency_default[reactions]
+		return default * concs.sum(axis=-1)[..., np.newaxis] + self.efficiencies.reduce(concs, reactions)
+
+	def _pressure_factor(self, concs, T, derivatives=False, reactions=None):
+		"""Returns the logarithm of the factor multiplying the forward and
+		backward rate coefficients of each reaction: log [M] for threeBody
+		reactions, log(Pr / (1 + Pr) F) for falloff reactions with the
+		reduced pressure Pr = k0 [M] / kinf, and zero otherwise
+
+		All falloff reactions are blended together, see _falloff_blend.
+
+		INPUTS
+		======
+		concs:			numpy array of floats, shape (..., number of species)
+		T:				float or numpy array of floats, shape (...)
+		derivatives:	boolean, default False
+						Whether to also return the derivatives of the
+						logarithm with respect to log [M] and to T
+		reactions:		array of ints, optional
+						Indices of the reactions to compute, by default all
+
+		RETURNS:
+		=======
+		log_factor:		numpy array of floats, shape (..., number of reactions)
+		dlog_M, dT:		numpy arrays of floats, same shape, if derivatives
+		"""
+		T = np.asarray(T, dtype=float)
+		sub = slice(None) if reactions is None else np.asarray(reactions, dtype=np.intp)
+		third_body, fo = self.third_body[sub], self.falloff[sub]
+		with np.errstate(divide='ignore', invalid='ignore'):
+			log_M = np.log(self._third_body_concs(concs, reactions))
+		log_factor = np.where(third_body, log_M, 0.0)
+		dlog_M = np.broadcast_to(third_body.astype(float), log_factor.shape).copy()
+		dT = np.zeros(log_factor.shape)
+
+		if np.any(fo):
+			A0, b0, E0 = self.A0[sub][fo], self.b0[sub][fo], self.E0[sub][fo]
+			A, b, E = self.A[sub][fo], self.b[sub][fo], self.E[sub][fo]
+			T_col = T[..., np.newaxis]
+			with np.errstate(divide='ignore'):
+				log_k0 = np.log(A0) + b0 * np.log(T_col) - E0 / 8.314 / T_col
+				log_kinf = np.log(A) + b * np.log(T_col) - E / 8.314 / T_col
+			log_pr = log_k0 - log_kinf + log_M[..., fo]
+			blend, slope, dlogF_dT = self._falloff_blend(log_pr, T_col, self.troe[sub][fo], self.troe_params[sub][fo])
+			log_factor[..., fo] = blend
+			dlog_M[..., fo] = slope
+			if derivatives:
+				dlog_pr_dT = (b0 - b) / T_col + (E0 - E) / 8.314 / T_col**2
+				dT[..., fo] = slope * dlog_pr_dT + dlogF_dT
+
+		if derivatives:
+			return log_factor, dlog_M, dT
+		return log_factor
+
+	@staticmethod
+	def _falloff_blend(log_pr, T, troe, troe_params):
+		"""Returns log(Pr / (1 + Pr) F) of falloff reactions, its derivative
+		with respect to log Pr, and the derivative of log F with respect to
+		T at constant Pr
+
+		F is one for Lindemann reactions, and for Troe reactions
+		log10 F = log10 Fcent / (1 + f1**2), f1 = (log10 Pr + c) / (n - 0.14 (log10 Pr + c)),
+		c = -0.4 - 0.67 log10 Fcent, n = 0.75 - 1.27 log10 Fcent and
+		Fcent = (1 - alpha) exp(-T / T3) + alpha exp(-T / T1) + exp(-T2 / T).
+
+		INPUTS
+		======
+		log_pr:			numpy array of floats, shape (..., number of falloff reactions)
+		T:				numpy array of floats, shape (..., 1)
+		troe:			array of booleans, whether each reaction is a Troe reaction
+		troe_params:	array of floats, shape (number of falloff reactions, 4)
+		"""
+		# log(Pr / (1 + Pr)) and its derivative 1 / (1 + Pr)
+		blend = -np.logaddexp(0.0, -log_pr)
+		slope = np.exp(-np.logaddexp(0.0, log_pr))
+		dlogF_dT = np.zeros(np.broadcast(log_pr, T).shape)
+		if not np.any(troe):
+			return blend, slope, dlogF_dT
+
+		alpha, T3, T1, T2 = troe_params[troe].T
+		with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+			exp3, exp1, exp2 = np.exp(-T / T3), np.exp(-T / T1), np.exp(-T2 / T)
+			f_cent = (1.0 - alpha) * exp3 + alpha * exp1 + exp2
+			dfcent_dT = -(1.0 - alpha) * exp3 / T3 - alpha * exp1 / T1 + np.where(exp2 > 0, T2 / T**2 * exp2, 0.0)
+			log10_fcent = np.log10(f_cent)
+			x = log_pr[..., troe] / np.log(10.0) - 0.4 - 0.67 * log10_fcent
+			d = 0.75 - 1.27 * log10_fcent - 0.14 * x
+			f1 = x / d
+			log10_F = log10_fcent / (1.0 + f1**2)
+
+			# Derivatives of log10 F with respect to log10 Pr and log10 Fcent
+			df1_dx = (0.75 - 1.27 * log10_fcent) / d**2
+			dF_dpr = -log10_fcent * 2.0 * f1 * df1_dx / (1.0 + f1**2)**2
+			df1_dfcent = (-0.67 * d - x * (-1.27 + 0.14 * 0.67)) / d**2
+			dF_dfcent = 1.0 / (1.0 + f1**2) - log10_fcent * 2.0 * f1 * df1_dfcent / (1.0 + f1**2)**2
+
+		# Zero factor (Pr = 0) or no falloff (Pr = inf) leave F undefined
+		finite = np.isfinite(log_pr[..., troe])
+		blend[..., troe] += np.where(finite, np.log(10.0) * log10_F, 0.0)
+		slope[..., troe] += np.where(finite, dF_dpr, 0.0)
+		dlogF_dT[..., troe] = np.where(finite, dF_dfcent * dfcent_dT / f_cent, 0.0)
+		return blend, slope, dlogF_dT
+
+	def _validate_progress_inputs(self, ks, concs):
+		"""Checks rate coefficients, concentrations and stoichiometric
+		coefficients once per evaluation and raises ValueError on the first
+		negative entry, with the same messages as the loop evaluation
+		"""
+		if np.any(ks < 0):
+			k = ks[ks < 0][0]
+			raise ValueError("k = {0:18.16e}:  Negative reaction rate coefficients are prohibited!".format(k))
+
+		if np.any(concs < 0.0):
+			pos = tuple(np.argwhere(concs < 0.0)[0])
+			raise ValueError("x{0} = {1:18.16e}:  Negative concentrations are prohibited!".format(pos[-1], concs[pos]))
+
+		for nu in (self.stoich_react, self.stoich_prod):
+			if np.any(nu.coeffs < 0):
+				k = np.argmax(nu.coeffs < 0)
+				raise ValueError("nu_{0}{1} = {2}:  Negative stoichiometric coefficients are prohibited!".format(nu.species[k], nu.reactions[k], nu.coeffs[k]))
+
+	def _progress_rate_vectorized(self, T):
+		"""Evaluates progress_rate for all reactions at once"""
+		return self._progress(np.asarray(self.concs, dtype=float), T)
+
+	def _progress(self, concs, T):
+		"""Computes progress rates for one state or a batch of states
+
+		Forward and backward concentration products are computed over the
+		sparse stoichiometric entries of each reaction, and the equilibrium
+		coefficients of all reversible reactions are computed in a single
+		call. The rate coefficients of threeBody and falloff reactions are
+		multiplied by their pressure factor, see _pressure_factor.
+
+		INPUTS
+		======
+		concs:	numpy array of floats, shape (..., number of species)
+		T:		float or numpy array of floats, shape (...)
+
+		RETURNS:
+		========
+		progress: numpy array of floats, shape (..., number of reactions)
+		"""
+		if self.mode == 'log':
+			return self._progress_log(concs, T)
+
+		ks, kb = self._table_coeffs(T) if self.mode == 'table' else (None, None)
+		if ks is None:
+			ks = self._forward_coeffs(T)
+		self._validate_progress_inputs(ks, concs)
+
+		if self._pressure_dependent:
+			with self._stage('pressure_factor'):
+				factor = np.exp(self._pressure_factor(concs, T))
+				ks = ks * factor
+				if kb is not None:
+					kb = kb * factor[..., self.reversible]
+			if np.ndim(T) == 0:
+				self.ks = list(ks)
+
+		rev = self.reversible
+		if np.any(rev):
+			if kb is None:
+				kb = ks[..., rev] / self._equilibrium_coeffs_shared(T)[..., rev]
+
+		with self._stage('concentration_products'):
+			progress = ks * self.stoich_react.product(concs)
+			if np.any(rev):
+				progress[..., rev] -= kb * self.stoich_prod.product(concs)[..., rev]
+
+		return progress
+
+	def build_rate_table(self, rtol=1e-6, T_min=None, T_max=None, max_points=2**17, max_bytes=2**28):
+		"""Tabulates log kf and log ke of all reactions for the 'table' mode
+
+		INPUTS
+		======
+		rtol:		float, default 1e-6
+					Tolerance on the interpolated log kf and log ke, i.e.
+					on the relative error of kf and ke
+		T_min, T_max: floats, optional
+					Tabulated range, by default the range in which the
+					NASA coefficients of all species are valid.
+					Temperatures outside of it are evaluated exactly
+		max_points:	int
+					Largest number of grid points
+		max_bytes:	int, default 2**28
+					Largest size of the table, see RateTable.nbytes.
+					A ValueError is raised if rtol needs more points
+					or bytes
+
+		RETURNS:
+		=======
+		table:		RateTable, also stored as self.rate_table
+					See RateTable.accuracy_report
+		"""
+		self.rate_table = RateTable(self, rtol, T_min, T_max, max_points=max_points, max_bytes=max_bytes)
+		return self.rate_table
+
+	def _table_coeffs(self, T):
+		"""Returns kf of all reactions and kb of the reversible reactions
+		interpolated from the rate table, or (None, None) if T is outside
+		of the table
+		"""
+		if self.rate_table is None:
+			self.build_rate_table()
+		if not self.rate_table.covers(T):
+			return None, None
+
+		with self._stage('rate_constants'):
+			log_kf, log_ke = self.rate_table.lookup(T)
+			ks = np.exp(log_kf)
+			rev = self.reversible
+			kb = np.exp(log_kf[..., rev] - log_ke[..., rev])
+		if np.ndim(T) == 0:
+			self.ks = list(ks)
+		return ks, kb
+
+	def _log_forward_coeffs(self, T):
+		"""Returns the logarithm of the forward reaction rate coefficients,
+		log A + b log T - E / (8.314 T), without evaluating the coefficients
+
+		Zero rate coefficients have a logarithm of -inf.
+		"""
+		T = np.asarray(T, dtype=float)
+		T_col = T[..., np.newaxis]
+		if np.any(self.k_const[self.const_mask] < 0) or np.any(self.A[~self.const_mask] < 0):
+			# Same error as the other modes
+			self._validate_progress_inputs(self._forward_coeffs(T), np.zeros(len(self.order)))
+
+		with self._stage('rate_constants'), np.errstate(divide='ignore'):
+			log_ks = np.where(self.const_mask, np.log(self.k_const),
+							  np.log(self.A) + self.b * np.log(T_col) - self.E / 8.314 / T_col)
+		if T.ndim == 0:
+			self.ks = list(np.exp(log_ks))
+		return log_ks
+
+	def log_equilibrium_coeffs(self, T):
+		"""Calculates the logarithm of the equilibrium coefficients of all
+		reactions, without evaluating the coefficients themselves
+
+		INPUTS
+		======
+		T:		Temperature to select nasa coefficient table
+				float or array of floats
+
+		RETURNS:
+		=======
+		log_ke:	numpy array of floats
+				shape: (..., number of reactions)
+		"""
+		return _writable(self._log_equilibrium_coeffs_shared(T))
+
+	def _log_equilibrium_coeffs_shared(self, T):
+		"""Returns log_equilibrium_coeffs(T), the cached read-only array for
+		a single temperature
+		"""
+		T = np.asarray(T, dtype=float)
+		if np.any(T[..., np.newaxis] < self.trange[:, 0]) or np.any(T[..., np.newaxis] > self.trange[:, 1]):
+			raise ValueError("This Temperature is out of range!")
+
+		with self._stage('equilibrium'):
+			return self._cached('log_ke', T, self._log_equilibrium_coeffs)
+
+	def _log_equilibrium_coeffs(self, T):
+		"""Computes log_equilibrium_coeffs without the range check and cache"""
+		T = np.asarray(T, dtype=float)
+		_, H_RT, S_R = self._thermo_shared(T)
+		log_fact = np.log(self.p0 / self.R / T)[..., np.newaxis]
+		return self._gamma * log_fact + self.stoich_net.reduce(S_R - H_RT)
+
+	def _progress_log(self, concs, T):
+		"""Computes progress rates in log space, see _progress
+
+		The forward and backward terms are exp(log kf + sum_i nu'_ij log x_i)
+		and exp(log kf - log ke + sum_i nu''_ij log x_i). Zero concentrations
+		have a logarithm of -inf, and a zero exponent of a zero concentration
+		contributes a factor of one, as in the other modes.
+		"""
+		log_ks = self._log_forward_coeffs(T)
+		self._validate_progress_inputs(np.zeros(0), concs)
+		if self._pressure_dependent:
+			with self._stage('pressure_factor'):
+				log_ks = log_ks + self._pressure_factor(concs, T)
+
+		rev = self.reversible
+		if np.any(rev):
+			log_kb = log_ks[..., rev] - self._log_equilibrium_coeffs_shared(T)[..., rev]
+
+		with self._stage('concentration_products'), np.errstate(divide='ignore'):
+			log_concs = np.log(concs)
+			progress = np.exp(log_ks + self.stoich_react.log_product(log_concs))
+			if np.any(rev):
+				progress[..., rev] -= np.exp(log_kb + self.stoich_prod.log_product(log_concs)[..., rev])
+
+		return progress
+
+	def _progress_rate_loop(self, T):
+		"""Reference implementation of progress_rate, looping over every
+		reaction and every species
 
 		RETURNS:
 		========
@@ -349,10 +1534,11 @@ class ReactionSystem():
 		"""
 
 		# Calcualte forward reaction rate coefficient 
-		self.ks = []
-		for reac in self.reactions:
-			reac.set_reac_coefs(T)
-			self.ks.append(reac.k)
+		self._forward_coeffs(T)
+		if self._pressure_dependent:
+			# Third-body and falloff factors of all reactions
+			with self._stage('pressure_factor'):
+				self.ks = list(np.array(self.ks) * np.exp(self._pressure_factor(self.concs, T)))
 
 		progress = self.ks.copy() # Initialize progress rates with reaction rate coefficients
 		for jdx, prog in enumerate(progress):
@@ -410,10 +1596,418 @@ class ReactionSystem():
 		self.concs = concs
 
 		rates = self.progress_rate(T)
-		nu = self.nu_prod - self.nu_react
 
-		return np.dot(nu, rates)
+		with self._stage('species_rates'):
+			return self.stoich_net.scatter(rates)
+
+	def reaction_rate_batch(self, concs, T):
+		"""Returns the reaction rates of many states in a single call
+
+		Rate coefficients, NASA coefficient selection and equilibrium
+		coefficients are all broadcast over the batch axis.
+
+		INPUTS
+		======
+		concs:	array of floats, shape (N, number of species)
+				Concentrations of each state
+				Must be positive
+		T:		array of floats, shape (N,)
+				Temperature of each state
+				A single float applies to all states and goes through
+				the thermodynamic cache
+				Must be positive
+
+		RETURNS:
+		========
+		f: numpy array of floats
+		   shape: (N, number of species)
+		   reaction rate of each species in each state
+		"""
+		concs, T = self._batch_inputs(concs, T)
+		rates = self._progress(concs, T)
+
+		with self._stage('species_rates'):
+			return self.stoich_net.scatter(rates)
+
+
+	def _batch_inputs(self, concs, T):
+		"""Checks and converts the (concs, T) inputs of the batched methods"""
+		concs = np.asarray(concs, dtype=float)
+		if concs.ndim != 2 or concs.shape[1] != len(self.order):
+			raise ValueError("Concentrations must have shape (N, number of species)!")
+
+		T = np.asarray(T, dtype=float)
+		if T.ndim != 0:
+			T = np.broadcast_to(T, concs.shape[:1])
+
+		if np.any(concs < 0):
+			raise ValueError('Concentration should not be Negative!')
+
+		if np.any(T <= 0):
+			raise ValueError('Temperature should be positive!')
+
+		return concs, T
+
+	def rate_sensitivities(self, concs, T):
+		"""Returns the sensitivities of the species reaction rates to the
+		Arrhenius parameters of every reaction
+
+		Scaling A_j scales both the forward and backward rate coefficients
+		of reaction j, and the equilibrium coefficient does not depend on
+		A_j or E_j, so with q_j the progress rate of reaction j
+		d(rate_i)/d(ln A_j) = nu_ij q_j and
+		d(rate_i)/d(E_j) = -nu_ij q_j / (8.314 T).
+		For constant reactions, A_j is the constant coefficient k_j and the
+		sensitivity to E_j is zero. For falloff reactions, A_j and E_j are
+		the high-pressure limit parameters, and both sensitivities are
+		scaled by d ln kf/d ln kinf = 1 - d ln(Pr/(1 + Pr) F)/d ln Pr.
+
+		INPUTS
+		======
+		concs:	list of floats
+				Concentrations
+				Must be positive
+		T:		float
+				Temperature
+				Must be positive
+
+		RETURNS:
+		========
+		dlnA, dE:	numpy arrays of floats
+					shape: (number of species, number of reactions)
+		"""
+		concs = np.asarray(concs, dtype=float)
+		if concs.shape != (len(self.order),):
+			raise ValueError("Concentration length does not match number of species!")
+
+		dlnA, dE = self.rate_sensitivities_batch(concs[np.newaxis], T)
+		return dlnA[0], dE[0]
+
+	def rate_sensitivities_batch(self, concs, T):
+		"""Returns rate_sensitivities of many states in a single call
+
+		INPUTS
+		======
+		concs:	array of floats, shape (N, number of species)
+				Concentrations of each state
+				Must be positive
+		T:		float or array of floats, shape (N,)
+				Temperature of each state
+				Must be positive
+
+		RETURNS:
+		========
+		dlnA, dE:	numpy arrays of floats
+					shape: (N, number of species, number of reactions)
+		"""
+		concs, T = self._batch_inputs(concs, T)
+		progress = self._progress(concs, T)
+
+		if np.any(self.falloff):
+			dlog_M = self._pressure_factor(concs, T, derivatives=True)[1]
+			progress = progress * np.where(self.falloff, 1.0 - dlog_M, 1.0)
+
+		# Scatter nu_ij q_j from the sparse net stoichiometry, repeated
+		# entries of a species on both sides are summed
+		net = self.stoich_net
+		dlnA = np.zeros((len(progress), len(self.order), len(self)))
+		np.add.at(dlnA, (slice(None), net.species, net.reactions), net.coeffs * progress[:, net.reactions])
+		dlnkf_dE = np.where(self.const_mask, 0.0, -1.0 / 8.314 / np.asarray(T, dtype=float)[..., np.newaxis])
+		dE = dlnA * np.broadcast_to(dlnkf_dE, progress.shape)[:, np.newaxis, :]
+		return dlnA, dE
+
+	def _conc_product_derivs(self, concs, nu):
+		"""Differentiates the concentration products prod_i concs_i**nu_ij
+
+		INPUTS
+		======
+		concs:	numpy array of floats, size: number of species
+		nu:		SparseStoichiometry
+
+		RETURNS:
+		=======
+		prods:	numpy array of floats, size: number of reactions
+				prod_i concs_i**nu_ij of each reaction
+		rows, cols, derivs: numpy arrays
+				Derivative of the product of reaction cols[k] with respect
+				to concs[rows[k]], for every nonzero entry of nu
+		"""
+		nonzero = nu.coeffs != 0
+		rows, cols, n = nu.species[nonzero], nu.reactions[nonzero], nu.coeffs[nonzero]
+		c = concs[rows]
+		terms = c**n
+
+		# Products over the nonzero factors, and number of zero factors,
+		# so that the product of the other factors of each entry is
+		# well defined when a concentration is zero
+		zero = terms == 0.0
+		n_zero = np.bincount(cols[zero], minlength=nu.shape[1])
+		prod_nonzero = np.ones(nu.shape[1])
+		np.multiply.at(prod_nonzero, cols[~zero], terms[~zero])
+
+		with np.errstate(divide='ignore', invalid='ignore'):
+			others = np.where(zero,
+							  np.where(n_zero[cols] == 1, prod_nonzero[cols], 0.0),
+							  np.where(n_zero[cols] == 0, prod_nonzero[cols] / terms, 0.0))
+			derivs = n * c**(n - 1.0) * others
+
+		prods = np.where(n_zero == 0, prod_nonzero, 0.0)
+		return prods, rows, cols, derivs
+
+	def jacobian(self, concs, T, temperature=True, sparse=False):
+		"""Returns the analytical Jacobian of the reaction rates
+
+		Built from the sparse reactant and product matrices, the forward
+		rate coefficients and the equilibrium coefficients. Only the nonzero
+		stoichiometric entries contribute, so the sparse output is assembled
+		without forming any dense matrix. The rows of threeBody and falloff
+		reactions also depend on every species through [M].
+
+		INPUTS
+		======
+		concs:			list of floats
+						Concentrations
+						Must be positive
+		T:				float
+						Temperature
+						Must be positive
+		temperature:	boolean, default True
+						Whether to append the derivatives with respect to T
+						as the last column
+		sparse:			boolean, default False
+						Whether to return a scipy.sparse CSR matrix
+
+		RETURNS:
+		========
+		J:	numpy array or scipy.sparse.csr_matrix of floats
+			shape: (number of species, number of species [+ 1])
+			J[i, k] = d(rate_i)/d(concs_k), J[i, -1] = d(rate_i)/dT
+		"""
+		concs = np.asarray(concs, dtype=float)
+		if concs.shape != (len(self.order),):
+			raise ValueError("Concentration length does not match number of species!")
+
+		if np.any(concs < 0):
+			raise ValueError('Concentration should not be Negative!')
+
+		if T <= 0:
+			raise ValueError('Temperature should be positive!')
+
+		n_species, n_reactions = len(self.order), len(self)
+		kf = self._forward_coeffs(T)
+		kb = np.zeros(n_reactions)
+		rev = self.reversible
+		if np.any(rev):
+			kb[rev] = kf[rev] / self._equilibrium_coeffs_shared(T)[rev]
+
+		prod_f, rows_f, cols_f, derivs_f = self._conc_product_derivs(concs, self.stoich_react)
+		prod_b, rows_b, cols_b, derivs_b = self._conc_product_derivs(concs, self.stoich_prod)
+
+		if self._pressure_dependent:
+			log_factor, dlog_M, dlog_factor_dT = self._pressure_factor(concs, T, derivatives=True)
+			# d(progress_j)/d[M]_j, from the progress without the factor for
+			# threeBody reactions so that it is defined at [M] = 0
+			M = self._third_body_concs(concs)
+			with np.errstate(divide='ignore', invalid='ignore'):
+				dq_dM = np.where(self.falloff,
+								 np.where(M > 0, (kf * prod_f - kb * prod_b) * np.exp(log_factor) * dlog_M / M, 0.0),
+								 np.where(self.third_body, kf * prod_f - kb * prod_b, 0.0))
+			kf, kb = kf * np.exp(log_factor), kb * np.exp(log_factor)
+
+		# d(progress_j)/d(concs_i) as (reaction, species, value) triplets
+		dq_rows = np.concatenate([cols_f, cols_b])
+		dq_cols = np.concatenate([rows_f, rows_b])
+		dq_vals = np.concatenate([kf[cols_f] * derivs_f, -kb[cols_b] * derivs_b])
+
+		if self._pressure_dependent:
+			# d[M]_j/d(concs_i) is default_j for every species, plus the
+			# sparse efficiency entries
+			tb = np.flatnonzero(self.third_body & (self.efficiency_default != 0))
+			eff = self.efficiencies
+			dq_rows = np.concatenate([dq_rows, np.repeat(tb, n_species), eff.reactions])
+			dq_cols = np.concatenate([dq_cols, np.tile(np.arange(n_species), len(tb)), eff.species])
+			dq_vals = np.concatenate([dq_vals, np.repeat(dq_dM[tb] * self.efficiency_default[tb], n_species),
+									  dq_dM[eff.reactions] * eff.coeffs])
+
+		if temperature:
+			# d ln kf/dT from the Arrhenius parameters and
+			# d ln ke/dT = (delta H/(RT) - sum_i nu_ij) / T
+			dlnkf = np.where(self.const_mask, 0.0, self.b / T + self.E / 8.314 / T**2)
+			if self._pressure_dependent:
+				dlnkf = dlnkf + dlog_factor_dT
+			dlnke = np.zeros(n_reactions)
+			if np.any(rev):
+				dlnke[rev] = ((self.stoich_net.reduce(self._thermo_shared(T)[1]) - self._gamma) / T)[rev]
+			dq_dT = kf * prod_f * dlnkf - kb * prod_b * (dlnkf - dlnke)
+
+			dq_rows = np.concatenate([dq_rows, np.arange(n_reactions)])
+			dq_cols = np.concatenate([dq_cols, np.full(n_reactions, n_species)])
+			dq_vals = np.concatenate([dq_vals, dq_dT])
+
+		# J = nu @ dq/dc, with repeated entries summed
+		rows, cols, vals = self.stoich_net.matmul_triplets(dq_rows, dq_cols, dq_vals)
+		shape = (n_species, n_species + bool(temperature))
+
+		if sparse:
+			import scipy.sparse
+			return scipy.sparse.csr_matrix((vals, (rows, cols)), shape=shape)
+
+		J = np.zeros(shape)
+		np.add.at(J, (rows, cols), vals)
+		return J
+
+	def dCp_over_R_dT(self, T):
+		"""Helper function to calculate d(Cp/R)/dT
+
+		INPUTS
+		======
+		T:		Temperature to select nasa coefficient table
+
+		RETURNS:
+		=======
+		dCp_R: 	Calculated d(Cp/R)/dT
+		"""
+		a = self._nasa_coeffs(T)
+		T = np.asarray(T, dtype=float)[..., np.newaxis]
+		return a[..., 1] + 2.0 * a[..., 2] * T + 3.0 * a[..., 3] * T**2 + 4.0 * a[..., 4] * T**3
+
+	def _cached(self, name, T, compute):
+		"""Returns compute(T), going through the thermodynamic cache when
+		T is a single temperature and the cache is enabled
+		"""
+		if self.thermo_cache is None or np.ndim(T) != 0:
+			return compute(T)
+		return self.thermo_cache.get(float(T), name, lambda: compute(T))
+
+	def cache_info(self):
+		"""Returns hit/miss statistics of the thermodynamic cache
+
+		RETURNS:
+		=======
+		info:	CacheInfo(hits, misses, maxsize, currsize) or None
+				if the cache is disabled
+		"""
+		if self.thermo_cache is None:
+			return None
+		return self.thermo_cache.info()
+
+	def cache_clear(self):
+		"""Empties the thermodynamic cache and resets its statistics"""
+		if self.thermo_cache is not None:
+			self.thermo_cache.clear()
+
+	def _stage(self, name):
+		"""Returns the context manager recording one call of stage name,
+		a shared no-op when profiling is disabled
+		"""
+		if self.profiler is None:
+			return _NO_PROFILING
+		return self.profiler.stage(name)
+
+	def enable_profiling(self, profiler=None):
+		"""Starts recording per-stage call counts, wall time and traced memory
+		of the rate computations
+
+		Stages are 'rate_constants', 'pressure_factor' (third-body and falloff
+		factors, pressure-dependent systems only), 'thermo', 'equilibrium',
+		'concentration_products' and 'species_rates', see chem3.profiling
+		for the memory statistics, recorded while tracemalloc is tracing.
+
+		INPUTS
+		======
+		profiler:	Profiler, optional
+					Profiler to record to, e.g. shared between systems,
+					by default a new one
+
+		RETURNS:
+		=======
+		profiler:	Profiler
+		"""
+		self.profiler = Profiler() if profiler is None else profiler
+		return self.profiler
+
+	def disable_profiling(self):
+		"""Stops recording per-stage statistics and returns the profiler"""
+		profiler, self.profiler = self.profiler, None
+		return profiler
+
+	@contextmanager
+	def profiling(self, profiler=None):
+		"""Context manager recording per-stage statistics within a block
 
+		EXAMPLES:
+		========
+		>>> with system.profiling() as profiler:   # doctest: +SKIP
+		...     system.reaction_rate(concs, T)
+		>>> profiler.stats()['thermo'].calls       # doctest: +SKIP
+		1
+		"""
+		previous = self.profiler
+		profiler = self.enable_profiling(profiler)
+		try:
+			yield profiler
+		finally:
+			self.profiler = previous
+
+	def profile_stats(self):
+		"""Returns the StageStats(calls, seconds, allocated_bytes, peak_bytes)
+		of each stage, or None if profiling is disabled
+		"""
+		if self.profiler is None:
+			return None
+		return self.profiler.stats()
+
+	def _nasa_coeffs(self, T):
+		"""Selects the low or high temperature NASA coefficients of each
+		species, broadcast over an optional batch of temperatures
+
+		RETURNS:
+		=======
+		a: 		numpy array of floats, shape (..., number of species, 7)
+		"""
+		T = np.asarray(T, dtype=float)
+		low_T = (T[..., np.newaxis] < self.tmid)[..., np.newaxis]
+		return np.where(low_T, self.nasa7_coeffs[0], self.nasa7_coeffs[1])
+
+	def thermo(self, T):
+		"""Calculates Cp/R, H/(RT) and S/R of all species in one pass
+
+		INPUTS
+		======
+		T:		Temperature to select nasa coefficient table
+				float or array of floats
+
+		RETURNS:
+		=======
+		Cp_R, H_RT, S_R:	numpy arrays of floats
+							shape: (..., number of species)
+		"""
+		return tuple(_writable(arr) for arr in self._thermo_shared(T))
+
+	def _thermo_shared(self, T):
+		"""Returns thermo(T), the cached read-only arrays for a single
+		temperature
+		"""
+		with self._stage('thermo'):
+			return self._cached('thermo', T, self._thermo)
+
+	def _thermo(self, T):
+		"""Computes thermo without going through the cache"""
+		a0, a1, a2, a3, a4, a5, a6 = np.moveaxis(self._nasa_coeffs(T), -1, 0)
+		T = np.asarray(T, dtype=float)[..., np.newaxis]
+
+		# Powers of T shared by the three polynomials
+		T2 = T * T
+		T3 = T2 * T
+		T4 = T3 * T
+
+		Cp_R = a0 + a1 * T + a2 * T2 + a3 * T3 + a4 * T4
+		H_RT = (a0 + a1 * T / 2.0 + a2 * T2 / 3.0 + a3 * T3 / 4.0
+				+ a4 * T4 / 5.0 + a5 / T)
+		S_R = (a0 * np.log(T) + a1 * T + a2 * T2 / 2.0 + a3 * T3 / 3.0
+			   + a4 * T4 / 4.0 + a6)
+
+		return Cp_R, H_RT, S_R
 
 	def Cp_over_R(self, T):
 		"""Helper function that calculates Cp/R
@@ -426,17 +2020,7 @@ class ReactionSystem():
 		=======
 		Cp_R: 	Calculated Cp/R
 		"""
-		a = np.zeros(self.nasa7_coeffs_low.shape)
-		for i, tmid in enumerate(self.tmid):
-			if T < tmid:
-				a[i] = self.nasa7_coeffs_low[i]
-			else:
-				a[i] = self.nasa7_coeffs_high[i]
-
-		Cp_R = (a[:,0] + a[:,1] * T + a[:,2] * T**2.0 
-				+ a[:,3] * T**3.0 + a[:,4] * T**4.0)
-
-		return Cp_R
+		return _writable(self._thermo_shared(T)[0])
 
 	def H_over_RT(self, T):
 		"""Helper function to calculate H/(RT)
@@ -449,19 +2033,7 @@ class ReactionSystem():
 		=======
 		H_RT: 	Calculated H/(RT)
 		"""
-		a = np.zeros(self.nasa7_coeffs_low.shape)
-		for i, tmid in enumerate(self.tmid):
-			if T < tmid:
-				a[i] = self.nasa7_coeffs_low[i]
-			else:
-				a[i] = self.nasa7_coeffs_high[i]
-
-		H_RT = (a[:,0] + a[:,1] * T / 2.0 + a[:,2] * T**2.0 / 3.0 
-				+ a[:,3] * T**3.0 / 4.0 + a[:,4] * T**4.0 / 5.0 
-				+ a[:,5] / T)
-
-		return H_RT
-			   
+		return _writable(self._thermo_shared(T)[1])
 
 	def S_over_R(self, T):
 		"""Helper function to calculate S/R
@@ -474,17 +2046,7 @@ class ReactionSystem():
 		=======
 		S_R: 	Calculated S/R
 		"""
-		a = np.zeros(self.nasa7_coeffs_low.shape)
-		for i, tmid in enumerate(self.tmid):
-			if T < tmid:
-				a[i] = self.nasa7_coeffs_low[i]
-			else:
-				a[i] = self.nasa7_coeffs_high[i]
-
-		S_R = (a[:,0] * np.log(T) + a[:,1] * T + a[:,2] * T**2.0 / 2.0 
-			   + a[:,3] * T**3.0 / 3.0 + a[:,4] * T**4.0 / 4.0 + a[:,6])
-
-		return S_R
+		return _writable(self._thermo_shared(T)[2])
 
 	def backward_coeffs(self, nuij, kf, T):
 		"""Calculates the backward coefficients: first calculatest the 
@@ -521,5 +2083,41 @@ class ReactionSystem():
 
 		return kf / kb
 
+	def equilibrium_coeffs(self, T):
+		"""Calculates the equilibrium coefficients of all reactions
+
+		INPUTS
+		======
+		T:		Temperature to select nasa coefficient table
+				float or array of floats
+
+		RETURNS:
+		=======
+		ke:		numpy array of floats
+				shape: (..., number of reactions)
+				Equilibrium coefficient of each reaction
+		"""
+		return _writable(self._equilibrium_coeffs_shared(T))
+
+	def _equilibrium_coeffs_shared(self, T):
+		"""Returns equilibrium_coeffs(T), the cached read-only array for a
+		single temperature
+		"""
+		T = np.asarray(T, dtype=float)
+		if np.any(T[..., np.newaxis] < self.trange[:, 0]) or np.any(T[..., np.newaxis] > self.trange[:, 1]):
+			raise ValueError("This Temperature is out of range!")
+
+		with self._stage('equilibrium'):
+			return self._cached('ke', T, self._equilibrium_coeffs)
+
+	def _equilibrium_coeffs(self, T):
+		"""Computes equilibrium_coeffs without the range check and cache"""
+		T = np.asarray(T, dtype=float)
+
+		# Negative of change in Gibbs free energy for each reaction
+		_, H_RT, S_R = self._thermo_shared(T)
+		delta_G_over_RT = self.stoich_net.reduce(S_R - H_RT)
 
+		fact = self.p0 / self.R / T[..., np.newaxis]
 
+		return fact**self._gamma * np.exp(delta_G_over_RT)
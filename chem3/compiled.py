@@ -0,0 +1,228 @@
+"""
+This is a module to save a fully built ReactionSystem from the chemkin.py
+module to a compact binary file, and to load it back without parsing the
+.xml file or querying the NASA coefficient database.
+
+A compiled file holds a JSON header (species order, reaction metadata and
+the position of each array) followed by the raw, 64-byte aligned arrays:
+sparse stoichiometry, packed rate coefficients, third-body efficiencies
+and falloff parameters, NASA tables and temperature ranges. Loading
+memory-maps the arrays, so processes loading the same file share its pages.
+
+Compiled files are keyed by a content hash of the .xml file and the
+database, see load_system.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+import chem3
+from chem3.chemkin import PressureCoefs, ReactionSystem
+from chem3.stoich import SparseStoichiometry
+
+MAGIC = b'CHEM3MC\x00'
+FORMAT_VERSION = 3
+ALIGNMENT = 64
+SUFFIX = '.chem3'
+
+DEFAULT_DB_NAME = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+
+def mechanism_key(filename, db_name=DEFAULT_DB_NAME):
+    """returns the content hash keying the compiled file of a mechanism
+
+    INPUTS:
+    =======
+    filename:   str
+                Name of .xml data file
+    db_name:    str
+                Database name storing coefficients
+
+    RETURNS:
+    =======
+    key:        str
+                sha256 hex digest of the format version, the .xml file and
+                the database
+    """
+    digest = hashlib.sha256('chem3 compiled mechanism v{0}'.format(FORMAT_VERSION).encode())
+    for name in (filename, db_name):
+        with open(name, 'rb') as f:
+            content = f.read()
+        digest.update(struct.pack('<Q', len(content)))
+        digest.update(content)
+    return digest.hexdigest()
+
+
+def _system_arrays(system):
+    """returns the named arrays needed to rebuild a ReactionSystem"""
+    arrays = {}
+    for prefix, stoich in (('react', system.stoich_react), ('prod', system.stoich_prod)):
+        arrays[prefix + '_species'] = stoich.species.astype('<i8')
+        arrays[prefix + '_reactions'] = stoich.reactions.astype('<i8')
+        arrays[prefix + '_coeffs'] = stoich.coeffs.astype('<f8')
+    arrays['eff_species'] = system.efficiencies.species.astype('<i8')
+    arrays['eff_reactions'] = system.efficiencies.reactions.astype('<i8')
+    arrays['eff_coeffs'] = system.efficiencies.coeffs.astype('<f8')
+    for name in ('A', 'b', 'E', 'k_const', 'efficiency_default', 'A0', 'b0', 'E0', 'troe_params',
+                 'nasa7_coeffs', 'tmid', 'trange'):
+        arrays[name] = np.asarray(getattr(system, name), dtype='<f8')
+    for name in ('reversible', 'const_mask', 'third_body', 'falloff', 'troe'):
+        arrays[name] = getattr(system, name).astype('u1')
+    return arrays
+
+
+def save_compiled(system, path, key=''):
+    """writes a ReactionSystem to a compiled file
+
+    The file is written to a temporary name and then renamed, so
+    concurrent readers never see a partially written file.
+
+    INPUTS:
+    =======
+    system:     ReactionSystem
+    path:       str
+                Name of the compiled file
+    key:        str, optional
+                Content hash stored in the header, see mechanism_key
+    """
+    arrays = _system_arrays(system)
+    reactions = system.reactions
+    header = {
+        'version': FORMAT_VERSION,
+        'key': key,
+        'species': list(system.order),
+        'reaction_info': {
+            'reac_id': [r.reac_id for r in reactions],
+            'reac_type': [r.reac_type for r in reactions],
+            'coef_type': [r.coef_type for r in reactions],
+            'low_coef_type': [None if r.low_coef is None else
+                              'modifiedArrhenius' if 'b' in r.low_coef else 'Arrhenius'
+                              for r in reactions],
+            'equation': [r.equation for r in reactions],
+            'duplicate': [r.duplicate for r in reactions],
+        },
+        'arrays': {},
+    }
+
+    # Array offsets are relative to the start of the data section
+    offset = 0
+    for name, arr in arrays.items():
+        header['arrays'][name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset += -(-arr.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=SUFFIX + '.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for name, arr in arrays.items():
+                f.seek(data_start + header['arrays'][name]['offset'])
+                f.write(np.ascontiguousarray(arr).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_header(path):
+    """returns (header, data_start) of a compiled file"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{0} is not a compiled chem3 mechanism".format(path))
+        size, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(size).decode('utf-8'))
+    if header.get('version') != FORMAT_VERSION:
+        raise ValueError("{0} has compiled format version {1}, expected {2}".format(
+            path, header.get('version'), FORMAT_VERSION))
+    data_start = -(-(len(MAGIC) + 8 + size) // ALIGNMENT) * ALIGNMENT
+    return header, data_start
+
+
+def load_compiled(path, mode='vectorized', cache_size=128):
+    """loads a ReactionSystem from a compiled file, memory-mapping its arrays
+
+    INPUTS:
+    =======
+    path:       str
+                Name of the compiled file
+    mode, cache_size:
+                See ReactionSystem.__init__
+
+    RETURNS:
+    =======
+    system:     ReactionSystem
+    """
+    header, data_start = read_header(path)
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        shape = tuple(spec['shape'])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=spec['dtype'])
+        else:
+            arrays[name] = np.memmap(path, dtype=spec['dtype'], mode='r',
+                                     offset=data_start + spec['offset'], shape=shape)
+
+    order = header['species']
+    n_reactions = len(arrays['reversible'])
+    stoich = [SparseStoichiometry(arrays[prefix + '_species'], arrays[prefix + '_reactions'],
+                                  arrays[prefix + '_coeffs'], (len(order), n_reactions))
+              for prefix in ('react', 'prod')]
+    rate_coefs = (arrays['A'], arrays['b'], arrays['E'], arrays['k_const'],
+                  arrays['const_mask'].view(bool))
+    efficiencies = SparseStoichiometry(arrays['eff_species'], arrays['eff_reactions'], arrays['eff_coeffs'],
+                                       (len(order), n_reactions))
+    pressure_coefs = PressureCoefs(arrays['third_body'].view(bool), arrays['efficiency_default'], efficiencies,
+                                   arrays['falloff'].view(bool), arrays['A0'], arrays['b0'], arrays['E0'],
+                                   arrays['troe'].view(bool), arrays['troe_params'])
+    return ReactionSystem.from_arrays(order, stoich[0], stoich[1], arrays['reversible'].view(bool), rate_coefs,
+                                      arrays['nasa7_coeffs'], arrays['tmid'], arrays['trange'],
+                                      reaction_info=header['reaction_info'], mode=mode, cache_size=cache_size,
+                                      pressure_coefs=pressure_coefs)
+
+
+def load_system(filename, cache_dir, db_name=DEFAULT_DB_NAME, mode='vectorized', cache_size=128):
+    """returns the ReactionSystem of an .xml file, through a compiled file cache
+
+    The compiled file is named after mechanism_key(filename, db_name) in
+    cache_dir. If it exists, it is loaded without parsing; otherwise the
+    system is built from the .xml file and the database and then saved, so
+    a change of either input produces a new compiled file.
+
+    INPUTS:
+    =======
+    filename:   str
+                Name of .xml data file
+    cache_dir:  str
+                Directory of the compiled files, created if needed
+    db_name:    str
+                Database name storing coefficients
+    mode, cache_size:
+                See ReactionSystem.__init__
+
+    RETURNS:
+    =======
+    system:     ReactionSystem
+    """
+    key = mechanism_key(filename, db_name)
+    path = os.path.join(cache_dir, key + SUFFIX)
+    if os.path.exists(path):
+        return load_compiled(path, mode=mode, cache_size=cache_size)
+
+    import chem3.parser
+    data = chem3.parser.read_data(filename, db_name)
+    system = ReactionSystem(next(iter(data['reactions'].values())), data['species'], data['low'], data['high'],
+                            data['T_cutoff'], data['T_range'], mode=mode, cache_size=cache_size)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_compiled(system, path, key)
+    return system
@@ -0,0 +1,313 @@
+"""
+This is a module to integrate ensembles of reactors that differ only in
+their initial conditions (temperature, pressure, composition), using the
+Reactor class of the integrate.py module also found in this library.
+
+The ensemble is either integrated case by case, in this process or across
+worker processes, or all at once as a single batched ODE whose Jacobian is
+block diagonal. A summary of each case (ignition delay, final state, peak
+reaction rates) is appended to a JSON lines results file as soon as the
+case is finished. A case that fails is recorded with the error in its
+summary, and the other cases go on.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+from chem3.integrate import Reactor
+
+MODES = ('serial', 'processes', 'batch')
+
+# Default pressure of conditions given by mole fractions, in Pa
+P_ATM = 101325.0
+
+
+def initial_state(system, condition):
+    """returns the initial (concs, T) of a case
+
+    INPUTS:
+    =======
+    system:     ReactionSystem
+    condition:  dict
+                'T':        initial temperature
+                'concs':    concentrations in the species order of system
+                or
+                'X':        mole fractions, a {species: fraction} dict or a
+                            list in the species order of system, normalized
+                            to one
+                'P':        pressure in Pa, default P_ATM. The total
+                            concentration is P / (R T)
+
+    RETURNS:
+    =======
+    concs:      numpy array of floats
+    T:          float
+    """
+    T = float(condition['T'])
+    if T <= 0:
+        raise ValueError('Temperature should be positive!')
+    if 'concs' in condition:
+        return np.asarray(condition['concs'], dtype=float), T
+
+    X = condition['X']
+    if isinstance(X, dict):
+        unknown = [name for name in X if name not in system.order]
+        if unknown:
+            raise ValueError("Species {0} not in the species list!".format(', '.join(unknown)))
+        X = [X.get(name, 0.0) for name in system.order]
+    X = np.asarray(X, dtype=float)
+    if X.shape != (len(system.order),):
+        raise ValueError("Mole fraction length does not match number of species!")
+    if np.any(X < 0) or X.sum() <= 0:
+        raise ValueError("Mole fractions should be positive!")
+    total = condition.get('P', P_ATM) / (system.R * T)
+    return total * X / X.sum(), T
+
+
+def summarize(case, system, t, concs, T, status=0, message=''):
+    """returns the summary metrics of an integrated case
+
+    INPUTS:
+    =======
+    case:       int
+                Index of the case in the ensemble
+    system:     ReactionSystem
+    t:          numpy array of floats, shape (n_t,)
+    concs:      numpy array of floats, shape (n_t, number of species)
+    T:          numpy array of floats, shape (n_t,)
+    status, message:
+                Termination status and reason of the integration
+
+    RETURNS:
+    =======
+    summary:    dict
+                'case', 'status', 'message',
+                'ignition_delay': time of the largest temperature rise
+                rate, None if the temperature is constant,
+                'T_final', 'concs_final': final state,
+                'peak_rates': largest absolute reaction rate of each species
+    """
+    concs = np.maximum(concs, 0.0)
+    rates = system.reaction_rate_batch(concs, T)
+
+    ignition_delay = None
+    if len(t) > 1 and np.ptp(T) > 0:
+        dTdt = np.gradient(T, t)
+        ignition_delay = float(t[np.argmax(dTdt)])
+
+    return {
+        'case': case,
+        'status': int(status),
+        'message': message,
+        'ignition_delay': ignition_delay,
+        'T_final': float(T[-1]),
+        'concs_final': concs[-1].tolist(),
+        'peak_rates': np.max(np.abs(rates), axis=0).tolist(),
+    }
+
+
+def failed_summary(case, error):
+    """returns the summary of a case whose integration raised error
+
+    The summary has the keys of summarize, with a status of -1, the error
+    as message and None metrics.
+    """
+    return {
+        'case': case,
+        'status': -1,
+        'message': '{0}: {1}'.format(type(error).__name__, error),
+        'ignition_delay': None,
+        'T_final': None,
+        'concs_final': None,
+        'peak_rates': None,
+    }
+
+
+def _run_case(case, system, energy, method, concs, T, t_end, options):
+    """Integrates one case and returns its summary, or its failed_summary"""
+    try:
+        reactor = Reactor(system, energy, method=method)
+        sol = reactor.integrate(concs, T, t_end, dense_output=False, **options)
+        return summarize(case, system, sol.t, sol.concs, sol.T, sol.status, sol.message)
+    except Exception as err:
+        return failed_summary(case, err)
+
+
+# Worker state of the 'processes' mode, set by _init_worker
+_worker_system = None
+
+
+def _init_worker(system):
+    """Stores the ReactionSystem sent once to each worker process"""
+    global _worker_system
+    _worker_system = system
+
+
+def _run_worker_case(case, energy, method, concs, T, t_end, options):
+    """Integrates one case in a worker process"""
+    return _run_case(case, _worker_system, energy, method, concs, T, t_end, options)
+
+
+class _BatchReactor():
+    """All cases of an ensemble stacked into one ODE system"""
+    def __init__(self, system, energy, T):
+        self.reactor = Reactor(system, energy)
+        self.system = system
+        self.energy = energy
+        self.n_species = self.reactor.n_species
+        self.n_state = self.reactor.n_state
+        self.T = np.asarray(T, dtype=float)
+
+    def split_state(self, y):
+        """returns concs (N, S) and T (N,) of a stacked state"""
+        states = np.reshape(y, (len(self.T), self.n_state))
+        if self.energy == 'adiabatic':
+            return states[:, :-1], states[:, -1]
+        return states, self.T
+
+    def rhs(self, t, y):
+        concs, T = self.split_state(y)
+        concs = np.maximum(concs, 0.0)
+        rates = self.system.reaction_rate_batch(concs, T)
+        if self.energy == 'isothermal':
+            return rates.ravel()
+        return np.column_stack([rates, self.reactor.temperature_rate(concs, T, rates)]).ravel()
+
+    def jac(self, t, y):
+        import scipy.sparse
+        states = np.reshape(y, (len(self.T), self.n_state))
+        blocks = []
+        for state, T in zip(states, self.T):
+            if self.energy == 'isothermal':
+                blocks.append(self.system.jacobian(np.maximum(state, 0.0), T, temperature=False, sparse=True))
+            else:
+                blocks.append(self.reactor.jac(t, state))
+        return scipy.sparse.block_diag(blocks, format='csc')
+
+
+def _run_batch(system, energy, method, initial, t_end, options):
+    """Integrates all cases as one ODE and returns their summaries"""
+    batch = _BatchReactor(system, energy, [T for _, T in initial])
+    if energy == 'adiabatic':
+        y0 = np.concatenate([np.append(concs, T) for concs, T in initial])
+    else:
+        y0 = np.concatenate([concs for concs, _ in initial])
+
+    try:
+        result = solve_ivp(batch.rhs, (0.0, t_end), y0, method=method, jac=batch.jac, **options)
+    except Exception as err:
+        # The cases share one integration, which fails for all of them
+        return [failed_summary(case, err) for case in range(len(initial))]
+    states = np.reshape(result.y.T, (len(result.t), len(initial), batch.n_state))
+    summaries = []
+    for case in range(len(initial)):
+        if energy == 'adiabatic':
+            concs, T = states[:, case, :-1], states[:, case, -1]
+        else:
+            concs, T = states[:, case], np.full(len(result.t), batch.T[case])
+        summaries.append(summarize(case, system, result.t, concs, T, result.status, result.message))
+    return summaries
+
+
+def run_ensemble(system, conditions, t_end, results_file=None, energy='adiabatic', method='BDF',
+                 mode='serial', workers=None, rtol=1e-6, atol=1e-12, max_step=np.inf):
+    """Integrates a reactor for each initial condition and summarizes each case
+
+    INPUTS:
+    =======
+    system:         ReactionSystem
+    conditions:     list of dicts
+                    Initial condition of each case, see initial_state
+    t_end:          float
+                    Final time of every case
+    results_file:   str or file object, optional
+                    JSON lines file the summary of each case is appended to
+                    as soon as the case is finished, earlier lines of an
+                    existing file are kept
+    energy:         str, default 'adiabatic'
+                    Energy equation of the reactors, see Reactor
+    method:         str, default 'BDF'
+                    Stiff integration method, see Reactor
+    mode:           str, default 'serial'
+                    'serial' integrates the cases one by one in this process,
+                    'processes' integrates them across worker processes and
+                    'batch' integrates all of them as a single ODE system
+                    (with a shared step size) with a block diagonal Jacobian
+    workers:        int, optional
+                    Number of worker processes of the 'processes' mode, by
+                    default the number of cores
+    rtol, atol, max_step: floats
+                    Step control of the integration, see Reactor.integrate
+
+    RETURNS:
+    =======
+    summaries:      list of dicts
+                    Summary of each case in the order of conditions, see
+                    summarize, or failed_summary for the cases whose
+                    integration raised an error. In 'batch' mode an error
+                    fails all the cases
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> from chem3.chemkin import ReactionSystem
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    >>> conditions = [{'T': T, 'X': {'H2': 2., 'O2': 1.}} for T in (1200., 1400.)]
+    >>> [s['case'] for s in run_ensemble(system, conditions, 1e-3, energy='isothermal')]
+    [0, 1]
+    """
+    if mode not in MODES:
+        raise ValueError("Unknown ensemble mode {0!r}, must be one of {1}".format(mode, MODES))
+    if energy not in Reactor.ENERGY:
+        raise ValueError("Unknown energy equation {0!r}, must be one of {1}".format(energy, Reactor.ENERGY))
+
+    initial = [initial_state(system, condition) for condition in conditions]
+    for concs, _ in initial:
+        if concs.shape != (len(system.order),):
+            raise ValueError("Concentration length does not match number of species!")
+        if np.any(concs < 0):
+            raise ValueError('Concentration should not be Negative!')
+    options = {'rtol': rtol, 'atol': atol, 'max_step': max_step}
+
+    close = False
+    if isinstance(results_file, str):
+        results_file = open(results_file, 'a')
+        close = True
+
+    summaries = [None] * len(initial)
+
+    def record(summary):
+        summaries[summary['case']] = summary
+        if results_file is not None:
+            results_file.write(json.dumps(summary) + '\n')
+            results_file.flush()
+
+    try:
+        if mode == 'batch':
+            if initial:
+                for summary in _run_batch(system, energy, method, initial, t_end, options):
+                    record(summary)
+        elif mode == 'serial':
+            for case, (concs, T) in enumerate(initial):
+                record(_run_case(case, system, energy, method, concs, T, t_end, options))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(system,)) as executor:
+                futures = {executor.submit(_run_worker_case, case, energy, method, concs, T, t_end, options): case
+                           for case, (concs, T) in enumerate(initial)}
+                for future in as_completed(futures):
+                    # Errors of the cases are caught in the workers, this
+                    # is e.g. a worker process that died
+                    try:
+                        summary = future.result()
+                    except Exception as err:
+                        summary = failed_summary(futures[future], err)
+                    record(summary)
+    finally:
+        if close:
+            results_file.close()
+    return summaries
@@ -0,0 +1,191 @@
+"""
+This is a module to re-evaluate the reaction rates of a ReactionSystem from
+the chemkin.py module when only a few species concentrations change
+between successive calls, as in operator-split codes or Newton iterations.
+
+The evaluator keeps the last state and its progress rates. At an unchanged
+temperature the rate and equilibrium coefficients are reused, and only the
+progress rates of the reactions involving a changed species are computed
+again, using the species to reactions index of the sparse stoichiometry,
+and the species reaction rates are updated with the change of these
+progress rates only. The third-body concentration of threeBody and falloff
+reactions depends on all species unless their default efficiency is zero,
+so these reactions are computed again on any change, and the others when
+a species with an efficiency changes.
+"""
+
+import numpy as np
+
+
+class IncrementalEvaluator():
+    """Stateful reaction rate evaluator reusing the previous evaluation
+
+    Progress rates are identical to ReactionSystem.progress_rate in
+    'vectorized' mode. Reaction rates are equal to ReactionSystem.reaction_rate
+    up to the rounding of the updates, and exactly after a full evaluation.
+
+    ATRIBUTES:
+    =========
+    system:         ReactionSystem
+    full_fraction:  float
+                    Fraction of changed reactions above which all progress
+                    rates are computed again
+    full_evaluations, partial_evaluations, reused_evaluations: int
+                    Number of calls that computed all, some and none of the
+                    progress rates
+
+    METHODS:
+    =======
+    .__init__: init attributes
+    .reaction_rate: returns the reaction rate of each species
+    .progress_rate: returns the progress rate of each reaction
+    .reset: forgets the previous state
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> from chem3.chemkin import ReactionSystem
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    >>> evaluator = IncrementalEvaluator(system, full_fraction=1.0)
+    >>> rates = evaluator.reaction_rate([2., 1., .5, 1., 1.], 1500)
+    >>> rates = evaluator.reaction_rate([2., 1., .5, 1., 2.], 1500)
+    >>> evaluator.partial_evaluations
+    1
+    """
+    def __init__(self, system, full_fraction=0.5):
+        """Sets class attributes and returns reference of the class object
+
+        INPUTS
+        ======
+        system:         ReactionSystem
+        full_fraction:  float, default 0.5
+                        Fraction of changed reactions above which all
+                        progress rates are computed again
+        """
+        self.system = system
+        self.full_fraction = full_fraction
+        # Reactions whose third-body concentration depends on every species
+        self._all_species_reactions = np.flatnonzero(system.third_body & (system.efficiency_default != 0))
+        self.full_evaluations = 0
+        self.partial_evaluations = 0
+        self.reused_evaluations = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets the previous state, the next call computes all rates"""
+        self._concs = None
+        self._T = None
+        self._kf = None
+        self._kb = None
+        self._progress = None
+        self._rates = None
+
+    def _coeffs(self, T):
+        """Computes the forward and backward rate coefficients at T"""
+        system = self.system
+        kf = system._forward_coeffs(T)
+        if np.any(kf < 0):
+            system._validate_progress_inputs(kf, np.zeros(0))
+        kb = np.zeros(len(system))
+        rev = system.reversible
+        if np.any(rev):
+            kb[rev] = kf[rev] / system.equilibrium_coeffs(T)[rev]
+        self._kf, self._kb, self._T = kf, kb, T
+
+    def _evaluate(self, concs, reactions=None):
+        """Returns the progress rates of the given reactions, by default all"""
+        system = self.system
+        kf, kb, rev = self._kf, self._kb, system.reversible
+        if reactions is not None:
+            kf, kb, rev = kf[reactions], kb[reactions], rev[reactions]
+        if system._pressure_dependent:
+            factor = np.exp(system._pressure_factor(concs, self._T, reactions=reactions))
+            kf, kb = kf * factor, kb * factor
+
+        progress = kf * system.stoich_react.product(concs, reactions)
+        if np.any(rev):
+            progress[rev] -= kb[rev] * system.stoich_prod.product(concs, reactions)[rev]
+        return progress
+
+    def _update(self, concs, T):
+        """Brings the stored progress and reaction rates to (concs, T)"""
+        system = self.system
+        concs = np.array(concs, dtype=float)
+        if concs.shape != (len(system.order),):
+            raise ValueError("Concentration length does not match number of species!")
+        if np.any(concs < 0):
+            raise ValueError('Concentration should not be Negative!')
+        if T <= 0:
+            raise ValueError('Temperature should be positive!')
+        T = float(T)
+
+        if self._progress is None or T != self._T:
+            self._coeffs(T)
+            changed = None
+        else:
+            species = np.flatnonzero(concs != self._concs)
+            if len(species) == 0:
+                self.reused_evaluations += 1
+                return
+            changed = np.union1d(system.stoich_react.species_reactions(species),
+                                 system.stoich_prod.species_reactions(species))
+            if system._pressure_dependent:
+                changed = np.union1d(changed, system.efficiencies.species_reactions(species))
+                changed = np.union1d(changed, self._all_species_reactions)
+            if len(changed) > self.full_fraction * len(system):
+                changed = None
+
+        if changed is None:
+            self._progress = self._evaluate(concs)
+            self._rates = system.stoich_net.scatter(self._progress)
+            self.full_evaluations += 1
+        else:
+            progress = self._evaluate(concs, changed)
+            species, _, delta = system.stoich_net.matmul_triplets(
+                changed, np.zeros(len(changed), dtype=np.intp), progress - self._progress[changed])
+            self._rates += np.bincount(species, delta, minlength=len(system.order))
+            self._progress[changed] = progress
+            self.partial_evaluations += 1
+        self._concs = concs
+
+    def progress_rate(self, concs, T):
+        """Returns the progress rate of each reaction
+
+        INPUTS
+        ======
+        concs:  list of floats
+                Concentrations
+                Must be positive
+        T:      float
+                Temperature
+                Must be positive
+
+        RETURNS:
+        ========
+        omega:  numpy array of floats
+                size: number of reactions
+        """
+        self._update(concs, T)
+        return self._progress.copy()
+
+    def reaction_rate(self, concs, T):
+        """Returns the reaction rate of each species
+
+        INPUTS
+        ======
+        concs:  list of floats
+                Concentrations
+                Must be positive
+        T:      float
+                Temperature
+                Must be positive
+
+        RETURNS:
+        ========
+        f:      numpy array of floats
+                size: number of species
+        """
+        self._update(concs, T)
+        return self._rates.copy()
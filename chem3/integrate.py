@@ -0,0 +1,344 @@
+"""
+This is a module to integrate the species concentrations (and temperature)
+of a constant-volume reactor in time, using the reaction rates of a
+ReactionSystem from the chemkin.py module also found in this library.
+
+Reacting systems are stiff, so the integration uses the implicit, adaptive
+BDF or Radau methods of scipy.integrate.solve_ivp. The right hand side is
+evaluated with ReactionSystem.reaction_rate_batch, and the solver uses the
+analytical (optionally sparse) Jacobian of ReactionSystem.jacobian. With
+jacobian='numerical', the finite difference Jacobian columns requested by
+the solver are computed in a single batched call.
+"""
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+
+class ReactorSolution():
+    """Result of Reactor.integrate
+
+    ATRIBUTES:
+    =========
+    t:          numpy array of floats, shape (n_t,)
+                Time points
+    concs:      numpy array of floats, shape (n_t, number of species)
+                Species concentrations at each time point
+    T:          numpy array of floats, shape (n_t,)
+                Temperature at each time point
+    t_events:   list of numpy arrays
+                Times at which each event was detected
+    concs_events, T_events: lists of numpy arrays
+                State at each detected event
+    status:     int
+                -1 if the integration failed, 0 if t_end was reached and
+                1 if a terminal event occured
+    message:    str
+                Description of the termination reason
+    nfev, njev, nlu: int
+                Number of right hand side and Jacobian evaluations and
+                of LU decompositions
+
+    METHODS:
+    =======
+    .__call__: returns the dense output (concs, T) at given times
+    """
+    def __init__(self, result, reactor):
+        self._result = result
+        self._reactor = reactor
+        self._T_fixed = reactor.T
+        self.t = result.t
+        self.concs, self.T = reactor.split_state(result.y.T, self._T_fixed)
+        self.t_events = result.t_events if result.t_events is not None else []
+        self.concs_events, self.T_events = [], []
+        for y in (result.y_events if result.y_events is not None else []):
+            concs, T = reactor.split_state(np.reshape(y, (-1, reactor.n_state)), self._T_fixed)
+            self.concs_events.append(concs)
+            self.T_events.append(T)
+        self.status = result.status
+        self.message = result.message
+        self.nfev = result.nfev
+        self.njev = result.njev
+        self.nlu = result.nlu
+
+    @property
+    def success(self):
+        """Whether the integration reached t_end or a terminal event"""
+        return self.status >= 0
+
+    def __call__(self, t):
+        """Returns the interpolated state at time(s) t
+
+        INPUTS
+        ======
+        t:      float or array of floats
+                Times within the integration interval
+
+        RETURNS:
+        =======
+        concs:  numpy array of floats, shape (..., number of species)
+        T:      float or numpy array of floats, shape (...)
+        """
+        if self._result.sol is None:
+            raise ValueError("Dense output was not requested, integrate with dense_output=True")
+        return self._reactor.split_state(np.moveaxis(self._result.sol(t), 0, -1), self._T_fixed)
+
+
+class Reactor():
+    """Constant-volume, ideal gas reactor
+
+    ATRIBUTES:
+    =========
+    system:     ReactionSystem
+                Reactions and species thermodynamics of the reactor
+    energy:     str
+                'isothermal' keeps the temperature fixed
+                'adiabatic' also integrates the temperature, from the
+                conservation of internal energy
+    method:     str
+                Implicit integration method of solve_ivp, 'BDF' or 'Radau'
+    jacobian:   str
+                'analytical', 'sparse' or 'numerical'
+    T:          float
+                Temperature of an isothermal reactor, set by integrate
+
+    METHODS:
+    =======
+    .__init__: init attributes
+    .rhs: returns the time derivative of the reactor state
+    .jac: returns the Jacobian of rhs
+    .integrate: integrates the reactor state in time
+    .split_state: splits reactor states into concentrations and temperatures
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> from chem3.chemkin import ReactionSystem
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    >>> reactor = Reactor(system, 'isothermal')
+    >>> sol = reactor.integrate([2., 1., .5, 1., 1.], 1500, 1e-3)
+    >>> sol.success
+    True
+    """
+    ENERGY = ('isothermal', 'adiabatic')
+    METHODS = ('BDF', 'Radau', 'LSODA')
+    JACOBIANS = ('analytical', 'sparse', 'numerical')
+
+    def __init__(self, system, energy='isothermal', method='BDF', jacobian='analytical'):
+        """Sets class attributes and returns reference of the class object
+
+        INPUTS
+        ======
+        system:     ReactionSystem
+        energy:     str, default 'isothermal'
+                    Either 'isothermal' or 'adiabatic'
+        method:     str, default 'BDF'
+                    Stiff integration method, one of 'BDF', 'Radau', 'LSODA'
+        jacobian:   str, default 'analytical'
+                    'analytical' uses ReactionSystem.jacobian, 'sparse' its
+                    CSR output (not supported by 'LSODA') and 'numerical'
+                    lets the solver use batched finite differences
+        """
+        if energy not in self.ENERGY:
+            raise ValueError("Unknown energy equation {0!r}, must be one of {1}".format(energy, self.ENERGY))
+        if method not in self.METHODS:
+            raise ValueError("Unknown integration method {0!r}, must be one of {1}".format(method, self.METHODS))
+        if jacobian not in self.JACOBIANS:
+            raise ValueError("Unknown Jacobian {0!r}, must be one of {1}".format(jacobian, self.JACOBIANS))
+
+        self.system = system
+        self.energy = energy
+        self.method = method
+        self.jacobian = jacobian
+        self.n_species = len(system.order)
+        self.n_state = self.n_species + (energy == 'adiabatic')
+        self.T = None
+
+    def split_state(self, y, T=None):
+        """Splits reactor states into concentrations and temperatures
+
+        INPUTS
+        ======
+        y:      numpy array of floats, shape (..., n_state)
+        T:      float, optional
+                Temperature of isothermal reactors, by default the
+                temperature of the last integration
+
+        RETURNS:
+        =======
+        concs:  numpy array of floats, shape (..., number of species)
+        T:      numpy array of floats, shape (...)
+        """
+        y = np.asarray(y, dtype=float)
+        if self.energy == 'adiabatic':
+            return y[..., :-1], y[..., -1]
+        return y, np.full(y.shape[:-1], self.T if T is None else T)
+
+    def rhs(self, t, y):
+        """Returns the time derivative of the reactor state
+
+        Small negative concentrations produced by the solver are clipped to
+        zero before the reaction rates are evaluated.
+
+        INPUTS
+        ======
+        t:      float
+                Time
+        y:      numpy array of floats, shape (n_state,) or (n_state, k)
+                Reactor state(s): concentrations, followed by the
+                temperature for adiabatic reactors
+
+        RETURNS:
+        =======
+        dydt:   numpy array of floats, same shape as y
+        """
+        y = np.asarray(y, dtype=float)
+        states = np.atleast_2d(y.T)
+        concs = np.maximum(states[:, :self.n_species], 0.0)
+
+        if self.energy == 'isothermal':
+            dydt = self.system.reaction_rate_batch(concs, self.T)
+        else:
+            T = states[:, -1]
+            rates = self.system.reaction_rate_batch(concs, T)
+            dydt = np.empty_like(states)
+            dydt[:, :-1] = rates
+            dydt[:, -1] = self.temperature_rate(concs, T, rates)
+
+        return dydt.T if y.ndim == 2 else dydt[0]
+
+    def jac(self, t, y):
+        """Returns the Jacobian of rhs with respect to the reactor state
+
+        For adiabatic reactors, the last row differentiates temperature_rate
+        using d(H/(RT))/dT = (Cp/R - H/(RT)) / T.
+
+        INPUTS
+        ======
+        t:      float
+                Time
+        y:      numpy array of floats, shape (n_state,)
+                Reactor state
+
+        RETURNS:
+        =======
+        J:      numpy array or scipy.sparse.csr_matrix of floats
+                shape: (n_state, n_state)
+        """
+        sparse = self.jacobian == 'sparse'
+        concs = np.maximum(np.asarray(y[:self.n_species], dtype=float), 0.0)
+        if self.energy == 'isothermal':
+            return self.system.jacobian(concs, self.T, temperature=False, sparse=sparse)
+
+        T = float(y[-1])
+        J = self.system.jacobian(concs, T, temperature=True, sparse=sparse)
+        rates = self.system.reaction_rate(concs, T)
+        Cp_R, H_RT, _ = self.system.thermo(T)
+        dH_RT = (Cp_R - H_RT) / T
+
+        num = np.dot(H_RT - 1.0, rates)
+        den = np.dot(concs, Cp_R - 1.0)
+        dnum = J.T.dot(H_RT - 1.0)
+        dnum[-1] += np.dot(dH_RT, rates)
+        dden = np.append(Cp_R - 1.0, np.dot(concs, self.system.dCp_over_R_dT(T)))
+
+        row = -T * (dnum * den - num * dden) / den**2
+        row[-1] -= num / den
+
+        if sparse:
+            import scipy.sparse
+            return scipy.sparse.vstack([J, scipy.sparse.csr_matrix(row)]).tocsr()
+        return np.vstack([J, row])
+
+    def temperature_rate(self, concs, T, rates):
+        """Returns dT/dt of a constant-volume, adiabatic reactor
+
+        Conservation of internal energy gives
+        dT/dt = -T sum_i (H_i/(RT) - 1) f_i / sum_i c_i (Cp_i/R - 1)
+
+        INPUTS
+        ======
+        concs:  numpy array of floats, shape (k, number of species)
+        T:      numpy array of floats, shape (k,)
+        rates:  numpy array of floats, shape (k, number of species)
+                Reaction rate of each species
+
+        RETURNS:
+        =======
+        dTdt:   numpy array of floats, shape (k,)
+        """
+        Cp_R, H_RT, _ = self.system.thermo(T)
+        return -T * np.sum((H_RT - 1.0) * rates, axis=-1) / np.sum(concs * (Cp_R - 1.0), axis=-1)
+
+    def _wrap_event(self, event):
+        """Converts an event(t, concs, T) into an event(t, y) for solve_ivp"""
+        def wrapped(t, y):
+            concs, T = self.split_state(y)
+            return event(t, concs, float(T))
+        wrapped.terminal = getattr(event, 'terminal', False)
+        wrapped.direction = getattr(event, 'direction', 0)
+        return wrapped
+
+    def integrate(self, concs, T, t_end, t_eval=None, events=None, dense_output=True,
+                  rtol=1e-6, atol=1e-12, first_step=None, max_step=np.inf):
+        """Integrates the reactor state from time 0 to t_end
+
+        INPUTS
+        ======
+        concs:          list of floats
+                        Initial concentrations
+                        Must be positive
+        T:              float
+                        Initial (for isothermal reactors, constant) temperature
+                        Must be positive
+        t_end:          float
+                        Final time
+        t_eval:         array of floats, optional
+                        Times at which to store the solution, by default the
+                        steps chosen by the adaptive step control
+        events:         callable or list of callables event(t, concs, T), optional
+                        Events are located where event returns zero. As in
+                        solve_ivp, an event may have the attributes terminal
+                        and direction
+        dense_output:   boolean, default True
+                        Whether the solution can be interpolated at any time
+        rtol, atol:     floats
+                        Relative and absolute tolerances of the step control
+        first_step, max_step: floats, optional
+                        Initial and maximal step sizes
+
+        RETURNS:
+        =======
+        solution:       ReactorSolution
+        """
+        concs = np.asarray(concs, dtype=float)
+        if concs.shape != (self.n_species,):
+            raise ValueError("Concentration length does not match number of species!")
+        if np.any(concs < 0):
+            raise ValueError('Concentration should not be Negative!')
+        if T <= 0:
+            raise ValueError('Temperature should be positive!')
+
+        if self.energy == 'adiabatic':
+            y0 = np.append(concs, float(T))
+        else:
+            self.T = float(T)
+            y0 = concs
+
+        if events is not None:
+            events = [self._wrap_event(e) for e in (events if isinstance(events, (list, tuple)) else [events])]
+
+        options = {'max_step': max_step}
+        if first_step is not None:
+            options['first_step'] = first_step
+        if self.jacobian != 'numerical':
+            options['jac'] = self.jac
+        elif self.method != 'LSODA':
+            options['vectorized'] = True
+
+        result = solve_ivp(self.rhs, (0.0, t_end), y0, method=self.method, t_eval=t_eval,
+                           events=events, dense_output=dense_output, rtol=rtol, atol=atol,
+                           **options)
+        return ReactorSolution(result, self)
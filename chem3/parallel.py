@@ -0,0 +1,185 @@
+"""
+This is a module to evaluate the reaction rates of large batches of states
+of a ReactionSystem from the chemkin.py module on several cores.
+
+The batch is split into chunks of rows that are evaluated by a pool of
+worker processes. Each worker receives the ReactionSystem once, when it
+starts, and the concentrations, temperatures and rates are exchanged
+through shared memory instead of being pickled with every task.
+"""
+
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ReactionSystem of each worker process, set by _init_worker
+_worker_system = None
+
+
+def _init_worker(system):
+    """Stores the ReactionSystem sent once to each worker process"""
+    global _worker_system
+    _worker_system = system
+
+
+def _evaluate_chunk(task):
+    """Evaluates rows start:stop of the shared batch in a worker process"""
+    names, shapes, start, stop = task
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        concs, T, out = [np.ndarray(shape, dtype=float, buffer=shm.buf) for shm, shape in zip(blocks, shapes)]
+        out[start:stop] = _worker_system.reaction_rate_batch(concs[start:stop], T[start:stop])
+        # the views must be released before the blocks are closed
+        del concs, T, out
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+class ParallelEvaluator():
+    """Evaluates ReactionSystem.reaction_rate_batch on a pool of processes
+
+    ATRIBUTES:
+    =========
+    system:     ReactionSystem
+    workers:    int
+                Number of worker processes
+    chunk_size: int
+                Number of states per task
+
+    METHODS:
+    =======
+    .__init__: init attributes
+    .reaction_rate_batch: returns the reaction rates of a batch of states
+    .close: shuts the worker processes down
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> from chem3.chemkin import ReactionSystem
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    >>> with ParallelEvaluator(system, workers=2, chunk_size=2) as evaluator:
+    ...     rates = evaluator.reaction_rate_batch(np.ones((5, 5)), np.full(5, 1500.))
+    >>> rates.shape
+    (5, 5)
+    """
+    def __init__(self, system, workers=None, chunk_size=4096, start_method=None):
+        """Sets class attributes and returns reference of the class object
+
+        INPUTS
+        ======
+        system:         ReactionSystem
+        workers:        int, optional
+                        Number of worker processes, by default the number
+                        of cores. With workers <= 1 all batches are
+                        evaluated serially in this process
+        chunk_size:     int, default 4096
+                        Number of states per task
+                        Must be positive
+        start_method:   str, optional
+                        multiprocessing start method ('fork', 'spawn',
+                        'forkserver'), by default the platform default
+        """
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be positive!")
+
+        self.system = system
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.start_method = start_method
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_pool(self):
+        """returns the worker pool, started on first use"""
+        if self._pool is None:
+            context = multiprocessing.get_context(self.start_method)
+            self._pool = context.Pool(self.workers, initializer=_init_worker, initargs=(self.system,))
+        return self._pool
+
+    def close(self):
+        """Shuts the worker processes down"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _chunks(self, n):
+        """returns the (start, stop) rows of each task"""
+        return [(start, min(start + self.chunk_size, n)) for start in range(0, n, self.chunk_size)]
+
+    def _serial(self, concs, T, out):
+        """Evaluates the batch chunk by chunk in this process"""
+        for start, stop in self._chunks(len(concs)):
+            out[start:stop] = self.system.reaction_rate_batch(concs[start:stop], T[start:stop])
+        return out
+
+    def reaction_rate_batch(self, concs, T, out=None):
+        """Returns the reaction rates of a batch of states
+
+        Batches no larger than one chunk, and evaluators with a single
+        worker, are evaluated serially in this process. The result does not
+        depend on the number of workers or the chunk size.
+
+        INPUTS
+        ======
+        concs:  array of floats, shape (N, number of species)
+                Concentrations of each state
+                Must be positive
+        T:      float or array of floats, shape (N,)
+                Temperature of each state
+                Must be positive
+        out:    numpy array of floats, shape (N, number of species), optional
+                Preallocated array the rates are written to
+
+        RETURNS:
+        ========
+        out:    numpy array of floats, shape (N, number of species)
+        """
+        concs = np.asarray(concs, dtype=float)
+        if concs.ndim != 2 or concs.shape[1] != len(self.system.order):
+            raise ValueError("Concentrations must have shape (N, number of species)!")
+        T = np.broadcast_to(np.asarray(T, dtype=float), concs.shape[:1])
+        if out is None:
+            out = np.empty(concs.shape)
+        elif out.shape != concs.shape:
+            raise ValueError("Output must have shape (N, number of species)!")
+
+        chunks = self._chunks(len(concs))
+        if self.workers <= 1 or len(chunks) <= 1:
+            return self._serial(concs, T, out)
+
+        shapes = [concs.shape, T.shape, out.shape]
+        blocks = []
+        try:
+            try:
+                for shape in shapes:
+                    blocks.append(shared_memory.SharedMemory(create=True, size=max(8 * int(np.prod(shape)), 1)))
+                pool = self._get_pool()
+            except OSError:
+                # no shared memory or processes available on this platform
+                return self._serial(concs, T, out)
+
+            shared_concs, shared_T, shared_out = [np.ndarray(shape, dtype=float, buffer=shm.buf)
+                                                  for shm, shape in zip(blocks, shapes)]
+            shared_concs[...] = concs
+            shared_T[...] = T
+            names = [shm.name for shm in blocks]
+            pool.map(_evaluate_chunk, [(names, shapes, start, stop) for start, stop in chunks])
+            out[...] = shared_out
+            # the views must be released before the blocks are closed
+            del shared_concs, shared_T, shared_out
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+        return out
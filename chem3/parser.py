@@ -6,8 +6,12 @@ An example of a properly formated reactions .xml file can be found in the
 main directory of this library, titled 'rxns.xml'
 """
 
-import xml.etree.ElementTree as ET
+import os
 import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
+
 import numpy as np
 import chem3.chemkin
 
@@ -34,9 +38,91 @@ def string_to_dict(s):
     return ret
 
 
+class MissingSpeciesError(ValueError):
+    """Raised when species are not found in the coefficient database
+
+    ATRIBUTES:
+    =========
+    db_name:    str
+                Database name storing coefficients
+    missing:    dict
+                Missing species names for each table ('LOW', 'HIGH')
+    """
+    def __init__(self, db_name, missing):
+        self.db_name = db_name
+        self.missing = missing
+        super().__init__('Species not found in {0}: {1}'.format(
+            db_name, '; '.join('{0}: {1}'.format(table, ', '.join(names))
+                               for table, names in sorted(missing.items()))))
+
+    @property
+    def species(self):
+        """returns all missing species names, in order of first appearance"""
+        names = []
+        for table_names in self.missing.values():
+            names += [name for name in table_names if name not in names]
+        return names
+
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+# Maximum number of parameters of a single query, below SQLite's limit
+_MAX_QUERY_PARAMS = 500
+
+
+def _connect(db_name):
+    """returns a process-wide, in-memory copy of the database db_name
+
+    The copy is made once per process and reused by every later call.
+    It is keyed by the path, modification time and size of the file, so
+    a modified database is read again.
+    """
+    path = os.path.abspath(db_name)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, os.getpid())
+    with _connections_lock:
+        db = _connections.get(key)
+        if db is None:
+            source = sqlite3.connect('file:{0}?mode=ro'.format(quote(path)), uri=True)
+            db = sqlite3.connect(':memory:', check_same_thread=False)
+            try:
+                source.backup(db)
+            finally:
+                source.close()
+            _connections[key] = db
+    return db
+
+
+def clear_connections():
+    """closes the process-wide database copies made by get_coeffs"""
+    with _connections_lock:
+        for db in _connections.values():
+            db.close()
+        _connections.clear()
+
+
+def _fetch_rows(db, table, species):
+    """returns {species_name: row} of table for all requested species, with
+    one parameterized query per chunk of _MAX_QUERY_PARAMS names
+    """
+    rows = {}
+    names = list(dict.fromkeys(species))
+    for start in range(0, len(names), _MAX_QUERY_PARAMS):
+        chunk = names[start:start + _MAX_QUERY_PARAMS]
+        query = 'SELECT * FROM {0} WHERE SPECIES_NAME IN ({1})'.format(table, ', '.join('?' * len(chunk)))
+        with _connections_lock:
+            rows.update((row[0], row) for row in db.execute(query, chunk))
+    return rows
+
+
 def get_coeffs(db_name, species):
     """reads the database and gets coefficients 
 
+    The LOW and HIGH rows of all species are fetched with one
+    parameterized query each, from a process-wide in-memory copy of the
+    database.
+
     INPUTS:
     =======
     db_name:    str
@@ -44,10 +130,6 @@ def get_coeffs(db_name, species):
     species:    array of str
                 A list of species to ensure coefficient 
                 and matrix will use the same order of species array
-    temp_mid:   numpy array of float
-                temperature cutoff between high, low
-    temp_range: numpy array of float
-                appropriate temperature range of each species in the reaction
 
     RETURNS:
     =======
@@ -55,6 +137,14 @@ def get_coeffs(db_name, species):
                 Coefficient matrix for low temperature reactions
     high:       numpy array
                 Coefficient matrix for high temperature reactions
+    temp_mid:   numpy array of float
+                temperature cutoff between high, low
+    temp_range: numpy array of float
+                appropriate temperature range of each species in the reaction
+
+    RAISES:
+    =======
+    MissingSpeciesError if any species is missing from either table
 
     EXAMPLES:
     ========
@@ -65,29 +155,76 @@ def get_coeffs(db_name, species):
     >>> high[2][2]
     -1.99591964e-15
     """
+    db = _connect(db_name)
+    tables = {table: _fetch_rows(db, table, species) for table in ('LOW', 'HIGH')}
 
-    db = sqlite3.connect(db_name)
-    cursor = db.cursor()
-
-    def get_species_coeffs(species_name, temp_range):
-        query = 'SELECT * FROM ' + temp_range.upper() + ' WHERE species_name = "' + species_name + '"'
-        q = cursor.execute(query).fetchall()
-        if len(q) == 0: 
-            print('Warning, did not find rows given species_name and temp_range. Please double check.')
-            return []
-        return q[0][1], q[0][2], list(q[0][3:])  # t_min, t_high, coeffs
-
-    low = np.zeros((len(species), 7))
-    high = np.zeros((len(species), 7))
-    temp_mid = np.zeros(len(species)) # temperature cutoff
-    temp_range = np.zeros((len(species), 2)) # (t_low, t_high) for each species
-    for i, s in enumerate(species):
-        temp_range[i][0], temp_mid[i], low[i], = get_species_coeffs(s, 'low')
-        _, temp_range[i][1], high[i] = get_species_coeffs(s, 'high')
-    db.close()
+    missing = {table: [s for s in species if s not in rows] for table, rows in tables.items()}
+    missing = {table: names for table, names in missing.items() if names}
+    if missing:
+        raise MissingSpeciesError(db_name, missing)
+
+    # rows are (species_name, t_min, t_max, coeffs...)
+    low_rows = np.array([tables['LOW'][s][1:] for s in species], dtype=float).reshape(-1, 9)
+    high_rows = np.array([tables['HIGH'][s][1:] for s in species], dtype=float).reshape(-1, 9)
+
+    low = low_rows[:, 2:]
+    high = high_rows[:, 2:]
+    temp_mid = low_rows[:, 1] # temperature cutoff
+    temp_range = np.column_stack([low_rows[:, 0], high_rows[:, 1]]) # (t_low, t_high) for each species
     return low, high, temp_mid, temp_range
 
 
+def _parse_reaction(reaction, species_table=None):
+    """returns a Reaction built from a <reaction> element
+
+    Besides the rate coefficient block, the rateCoeff element of threeBody
+    and falloff reactions may hold a low-pressure limit block with
+    name="k0", an <efficiencies default="..."> element listing species
+    efficiencies as 'H2:2.5 H2O:12' and a <falloff type="Troe"> element
+    with the Troe parameters alpha T3 T1 [T2]. Duplicate reactions are
+    marked with duplicate="yes".
+
+    INPUTS:
+    =======
+    reaction:   xml.etree.ElementTree.Element
+                <reaction> element of a reactionData block
+    species_table: SpeciesTable, optional
+                Table the species of the reaction are interned in
+
+    RETURNS:
+    =======
+    reaction:   Reaction
+    """
+    reactants = string_to_dict(reaction.find('reactants').text)
+    products = string_to_dict(reaction.find('products').text)
+    reversible = reaction.get('reversible') != 'no'
+    reac_type = reaction.get('type')
+    reac_id = reaction.get('id')
+    coefs_block = reaction.find('rateCoeff')
+    equation = reaction.find('equation').text
+    coef = {}
+    coef_type = None
+    pressure = {}
+    for params_block in coefs_block:
+        if params_block.tag == 'efficiencies':
+            pressure['efficiencies'] = string_to_dict(params_block.text or '')
+            pressure['default_efficiency'] = float(params_block.get('default', 1.0))
+        elif params_block.tag == 'falloff':
+            pressure['falloff'] = (params_block.get('type', 'Lindemann'),
+                                   tuple(float(x) for x in (params_block.text or '').split()))
+        elif params_block.get('name') == 'k0':
+            pressure['low_coef'] = {param.tag: float(param.text) for param in params_block}
+        else:
+            coef_type = params_block.tag
+            for param in params_block:
+                coef[param.tag] = float(param.text)
+    return chem3.chemkin.Reaction(reactants, products,
+                                  reversible, reac_type,
+                                  reac_id, coef_type, coef, equation=equation,
+                                  duplicate=reaction.get('duplicate') == 'yes',
+                                  species_table=species_table, **pressure)
+
+
 def read_data(filename, db_name):
     """reads data from .xml reaction file
 
@@ -127,30 +264,13 @@ def read_data(filename, db_name):
         data['low'], data['high'], data['T_cutoff'], data['T_range'] = \
         get_coeffs(db_name, data['species'])
         
-        # get reaction info
+        # get reaction info, with species interned in the order of the phase
+        species_table = chem3.chemkin.SpeciesTable(data['species'])
         data['reactions'] = {}
         for reaction_data in rxns.findall('reactionData'):
             reaction_id = reaction_data.get('id')
-            reactions = []
-            for reaction in reaction_data.findall('reaction'):
-                reactants = string_to_dict(reaction.find('reactants').text)
-                products = string_to_dict(reaction.find('products').text)
-                reversible = reaction.get('reversible') != 'no'
-                reac_type = reaction.get('type')
-                reac_id = reaction.get('id')
-                coefs_block = reaction.find('rateCoeff')
-                equation = reaction.find('equation').text
-                coef = {}
-                for arr in coefs_block:
-                    coef_type = arr.tag
-                    params_block = coefs_block.find(coef_type)
-                    for param in params_block:
-                        key = param.tag
-                        coef[key] = float(params_block.find(key).text)
-                reactions.append(chem3.chemkin.Reaction(reactants, products,
-                                         reversible, reac_type,
-                                         reac_id, coef_type, coef, equation=equation))
-                data['reactions'][reaction_id] = reactions
+            data['reactions'][reaction_id] = [_parse_reaction(reaction, species_table)
+                                              for reaction in reaction_data.findall('reaction')]
 
     except AttributeError as ex:
         print(ex)
@@ -160,4 +280,148 @@ def read_data(filename, db_name):
     return data
 
 
+def read_data_stream(filename, db_name):
+    """reads data from .xml reaction file incrementally
+
+    Same as read_data, but the file is read with ET.iterparse: each
+    reaction is built as soon as its element is complete, and the element
+    is then discarded, so the whole tree is never held in memory.
+
+    INPUTS:
+    =======
+    filename:   str
+                File name of .xml file to parse
+    db_name:    str
+                Database name storing coefficients
+
+    RETURNS:
+    =======
+    data: dictonary of reactions and species for each reaction in the file
+    (keys = ['reactions', 'species', 'low', 'high', 'T_cutoff', 'T_range'])
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> db_name = os.path.join(test_data_dir, 'nasa.sqlite')
+    >>> file_name = os.path.join(test_data_dir, 't.xml')
+    >>> data = read_data_stream(file_name, db_name)
+    >>> len(data['reactions']['test_mechanism'])
+    3
+    """
+    data = {'reactions': {}}
+    parents = []
+    reactions = None
+    species_table = chem3.chemkin.SpeciesTable()
+
+    try:
+        for event, elem in ET.iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
+                if elem.tag == 'reactionData':
+                    reactions = data['reactions'][elem.get('id')] = []
+                continue
+
+            parents.pop()
+            if elem.tag == 'speciesArray' and 'species' not in data:
+                data['species'] = elem.text.split()
+                for name in data['species']:
+                    species_table.intern(name)
+            elif elem.tag == 'reaction' and reactions is not None:
+                reactions.append(_parse_reaction(elem, species_table))
+                parents[-1].remove(elem)
+            elif elem.tag == 'reactionData':
+                reactions = None
+                parents[-1].remove(elem)
+
+        # get coefficients
+        data['low'], data['high'], data['T_cutoff'], data['T_range'] = \
+        get_coeffs(db_name, data['species'])
+
+    except (AttributeError, KeyError) as ex:
+        print(ex)
+        print('Warning: please check your xml format, ' +
+              'returns empty data because format doesn\'t match')
+        return {}
+    return data
+
+
+def _format_number(x):
+    """returns the shortest text of a float that reads back exactly"""
+    x = float(x)
+    return str(int(x)) if x.is_integer() and abs(x) < 1e15 else repr(x)
+
+
+def _indent(element, level=0, space='    '):
+    """indents the subelements of element in place, one level per depth"""
+    children = list(element)
+    if not children:
+        return
+    inner = '\n' + space * (level + 1)
+    if not element.text or not element.text.strip():
+        element.text = inner
+    for child in children:
+        _indent(child, level + 1, space)
+        if not child.tail or not child.tail.strip():
+            child.tail = inner
+    children[-1].tail = '\n' + space * level
+
+
+def write_data(filename, reactions, species, reaction_data_id='reaction_mechanism'):
+    """writes reactions to an .xml reaction file that read_data can read
+
+    INPUTS:
+    =======
+    filename:           str
+                        File name of .xml file to write
+    reactions:          list of Reaction()
+    species:            list of str
+                        Species of the phase
+    reaction_data_id:   str
+                        id of the reactionData block
+
+    EXAMPLES:
+    ========
+    >>> import os, tempfile
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> db_name = os.path.join(test_data_dir, 'nasa.sqlite')
+    >>> data = read_data(os.path.join(test_data_dir, 't.xml'), db_name)
+    >>> file_name = os.path.join(tempfile.mkdtemp(), 'copy.xml')
+    >>> write_data(file_name, data['reactions']['test_mechanism'], data['species'], 'test_mechanism')
+    >>> len(read_data(file_name, db_name)['reactions']['test_mechanism'])
+    3
+    """
+    def species_text(d):
+        return ' '.join('{0}:{1}'.format(name, _format_number(nu)) for name, nu in d.items())
+
+    root = ET.Element('ctml')
+    phase = ET.SubElement(root, 'phase')
+    ET.SubElement(phase, 'speciesArray').text = ' {0} '.format(' '.join(species))
+    reaction_data = ET.SubElement(root, 'reactionData', id=reaction_data_id)
+    for reac in reactions:
+        reaction = ET.SubElement(reaction_data, 'reaction', reversible='yes' if reac.reversible else 'no',
+                                 type=reac.reac_type or 'Elementary', id=reac.reac_id)
+        if reac.duplicate:
+            reaction.set('duplicate', 'yes')
+        ET.SubElement(reaction, 'equation').text = reac.equation
+        rate_coeff = ET.SubElement(reaction, 'rateCoeff')
+        params = ET.SubElement(rate_coeff, reac.coef_type)
+        for name, value in reac.coef.items():
+            ET.SubElement(params, name).text = _format_number(value)
+        if reac.low_coef is not None:
+            params = ET.SubElement(rate_coeff, 'modifiedArrhenius' if 'b' in reac.low_coef else 'Arrhenius',
+                                   name='k0')
+            for name, value in reac.low_coef.items():
+                ET.SubElement(params, name).text = _format_number(value)
+        if reac.third_body:
+            ET.SubElement(rate_coeff, 'efficiencies', default=_format_number(reac.default_efficiency)).text = \
+                species_text(reac.efficiencies)
+        if reac.falloff is not None:
+            ET.SubElement(rate_coeff, 'falloff', type=reac.falloff[0]).text = \
+                ' '.join(_format_number(x) for x in reac.falloff[1])
+        ET.SubElement(reaction, 'reactants').text = species_text(reac.reactants)
+        ET.SubElement(reaction, 'products').text = species_text(reac.products)
 
+    _indent(root)
+    tree = ET.ElementTree(root)
+    tree.write(filename, encoding='unicode', xml_declaration=True)
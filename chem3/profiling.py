@@ -0,0 +1,142 @@
+"""
+This is a module to instrument the stages of the rate computations of the
+ReactionSystem class of the chemkin.py module also found in this library.
+
+A Profiler accumulates, for each stage, the number of calls, the wall time
+and, while tracemalloc is tracing, the memory allocated. Stages are
+inclusive: e.g. the 'equilibrium' stage includes the 'thermo' calls it
+makes.
+
+Memory is measured with tracemalloc, which also sees the numpy array
+buffers. Tracing slows the computations down, so it is left to the caller:
+
+>>> import tracemalloc
+>>> tracemalloc.start()
+>>> profiler = Profiler()
+>>> with profiler.stage('thermo'):
+...     buffer = bytearray(10**6)
+>>> profiler.stats()['thermo'].peak_bytes >= 10**6
+True
+>>> tracemalloc.stop()
+
+When tracemalloc is not tracing, the byte counts stay at zero.
+"""
+
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+
+StageStats = namedtuple('StageStats', ['calls', 'seconds', 'allocated_bytes', 'peak_bytes'])
+
+STAGES = ('rate_constants', 'pressure_factor', 'thermo', 'equilibrium',
+          'concentration_products', 'species_rates')
+
+# Peaks of the enclosing stages of each thread, see _Stage
+_open_stages = threading.local()
+
+
+class _Stage():
+    """Context manager timing one call of a stage
+
+    tracemalloc has a single peak, reset on entering every stage; the peak
+    reached before a nested stage is saved on a per-thread stack so that the
+    enclosing stages still see it.
+    """
+    __slots__ = ('_profiler', '_name', '_start', '_traced', '_memory')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._traced = tracemalloc.is_tracing()
+        if self._traced:
+            peaks = _open_stages.__dict__.setdefault('peaks', [])
+            current, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            peaks.append(current)
+            tracemalloc.reset_peak()
+            self._memory = current
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        allocated = peak = 0
+        if self._traced and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peaks = _open_stages.peaks
+            peak = max(peaks.pop(), peak)
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            allocated = current - self._memory
+            peak -= self._memory
+        self._profiler._record(self._name, elapsed, allocated, peak)
+
+
+class Profiler():
+    """Per-stage call counts, wall time and traced memory
+
+    METHODS:
+    =======
+    .stage: returns a context manager recording one call of a stage
+    .stats: returns the StageStats of each stage
+    .as_dict: returns the statistics as plain dicts
+    .reset: sets all statistics back to zero
+
+    EXAMPLES:
+    ========
+    >>> profiler = Profiler()
+    >>> with profiler.stage('thermo'):
+    ...     pass
+    >>> profiler.stats()['thermo'].calls
+    1
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __getstate__(self):
+        """Pickles an empty profiler, statistics stay in this process"""
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def stage(self, name):
+        """Returns a context manager recording one call of stage name"""
+        return _Stage(self, name)
+
+    def _record(self, name, seconds, allocated, peak):
+        with self._lock:
+            calls, total, total_allocated, max_peak = self._stats.get(name, (0, 0.0, 0, 0))
+            self._stats[name] = (calls + 1, total + seconds, total_allocated + allocated,
+                                 max(max_peak, peak))
+
+    def stats(self):
+        """Returns the statistics of each stage
+
+        RETURNS:
+        =======
+        stats:  dict
+                StageStats(calls, seconds, allocated_bytes, peak_bytes) of
+                each recorded stage: allocated_bytes is the total change of
+                the memory traced by tracemalloc over the calls (negative
+                when a stage frees more than it keeps), peak_bytes the
+                largest traced memory reached during one call above its
+                start. Both are zero when tracemalloc is not tracing, and
+                mix the threads when stages run concurrently.
+        """
+        with self._lock:
+            return {name: StageStats(*values) for name, values in self._stats.items()}
+
+    def as_dict(self):
+        """Returns the statistics as {stage: {'calls', 'seconds', 'allocated_bytes', 'peak_bytes'}}"""
+        return {name: stats._asdict() for name, stats in self.stats().items()}
+
+    def reset(self):
+        """Sets all statistics back to zero"""
+        with self._lock:
+            self._stats = {}
@@ -0,0 +1,316 @@
+"""
+This is a module to reduce a ReactionSystem from the chemkin.py module to
+the species and reactions that matter for a set of target species over a
+set of sampled states, with the directed relation graph (DRG) method of
+Lu and Law or its error propagation variant (DRGEP) of Pepiot-Desjardins
+and Pitsch.
+
+For each sampled state, the direct interaction coefficient r_AB measures
+how much of the production and consumption of species A goes through
+reactions involving species B, from the net stoichiometric coefficients
+nu_Aj = nu''_Aj - nu'_Aj and the progress rates q_j:
+
+    DRG:    r_AB = sum_j |nu_Aj q_j| delta_Bj / sum_j |nu_Aj q_j|
+    DRGEP:  r_AB = |sum_j nu_Aj q_j delta_Bj| / max(P_A, C_A)
+
+where delta_Bj is 1 if B takes part in reaction j, and P_A, C_A are the
+production and consumption rates of A. Species are kept if they are
+reached from a target through coefficients above a threshold (DRG), or if
+the largest product of coefficients along a path from a target is above
+the threshold (DRGEP). Reactions are kept if all their species are kept.
+"""
+
+import heapq
+
+import numpy as np
+
+import chem3.parser
+from chem3.chemkin import ReactionSystem
+from chem3.integrate import Reactor
+
+METHODS = ('DRG', 'DRGEP')
+
+
+def sample_states(system, initial, t_end, n_samples=20, energy='adiabatic'):
+    """returns states sampled along reactor trajectories
+
+    INPUTS:
+    =======
+    system:     ReactionSystem
+    initial:    list of (concs, T)
+                Initial state of each trajectory
+    t_end:      float
+                Final time of each trajectory
+    n_samples:  int
+                Number of states sampled along each trajectory, at the
+                integrator steps closest to evenly spaced fractions of the
+                trajectory
+    energy:     str, default 'adiabatic'
+                Energy equation of the reactor, see Reactor
+
+    RETURNS:
+    =======
+    concs:      numpy array of floats, shape (N, number of species)
+    T:          numpy array of floats, shape (N,)
+    """
+    reactor = Reactor(system, energy)
+    all_concs, all_T = [], []
+    for concs, T in initial:
+        sol = reactor.integrate(concs, T, t_end, dense_output=False)
+        steps = np.unique(np.linspace(0, len(sol.t) - 1, n_samples).astype(int))
+        all_concs.append(np.maximum(sol.concs[steps], 0.0))
+        all_T.append(sol.T[steps])
+    return np.concatenate(all_concs), np.concatenate(all_T)
+
+
+def _interaction_terms(system):
+    """returns the sparse terms of the interaction coefficients
+
+    RETURNS:
+    =======
+    species, reactions, coeffs: numpy arrays of ints, ints, floats
+                Nonzero net stoichiometric coefficients nu_Aj, one entry
+                per species and reaction, sorted by reaction
+    pair_entries: numpy array of ints
+                Entry of each (A, B, j) term, one per species B taking part
+                in the reaction j of the entry
+    pair_keys:  numpy array of ints
+                Flat index A * number of species + B of each term
+    """
+    n_species, n_reactions = system.stoich_net.shape
+    net = system.stoich_net
+    keys, inverse = np.unique(net.reactions * n_species + net.species, return_inverse=True)
+    coeffs = np.bincount(inverse.ravel(), net.coeffs, minlength=len(keys))
+    keys, coeffs = keys[coeffs != 0], coeffs[coeffs != 0]
+    reactions, species = np.divmod(keys, n_species)
+
+    # Species taking part in each reaction, delta_Bj = 1
+    taking_part = np.unique(np.concatenate([stoich.reactions[stoich.coeffs != 0] * n_species +
+                                            stoich.species[stoich.coeffs != 0]
+                                            for stoich in (system.stoich_react, system.stoich_prod)]))
+    part_reactions, part_species = np.divmod(taking_part, n_species)
+    part_indptr = np.searchsorted(part_reactions, np.arange(n_reactions + 1))
+
+    counts = part_indptr[reactions + 1] - part_indptr[reactions]
+    pair_entries = np.repeat(np.arange(len(coeffs)), counts)
+    offsets = np.arange(len(pair_entries)) - np.repeat(np.cumsum(counts) - counts, counts)
+    pair_species = part_species[part_indptr[reactions][pair_entries] + offsets]
+    return species, reactions, coeffs, pair_entries, species[pair_entries] * n_species + pair_species
+
+
+def interaction_coefficients(system, concs, T, method='DRG'):
+    """returns the direct interaction coefficients of the species
+
+    The sums over reactions are computed for all sampled states at once
+    from the sparse stoichiometry, one term per species pair sharing a
+    reaction.
+
+    INPUTS:
+    =======
+    system:     ReactionSystem
+    concs:      array of floats, shape (N, number of species)
+                Sampled concentrations
+    T:          array of floats, shape (N,)
+                Sampled temperatures
+    method:     str, default 'DRG'
+                'DRG' or 'DRGEP'
+
+    RETURNS:
+    =======
+    r:          numpy array of floats, shape (number of species, number of species)
+                r[A, B], the largest coefficient over all sampled states
+    """
+    if method not in METHODS:
+        raise ValueError("Unknown reduction method {0!r}, must be one of {1}".format(method, METHODS))
+
+    concs = np.atleast_2d(np.asarray(concs, dtype=float))
+    progress = system._progress(concs, np.broadcast_to(np.asarray(T, dtype=float), concs.shape[:1]))
+    n = len(system.order)
+    species, reactions, coeffs, pair_entries, pair_keys = _interaction_terms(system)
+    keys, pair_index = np.unique(pair_keys, return_inverse=True)
+    pair_index = pair_index.ravel()
+
+    n_samples = len(progress)
+    samples = np.arange(n_samples)[:, np.newaxis]
+
+    def sums(values, index, size):
+        """sums the (N, terms) values into (N, size) by index"""
+        flat = (samples * size + index).ravel()
+        return np.bincount(flat, values.ravel(), minlength=n_samples * size).reshape(n_samples, size)
+
+    # nu_Aj q_j of each sampled state and entry
+    rates = progress[:, reactions] * coeffs
+    if method == 'DRG':
+        num = sums(np.abs(rates)[:, pair_entries], pair_index, len(keys))
+        den = sums(np.abs(rates), species, n)
+    else:
+        num = np.abs(sums(rates[:, pair_entries], pair_index, len(keys)))
+        den = np.maximum(sums(np.clip(rates, 0.0, None), species, n), sums(-np.clip(rates, None, 0.0), species, n))
+    den = den[:, keys // n]
+
+    r = np.zeros(n * n)
+    if n_samples:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r[keys] = np.where(den > 0, num / den, 0.0).max(axis=0)
+    r = r.reshape(n, n)
+    np.fill_diagonal(r, 1.0)
+    return r
+
+
+def important_species(r, targets, threshold, method='DRG'):
+    """returns the indices of the species kept for the given targets
+
+    INPUTS:
+    =======
+    r:          numpy array of floats, shape (number of species, number of species)
+                Interaction coefficients, see interaction_coefficients
+    targets:    list of ints
+                Indices of the target species
+    threshold:  float
+                Species are kept above this coefficient (DRG) or path
+                coefficient (DRGEP)
+    method:     str, default 'DRG'
+
+    RETURNS:
+    =======
+    kept:       numpy array of ints, sorted
+    """
+    if method == 'DRG':
+        kept = set(targets)
+        stack = list(targets)
+        while stack:
+            a = stack.pop()
+            for b in np.flatnonzero(r[a] > threshold):
+                if b not in kept:
+                    kept.add(b)
+                    stack.append(b)
+        return np.array(sorted(kept), dtype=np.intp)
+
+    # Largest product of coefficients along any path from a target,
+    # with Dijkstra's algorithm on -log(r)
+    best = np.zeros(len(r))
+    heap = [(-1.0, t) for t in targets]
+    best[list(targets)] = 1.0
+    while heap:
+        value, a = heapq.heappop(heap)
+        value = -value
+        if value < best[a]:
+            continue
+        for b in np.flatnonzero(r[a] * value > best):
+            best[b] = r[a, b] * value
+            heapq.heappush(heap, (-best[b], b))
+    return np.flatnonzero(best > threshold)
+
+
+class ReducedMechanism():
+    """Result of reduce_mechanism
+
+    ATRIBUTES:
+    =========
+    system:     ReactionSystem
+                Reduced system
+    full:       ReactionSystem
+                System it was reduced from
+    species:    numpy array of ints
+                Indices of the kept species in the full system
+    reactions:  numpy array of ints
+                Indices of the kept reactions in the full system
+
+    METHODS:
+    =======
+    .write_xml: writes the reduced mechanism to an .xml file
+    .error_report: compares the reduced and full reaction rates
+    """
+    def __init__(self, full, species, reactions):
+        self.full = full
+        self.species = species
+        self.reactions = reactions
+        order = [full.order[i] for i in species]
+        self.system = ReactionSystem([full.reactions[j] for j in reactions], order,
+                                     full.nasa7_coeffs_low[species], full.nasa7_coeffs_high[species],
+                                     full.tmid[species], full.trange[species], mode=full.mode)
+
+    def write_xml(self, filename, reaction_data_id='reduced_mechanism'):
+        """writes the reduced mechanism to an .xml file, see chem3.parser.write_data"""
+        chem3.parser.write_data(filename, self.system.reactions, self.system.order, reaction_data_id)
+
+    def error_report(self, concs, T):
+        """compares the reaction rates of the kept species in the reduced and
+        full systems
+
+        INPUTS:
+        =======
+        concs:  array of floats, shape (N, number of species of the full system)
+        T:      array of floats, shape (N,)
+
+        RETURNS:
+        =======
+        report: dict
+                'n_species', 'n_reactions': sizes of the reduced system
+                'n_species_full', 'n_reactions_full': sizes of the full system
+                'species_errors': {species: largest error} where the error
+                of a state is |f_reduced - f_full| / max_i |f_full_i|
+                'max_error': largest species error
+        """
+        concs = np.atleast_2d(np.asarray(concs, dtype=float))
+        full_all = self.full.reaction_rate_batch(concs, T)
+        full = full_all[:, self.species]
+        reduced = self.system.reaction_rate_batch(concs[:, self.species], T)
+        scale = np.max(np.abs(full_all), axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.where(scale > 0, np.abs(reduced - full) / scale, 0.0)
+        errors = errors.max(axis=0) if len(errors) else np.zeros(len(self.species))
+        return {
+            'n_species': len(self.species),
+            'n_reactions': len(self.reactions),
+            'n_species_full': len(self.full.order),
+            'n_reactions_full': len(self.full),
+            'species_errors': {self.full.order[i]: float(e) for i, e in zip(self.species, errors)},
+            'max_error': float(errors.max()) if len(errors) else 0.0,
+        }
+
+
+def reduce_mechanism(system, concs, T, targets, threshold=0.1, method='DRG'):
+    """Removes the species and reactions that are unimportant for targets
+
+    INPUTS:
+    =======
+    system:     ReactionSystem
+    concs:      array of floats, shape (N, number of species)
+                Sampled concentrations, e.g. from sample_states
+    T:          array of floats, shape (N,)
+                Sampled temperatures
+    targets:    list of str
+                Target species, always kept
+    threshold:  float, default 0.1
+                See important_species
+    method:     str, default 'DRG'
+                'DRG' or 'DRGEP'
+
+    RETURNS:
+    =======
+    reduced:    ReducedMechanism
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    >>> concs, T = np.ones((1, 8)), np.array([1500.])
+    >>> reduced = reduce_mechanism(system, concs, T, ['H2', 'O2'], threshold=0.0)
+    >>> len(reduced.system) == len(system)
+    True
+    """
+    missing = [name for name in targets if name not in system.order]
+    if missing:
+        raise ValueError("Target species {0} not in the species list!".format(', '.join(missing)))
+
+    r = interaction_coefficients(system, concs, T, method)
+    species = important_species(r, [system.order.index(name) for name in targets], threshold, method)
+
+    removed = np.setdiff1d(np.arange(len(system.order)), species)
+    dropped = np.union1d(system.stoich_react.species_reactions(removed),
+                         system.stoich_prod.species_reactions(removed))
+    reactions = np.setdiff1d(np.arange(len(system)), dropped)
+    return ReducedMechanism(system, species, reactions)
@@ -0,0 +1,125 @@
+"""
+This is a module to hold several mechanisms over the same species, e.g.
+all reactionData blocks of one .xml file, as ReactionSystem objects from
+the chemkin.py module that share one SpeciesThermo: the species list and
+index, the NASA coefficient tables and the temperature ranges.
+
+Each mechanism only adds its own stoichiometry and rate parameters, and
+is built once, so switching between mechanisms does not parse the file or
+query the database again.
+"""
+
+import os
+
+import chem3
+import chem3.parser
+from chem3.chemkin import ReactionSystem, SpeciesThermo
+
+DEFAULT_DB_NAME = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+
+class MechanismRegistry():
+    """ReactionSystems of several mechanisms sharing one SpeciesThermo
+
+    ATRIBUTES:
+    =========
+    species_thermo: SpeciesThermo
+                    Species and NASA coefficients shared by all mechanisms
+    mode, cache_size:
+                    Evaluation mode and cache size of the systems, see
+                    ReactionSystem.__init__
+
+    METHODS:
+    =======
+    .from_file: loads all mechanisms of an .xml file
+    .add: adds a mechanism from a list of reactions
+    .names: returns the mechanism names, in order of addition
+    .__getitem__: returns the ReactionSystem of a mechanism
+
+    EXAMPLES:
+    ========
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> registry = MechanismRegistry.from_file(os.path.join(test_data_dir, 'rxns_multi.xml'))
+    >>> registry.names()
+    ['hydrogen_air_mechanism', 'chain_branching']
+    >>> registry['chain_branching'].nasa7_coeffs is registry['hydrogen_air_mechanism'].nasa7_coeffs
+    True
+    """
+    def __init__(self, species_thermo, mode='vectorized', cache_size=128):
+        """Sets class attributes and returns reference of the class object
+
+        INPUTS
+        ======
+        species_thermo: SpeciesThermo
+        mode, cache_size:
+                        See ReactionSystem.__init__
+        """
+        self.species_thermo = species_thermo
+        self.mode = mode
+        self.cache_size = cache_size
+        self._systems = {}
+
+    @classmethod
+    def from_file(cls, filename, db_name=DEFAULT_DB_NAME, mode='vectorized', cache_size=128):
+        """Loads all reactionData blocks of an .xml file, reading the file
+        and the database once
+
+        INPUTS
+        ======
+        filename:   str
+                    Name of .xml data file
+        db_name:    str
+                    Database name storing coefficients
+        mode, cache_size:
+                    See ReactionSystem.__init__
+
+        RETURNS:
+        =======
+        registry:   MechanismRegistry
+        """
+        data = chem3.parser.read_data(filename, db_name)
+        if not data:
+            raise ValueError("No mechanism could be read from {0}".format(filename))
+        registry = cls(SpeciesThermo.from_data(data), mode=mode, cache_size=cache_size)
+        for name, reactions in data['reactions'].items():
+            registry.add(name, reactions)
+        return registry
+
+    def add(self, name, reactions):
+        """Adds a mechanism over the shared species
+
+        INPUTS
+        ======
+        name:       str
+                    Name of the mechanism
+        reactions:  list of Reaction()
+
+        RETURNS:
+        =======
+        system:     ReactionSystem
+        """
+        if name in self._systems:
+            raise ValueError("Mechanism {0!r} is already registered".format(name))
+        system = ReactionSystem(reactions, species_thermo=self.species_thermo, mode=self.mode,
+                                cache_size=self.cache_size)
+        self._systems[name] = system
+        return system
+
+    def names(self):
+        """Returns the mechanism names, in order of addition"""
+        return list(self._systems)
+
+    def __getitem__(self, name):
+        try:
+            return self._systems[name]
+        except KeyError:
+            raise KeyError("Unknown mechanism {0!r}, must be one of {1}".format(name, self.names())) from None
+
+    def __contains__(self, name):
+        return name in self._systems
+
+    def __iter__(self):
+        return iter(self._systems)
+
+    def __len__(self):
+        return len(self._systems)
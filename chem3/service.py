@@ -0,0 +1,245 @@
+"""
+This is a module to serve many small, concurrent reaction rate requests
+for a ReactionSystem from the chemkin.py module with asyncio.
+
+Requests are queued, and a background task collects the requests arriving
+within a short window (or until a batch is full) and evaluates them with a
+single ReactionSystem.reaction_rate_batch call. The queue is bounded, so
+callers wait when the service falls behind. The service runs in-process
+and has no network layer, a web or RPC front end can await
+RateService.reaction_rate directly.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+
+class RateService():
+    """asyncio micro-batching front end of ReactionSystem.reaction_rate_batch
+
+    ATRIBUTES:
+    =========
+    system:     ReactionSystem
+    window:     float
+                Seconds to wait for more requests after the first request
+                of a batch
+    max_batch:  int
+                Largest number of requests per batch
+    max_queue:  int
+                Largest number of queued requests, callers wait when the
+                queue is full
+
+    METHODS:
+    =======
+    .__init__: init attributes
+    .start: starts the batching task
+    .close: evaluates the queued requests and stops the batching task
+    .reaction_rate: returns the reaction rates of one state
+    .metrics: returns latency and throughput statistics
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> from chem3.chemkin import ReactionSystem
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    >>> async def main():
+    ...     async with RateService(system) as service:
+    ...         rates = await asyncio.gather(*[service.reaction_rate([2., 1., .5, 1., 1.], T)
+    ...                                        for T in (1000., 1500.)])
+    ...     return service.metrics()['batches']
+    >>> asyncio.run(main())
+    1
+    """
+    def __init__(self, system, window=0.002, max_batch=256, max_queue=1024, executor=None, latency_samples=10000):
+        """Sets class attributes and returns reference of the class object
+
+        INPUTS
+        ======
+        system:             ReactionSystem
+        window:             float, default 0.002
+                            Seconds to wait for more requests after the
+                            first request of a batch
+        max_batch:          int, default 256
+                            Largest number of requests per batch
+        max_queue:          int, default 1024
+                            Largest number of queued requests
+        executor:           concurrent.futures.Executor, optional
+                            Executor the batches are evaluated in, by
+                            default they are evaluated in the event loop
+        latency_samples:    int, default 10000
+                            Number of most recent latencies kept for the
+                            metrics
+        """
+        if window < 0:
+            raise ValueError("Batch window must not be negative!")
+        if max_batch <= 0 or max_queue <= 0:
+            raise ValueError("Batch and queue sizes must be positive!")
+
+        self.system = system
+        self.window = window
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.executor = executor
+        self._queue = None
+        self._task = None
+        self._latencies = deque(maxlen=latency_samples)
+        self._requests = 0
+        self._batches = 0
+        self._failures = 0
+        self._started = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        """Starts the batching task in the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._started = time.perf_counter()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """Evaluates the queued requests and stops the batching task"""
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reaction_rate(self, concs, T):
+        """Returns the reaction rates of one state, evaluated in a batch
+
+        Waits while the queue is full.
+
+        INPUTS
+        ======
+        concs:  list of floats
+                Concentrations
+                Must be positive
+        T:      float
+                Temperature
+                Must be positive
+
+        RETURNS:
+        ========
+        f:      numpy array of floats
+                size: number of species
+        """
+        if self._task is None:
+            await self.start()
+        concs = np.asarray(concs, dtype=float)
+        if concs.shape != (len(self.system.order),):
+            raise ValueError("Concentration length does not match number of species!")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((concs, float(T), future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        """Returns the next batch of queued requests"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _evaluate(self, concs, T):
+        """Evaluates a batch, or each request on its own if the batch fails
+        with a ValueError, returning a rates array or an exception for each
+        request. Other errors fail the whole batch in _run.
+        """
+        try:
+            return list(self.system.reaction_rate_batch(concs, T))
+        except ValueError:
+            results = []
+            for c, t in zip(concs, T):
+                try:
+                    results.append(self.system.reaction_rate_batch(c[np.newaxis], t)[0])
+                except ValueError as err:
+                    results.append(err)
+            return results
+
+    async def _run(self):
+        """Batching task"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                try:
+                    concs = np.stack([request[0] for request in batch])
+                    T = np.array([request[1] for request in batch])
+                    if self.executor is None:
+                        results = self._evaluate(concs, T)
+                    else:
+                        results = await loop.run_in_executor(self.executor, self._evaluate, concs, T)
+                except Exception as err:
+                    # e.g. a shut down executor or a MemoryError: fail the
+                    # whole batch and keep serving later requests
+                    results = [err] * len(batch)
+
+                done = time.perf_counter()
+                self._batches += 1
+                for (_, _, future, enqueued), result in zip(batch, results):
+                    self._requests += 1
+                    self._latencies.append(done - enqueued)
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        self._failures += 1
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def metrics(self):
+        """Returns latency and throughput statistics
+
+        RETURNS:
+        =======
+        metrics:    dict
+                    'requests', 'batches', 'failures': counts
+                    'mean_batch_size': requests per batch
+                    'queued': number of waiting requests
+                    'throughput': requests per second since start
+                    'latency_mean', 'latency_p50', 'latency_p95',
+                    'latency_max': seconds from queueing to evaluation,
+                    over the most recent requests
+        """
+        latencies = np.array(self._latencies)
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        stats = {
+            'requests': self._requests,
+            'batches': self._batches,
+            'failures': self._failures,
+            'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'throughput': self._requests / elapsed if elapsed > 0 else 0.0,
+        }
+        for name, value in (('mean', np.mean), ('p50', lambda x: np.percentile(x, 50)),
+                            ('p95', lambda x: np.percentile(x, 95)), ('max', np.max)):
+            stats['latency_' + name] = float(value(latencies)) if len(latencies) else 0.0
+        return stats
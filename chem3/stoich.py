@@ -0,0 +1,261 @@
+"""
+This is a module for sparse storage of the stoichiometric coefficients of a
+system of reactions, for use with the chemkin.py module also found in this
+library.
+
+Each reaction only involves a handful of species, so the coefficients are
+stored as (species, reaction, coefficient) entries sorted by reaction
+instead of a dense (number of species, number of reactions) matrix.
+"""
+
+import numpy as np
+
+
+class SparseStoichiometry():
+    """Sparse (species, reaction) matrix of stoichiometric coefficients
+
+    ATRIBUTES:
+    =========
+    species:    numpy array of ints
+                Species index of each entry
+    reactions:  numpy array of ints
+                Reaction index of each entry, sorted
+    coeffs:     numpy array of floats
+                Stoichiometric coefficient of each entry
+    shape:      tuple of ints
+                (number of species, number of reactions)
+    indptr:     numpy array of ints
+                Entries of reaction j are indptr[j]:indptr[j + 1]
+
+    METHODS:
+    =======
+    .from_dicts: builds the matrix from one {species: coefficient} dict per reaction
+    .toarray: returns the dense matrix
+    .product: returns prod_i concs_i**nu_ij of each (or some) reaction
+    .log_product: returns sum_i nu_ij log_concs_i of each reaction
+    .reduce: returns sum_i nu_ij values_i of each reaction
+    .scatter: returns sum_j nu_ij values_j of each species
+    .matmul_triplets: multiplies by a (reaction, column) matrix in triplet form
+    .species_reactions: returns the reactions with an entry of given species
+
+    EXAMPLES:
+    ========
+    >>> nu = SparseStoichiometry.from_dicts([{'H2': 2.0, 'O2': 1.0}, {'OH': 1.0}],
+    ...                                     {'H2': 0, 'O2': 1, 'OH': 2})
+    >>> nu.toarray().tolist()
+    [[2.0, 0.0], [1.0, 0.0], [0.0, 1.0]]
+    >>> nu.product([2., 3., 4.]).tolist()
+    [12.0, 4.0]
+    """
+    def __init__(self, species, reactions, coeffs, shape):
+        """Sets class attributes and returns reference of the class object
+
+        INPUTS
+        ======
+        species, reactions, coeffs: arrays
+                    Entries of the matrix, summed when repeated
+                    Arrays already sorted by reaction are used without copy
+        shape:      tuple of ints
+                    (number of species, number of reactions)
+        """
+        self.species = np.asarray(species, dtype=np.intp)
+        self.reactions = np.asarray(reactions, dtype=np.intp)
+        self.coeffs = np.asarray(coeffs, dtype=float)
+        if np.any(np.diff(self.reactions) < 0):
+            order = np.argsort(self.reactions, kind='stable')
+            self.species, self.reactions, self.coeffs = \
+                self.species[order], self.reactions[order], self.coeffs[order]
+        self.shape = tuple(shape)
+        self.indptr = np.searchsorted(self.reactions, np.arange(self.shape[1] + 1))
+
+        # Same entries sorted by species, to sum over reactions
+        self._by_species = np.argsort(self.species, kind='stable')
+        self._species_indptr = np.searchsorted(self.species[self._by_species], np.arange(self.shape[0] + 1))
+
+    @classmethod
+    def from_dicts(cls, dicts, index):
+        """Builds the matrix in one pass over the reactions
+
+        INPUTS
+        ======
+        dicts:      list of dicts
+                    {species: coefficient} of each reaction
+        index:      dict
+                    Index of each species
+
+        RETURNS:
+        =======
+        nu:         SparseStoichiometry
+        """
+        species, reactions, coeffs = [], [], []
+        for j, d in enumerate(dicts):
+            for name, coef in d.items():
+                if name not in index:
+                    raise ValueError("Species {0} of reaction {1} is not in the species list!".format(name, j))
+                species.append(index[name])
+                reactions.append(j)
+                coeffs.append(coef)
+        return cls(species, reactions, coeffs, (len(index), len(dicts)))
+
+    def __len__(self):
+        """Returns the number of stored entries"""
+        return len(self.coeffs)
+
+    def __sub__(self, other):
+        """Returns the difference of two matrices of the same shape"""
+        return SparseStoichiometry(np.concatenate([self.species, other.species]),
+                                   np.concatenate([self.reactions, other.reactions]),
+                                   np.concatenate([self.coeffs, -other.coeffs]),
+                                   self.shape)
+
+    def select(self, reactions):
+        """Returns the matrix restricted to the given reaction indices"""
+        reactions = np.asarray(reactions, dtype=np.intp)
+        new_index = np.full(self.shape[1], -1, dtype=np.intp)
+        new_index[reactions] = np.arange(len(reactions))
+        keep = new_index[self.reactions] >= 0
+        return SparseStoichiometry(self.species[keep], new_index[self.reactions[keep]], self.coeffs[keep],
+                                   (self.shape[0], len(reactions)))
+
+    def toarray(self):
+        """Returns the dense (number of species, number of reactions) matrix"""
+        dense = np.zeros(self.shape)
+        np.add.at(dense, (self.species, self.reactions), self.coeffs)
+        return dense
+
+    def _reduce_by(self, ufunc, values, indptr, identity):
+        """Applies ufunc.reduceat over consecutive groups of entries along the
+        last axis, filling empty groups with the identity
+        """
+        values = np.concatenate([values, np.full(values.shape[:-1] + (1,), identity)], axis=-1)
+        out = ufunc.reduceat(values, indptr[:-1], axis=-1)
+        out[..., indptr[:-1] == indptr[1:]] = identity
+        return out
+
+    def _entries(self, reactions):
+        """returns (source, entries, counts): the stored entries of the given
+        reactions, the position in reactions of each entry and the number of
+        entries of each reaction
+        """
+        reactions = np.asarray(reactions, dtype=np.intp)
+        counts = self.indptr[reactions + 1] - self.indptr[reactions]
+        source = np.repeat(np.arange(len(reactions)), counts)
+        offsets = np.arange(len(source)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return source, self.indptr[reactions][source] + offsets, counts
+
+    def product(self, concs, reactions=None):
+        """Returns prod_i concs_i**nu_ij of each reaction
+
+        INPUTS
+        ======
+        concs:      array of floats, shape (..., number of species)
+        reactions:  array of ints, optional
+                    Indices of the reactions to compute, by default all
+
+        RETURNS:
+        =======
+        prods:  numpy array of floats, shape (..., number of reactions)
+        """
+        concs = np.asarray(concs, dtype=float)
+        if reactions is None:
+            return self._reduce_by(np.multiply, concs[..., self.species] ** self.coeffs, self.indptr, 1.0)
+
+        _, entries, counts = self._entries(reactions)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        terms = concs[..., self.species[entries]] ** self.coeffs[entries]
+        return self._reduce_by(np.multiply, terms, indptr, 1.0)
+
+    def log_product(self, log_concs):
+        """Returns sum_i nu_ij log_concs_i of each reaction, the logarithm
+        of product(concs)
+
+        Entries with a zero coefficient contribute zero, also for a zero
+        concentration (log_concs_i = -inf), as concs_i**0 = 1.
+
+        INPUTS
+        ======
+        log_concs:  array of floats, shape (..., number of species)
+
+        RETURNS:
+        =======
+        log_prods:  numpy array of floats, shape (..., number of reactions)
+        """
+        nonzero = self.coeffs != 0
+        terms = np.asarray(log_concs, dtype=float)[..., self.species] * np.where(nonzero, self.coeffs, 1.0)
+        terms = np.where(nonzero, terms, 0.0)
+        return self._reduce_by(np.add, terms, self.indptr, 0.0)
+
+    def reduce(self, values, reactions=None):
+        """Returns sum_i nu_ij values_i of each reaction
+
+        INPUTS
+        ======
+        values:     array of floats, shape (..., number of species)
+        reactions:  array of ints, optional
+                    Indices of the reactions to compute, by default all
+
+        RETURNS:
+        =======
+        sums:   numpy array of floats, shape (..., number of reactions)
+        """
+        values = np.asarray(values, dtype=float)
+        if reactions is None:
+            return self._reduce_by(np.add, values[..., self.species] * self.coeffs, self.indptr, 0.0)
+
+        _, entries, counts = self._entries(reactions)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        terms = values[..., self.species[entries]] * self.coeffs[entries]
+        return self._reduce_by(np.add, terms, indptr, 0.0)
+
+    def scatter(self, values):
+        """Returns sum_j nu_ij values_j of each species
+
+        INPUTS
+        ======
+        values: array of floats, shape (..., number of reactions)
+
+        RETURNS:
+        =======
+        sums:   numpy array of floats, shape (..., number of species)
+        """
+        perm = self._by_species
+        terms = np.asarray(values, dtype=float)[..., self.reactions[perm]] * self.coeffs[perm]
+        return self._reduce_by(np.add, terms, self._species_indptr, 0.0)
+
+    def matmul_triplets(self, rows, cols, vals):
+        """Multiplies this matrix by a (reaction, column) matrix M given as
+        triplets, without forming either matrix densely
+
+        INPUTS
+        ======
+        rows, cols, vals: arrays
+                Reaction index, column index and value of each entry of M
+
+        RETURNS:
+        =======
+        rows, cols, vals: numpy arrays
+                Species index, column index and value of each entry of
+                nu @ M, repeated entries are to be summed
+        """
+        source, entries, _ = self._entries(rows)
+        return self.species[entries], np.asarray(cols)[source], self.coeffs[entries] * np.asarray(vals)[source]
+
+    def species_reactions(self, species):
+        """Returns the sorted indices of the reactions with a nonzero entry
+        of any of the given species
+
+        INPUTS
+        ======
+        species:    array of ints
+                    Species indices
+
+        RETURNS:
+        =======
+        reactions:  numpy array of ints
+        """
+        species = np.asarray(species, dtype=np.intp)
+        starts, stops = self._species_indptr[species], self._species_indptr[species + 1]
+        counts = stops - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = self._by_species[np.repeat(starts, counts) + offsets]
+        return np.unique(self.reactions[entries[self.coeffs[entries] != 0]])
@@ -0,0 +1,225 @@
+"""
+This is a module to tabulate the forward rate coefficients and equilibrium
+coefficients of a ReactionSystem from the chemkin.py module on a grid of
+temperatures, for the 'table' evaluation mode of ReactionSystem.
+
+The logarithms of the coefficients are tabulated on grids uniform in 1/T,
+on which Arrhenius expressions and the 1/T terms of the NASA polynomials
+are close to linear. The range is split into segments at the NASA
+temperature cutoffs of the species, where the coefficients have a kink,
+and each segment is refined on its own by halving its spacing until the
+interpolation error at its interval midpoints is below the requested
+tolerance. A query finds its segment among the few cutoffs, computes its
+grid interval directly, gathers one row of values and slopes, and
+interpolates linearly.
+"""
+
+import numpy as np
+
+
+class RateTable():
+    """Tabulated log kf and log ke of all reactions of a ReactionSystem
+
+    ATRIBUTES:
+    =========
+    T_min, T_max:   floats
+                    Tabulated temperature range
+    rtol:           float
+                    Requested tolerance on log kf and log ke, i.e. on the
+                    relative error of kf and ke
+    max_error:      float
+                    Largest interpolation error of log kf and log ke at
+                    the midpoints of the final grid
+    n_points:       int
+                    Number of grid points
+    n_segments:     int
+                    Number of segments between the NASA temperature
+                    cutoffs within [T_min, T_max]
+    nbytes:         int
+                    Size of the tabulated values and slopes
+
+    METHODS:
+    =======
+    .__init__: builds the table
+    .covers: whether temperatures are within the table
+    .lookup: returns the interpolated log kf and log ke
+    .accuracy_report: compares the table with the exact coefficients
+
+    EXAMPLES:
+    ========
+    >>> import os
+    >>> import chem3
+    >>> from chem3.chemkin import ReactionSystem
+    >>> test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+    >>> system = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    >>> table = RateTable(system, rtol=1e-6)
+    >>> table.max_error <= 1e-6
+    True
+    """
+    def __init__(self, system, rtol=1e-6, T_min=None, T_max=None, n_initial=65, max_points=2**17,
+                 max_bytes=2**28):
+        """Tabulates the coefficients of system
+
+        INPUTS
+        ======
+        system:     ReactionSystem
+        rtol:       float, default 1e-6
+                    Tolerance on the interpolation error of log kf and log ke
+        T_min, T_max: floats, optional
+                    Tabulated range, by default the range in which the
+                    NASA coefficients of all species are valid
+        n_initial:  int
+                    Number of points of the initial grid of each segment
+        max_points: int
+                    Largest total number of points
+        max_bytes:  int, default 2**28
+                    Largest size of the table
+
+        RAISES:
+        =======
+        ValueError: if reaching rtol needs more than max_points points or
+                    a table larger than max_bytes
+        """
+        self.T_min = float(system.trange[:, 0].max() if T_min is None else T_min)
+        self.T_max = float(system.trange[:, 1].min() if T_max is None else T_max)
+        if not 0 < self.T_min < self.T_max:
+            raise ValueError("Table temperature range must be positive and non empty!")
+        self.rtol = rtol
+        self._system = system
+        self._n_reactions = len(system)
+
+        # Segments uniform in u = 1/T, from 1/T_max to 1/T_min, split at the
+        # NASA cutoffs. The coefficients at a segment end are those of the
+        # segment side of the cutoff
+        cutoffs = np.unique(system.tmid[(system.tmid > self.T_min) & (system.tmid < self.T_max)])[::-1]
+        edges = np.concatenate([[self.T_max], cutoffs, [self.T_min]])
+        grids, values = [], []
+        for k in range(len(edges) - 1):
+            u = np.linspace(1.0 / edges[k], 1.0 / edges[k + 1], n_initial)
+            T = 1.0 / u
+            T[0], T[-1] = edges[k] if k == 0 else np.nextafter(edges[k], 0.0), edges[k + 1]
+            grids.append(u)
+            values.append(self._exact(T))
+        row_bytes = 2 * 8 * values[0].shape[1]
+
+        errors = np.zeros(len(grids))
+        active = range(len(grids))
+        while True:
+            refine = []
+            for k in active:
+                u = grids[k]
+                mid = 0.5 * (u[:-1] + u[1:])
+                mid_values = self._exact(1.0 / mid)
+                with np.errstate(invalid='ignore'):
+                    mid_errors = np.abs(0.5 * (values[k][:-1] + values[k][1:]) - mid_values)
+                errors[k] = np.max(np.where(np.isnan(mid_errors), 0.0, mid_errors), initial=0.0)
+                if errors[k] > rtol:
+                    refine.append((k, mid, mid_values))
+            n_points = sum(len(u) for u in grids) + sum(len(mid) for _, mid, _ in refine)
+            if not refine:
+                break
+            if n_points > max_points:
+                raise ValueError("Rate table of {0} reactions at rtol={1} needs more than {2} points "
+                                 "(max_error {3:.3g}), increase rtol or max_points".format(
+                                     self._n_reactions, rtol, max_points, errors.max()))
+            if (n_points - len(grids)) * row_bytes > max_bytes:
+                raise ValueError("Rate table of {0} reactions at rtol={1} needs more than {2} bytes "
+                                 "({3} points), increase rtol or max_bytes".format(
+                                     self._n_reactions, rtol, max_bytes, n_points))
+
+            # Halve the spacing, reusing the values at the previous points
+            for k, mid, mid_values in refine:
+                refined = np.empty((2 * len(values[k]) - 1, values[k].shape[1]))
+                refined[0::2], refined[1::2] = values[k], mid_values
+                grids[k], values[k] = np.insert(grids[k], np.arange(1, len(grids[k])), mid), refined
+            active = [k for k, _, _ in refine]
+
+        self.max_error = float(errors.max())
+        self.n_points = sum(len(u) for u in grids)
+        self.n_segments = len(grids)
+        self._u_starts = np.array([u[0] for u in grids])
+        self._inv_du = np.array([(len(u) - 1) / (u[-1] - u[0]) for u in grids])
+        self._n_intervals = np.array([len(u) - 1 for u in grids])
+        self._offsets = np.concatenate([[0], np.cumsum(self._n_intervals)[:-1]])
+        with np.errstate(invalid='ignore'):
+            slopes = np.concatenate([np.diff(v, axis=0) for v in values])
+        # -inf columns (zero rate coefficients) stay -inf
+        self._values = np.concatenate([v[:-1] for v in values])
+        self._slopes = np.where(np.isfinite(slopes), slopes, 0.0)
+        self.nbytes = self._values.nbytes + self._slopes.nbytes
+        self._system = None
+
+    def _exact(self, T):
+        """returns the exact (log kf, log ke) rows at temperatures T"""
+        system = self._system
+        return np.concatenate([system._log_forward_coeffs(T), system._log_equilibrium_coeffs(T)], axis=-1)
+
+    def covers(self, T):
+        """Returns whether all temperatures T are within the table"""
+        T = np.asarray(T, dtype=float)
+        return bool(np.all(T >= self.T_min) and np.all(T <= self.T_max))
+
+    def lookup(self, T):
+        """Returns the interpolated log kf and log ke at temperatures T
+
+        INPUTS
+        ======
+        T:      float or array of floats within [T_min, T_max]
+
+        RETURNS:
+        =======
+        log_kf, log_ke: numpy arrays of floats
+                        shape: (..., number of reactions)
+        """
+        u = 1.0 / np.asarray(T, dtype=float)
+        # A cutoff belongs to the segment above it, as in _nasa_coeffs
+        k = np.clip(np.searchsorted(self._u_starts, u, side='left') - 1, 0, self.n_segments - 1)
+        x = (u - self._u_starts[k]) * self._inv_du[k]
+        i = np.clip(x.astype(np.intp), 0, self._n_intervals[k] - 1)
+        w = (x - i)[..., np.newaxis]
+        rows = self._offsets[k] + i
+        values = self._values[rows] + w * self._slopes[rows]
+        return values[..., :self._n_reactions], values[..., self._n_reactions:]
+
+    def accuracy_report(self, system, n_samples=2001, seed=0):
+        """Compares the table with the exact coefficients of system
+
+        INPUTS
+        ======
+        system:     ReactionSystem
+                    The system the table was built from
+        n_samples:  int
+                    Number of sampled temperatures, half evenly spaced
+                    and half random in [T_min, T_max]
+
+        RETURNS:
+        =======
+        report: dict
+                'T_min', 'T_max', 'n_points', 'n_segments', 'nbytes',
+                'rtol', 'max_error' (table attributes), 'kf_max_rel_error', 'ke_max_rel_error'
+                (largest relative errors of kf and ke over the samples)
+                and 'worst_reaction' (index of the reaction with the
+                largest error)
+        """
+        rng = np.random.RandomState(seed)
+        T = np.concatenate([np.linspace(self.T_min, self.T_max, n_samples - n_samples // 2),
+                            rng.uniform(self.T_min, self.T_max, n_samples // 2)])
+        log_kf, log_ke = self.lookup(T)
+        exact_kf, exact_ke = system._log_forward_coeffs(T), system._log_equilibrium_coeffs(T)
+        with np.errstate(invalid='ignore', over='ignore'):
+            kf_errors = np.abs(np.expm1(log_kf - exact_kf))
+            ke_errors = np.abs(np.expm1(log_ke - exact_ke))
+        kf_errors = np.where(np.isnan(kf_errors), 0.0, kf_errors).max(axis=0, initial=0.0)
+        ke_errors = np.where(np.isnan(ke_errors), 0.0, ke_errors).max(axis=0, initial=0.0)
+        return {
+            'T_min': self.T_min,
+            'T_max': self.T_max,
+            'n_points': self.n_points,
+            'n_segments': self.n_segments,
+            'nbytes': self.nbytes,
+            'rtol': self.rtol,
+            'max_error': self.max_error,
+            'kf_max_rel_error': float(kf_errors.max(initial=0.0)),
+            'ke_max_rel_error': float(ke_errors.max(initial=0.0)),
+            'worst_reaction': int(np.argmax(np.maximum(kf_errors, ke_errors))) if len(kf_errors) else None,
+        }
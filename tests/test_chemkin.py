@@ -2,6 +2,9 @@ import chem3
 from chem3.chemkin import *
 from chem3.parser import *
 import os
+import pickle
+import tracemalloc
+import pytest
 
 test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
 test_file = os.path.join(test_data_dir, 't.xml')
@@ -151,3 +154,554 @@ def test_system_read_from_file_name():
     expected = np.array([-2.81117621e+08, -2.85597559e+08, 5.66715180e+08, 4.47993847e+06, -4.47993847e+06])
     assert (np.all(np.isclose(system.reaction_rate(concs, T), expected)))
     
+
+def test_progress_rate_modes_match():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    concs = [2., 1., .5, 1., 1., .5, .5, .5]
+    args = (data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+            data['T_cutoff'], data['T_range'])
+    loop = ReactionSystem(*args, mode='loop')
+    vectorized = ReactionSystem(*args, mode='vectorized')
+    for T in [500, 900, 1500, 2500]:
+        assert (np.allclose(loop.reaction_rate(concs, T), vectorized.reaction_rate(concs, T), rtol=1e-12))
+
+def test_progress_rate_vectorized_validation():
+    system = ReactionSystem(data['reactions']['test_mechanism'], data['species'])
+    system.concs = [2., 1., -.5, 1., 1.]
+    try:
+        system.progress_rate(T)
+        assert False
+    except ValueError as err:
+        assert ('Negative concentrations' in str(err))
+
+def test_unknown_mode():
+    try:
+        ReactionSystem(data['reactions']['test_mechanism'], data['species'], mode='fast')
+        assert False
+    except ValueError as err:
+        assert (type(err) == ValueError)
+
+def test_reaction_rate_batch():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                            data['T_cutoff'], data['T_range'])
+    rng = np.random.RandomState(0)
+    concs = rng.uniform(0., 2., size=(6, len(data['species'])))
+    Ts = np.array([400., 900., 999., 1000., 1500., 3000.])
+    rates = system.reaction_rate_batch(concs, Ts)
+    assert (rates.shape == concs.shape)
+    for c, T, rate in zip(concs, Ts, rates):
+        assert (np.allclose(system.reaction_rate(c, T), rate, rtol=1e-12))
+
+def test_reaction_rate_batch_invalid():
+    for bad_concs, bad_T in [([[1., 1.]], [1500.]), ([concs], [-1.]), ([[-1.] + concs[1:]], [1500.])]:
+        try:
+            system.reaction_rate_batch(bad_concs, bad_T)
+            assert False
+        except ValueError as err:
+            assert (type(err) == ValueError)
+
+def test_pack_rate_coefs():
+    r3 = Reaction({'H2O': 1.0, 'O2': 1.0}, {'HO2': 1.0, 'OH': 1.0}, False, 'Elementary', 'reaction03', 'Arrhenius',
+                  {'E': 10000.0, 'A': 10000000.0})
+    packed = ReactionSystem([r1, r2, r3], data['species'])
+    assert (np.all(packed.const_mask == [False, True, False]))
+    assert (np.allclose(packed.A, [1e8, 0., 1e7]))
+    assert (np.allclose(packed.b, [0.5, 0., 0.]))
+    assert (np.allclose(packed.k_const, [0., 1e4, 0.]))
+    for T in [300., 1500.]:
+        ks = packed._forward_coeffs(T)
+        assert (np.allclose(ks, [r.rate_coef(T) for r in [r1, r2, r3]], rtol=1e-14))
+    assert (not any(hasattr(r, 'k') for r in [r1, r2, r3]))
+
+def test_unknown_coef_type():
+    bad = Reaction({'H2': 1.0}, {'OH': 1.0}, False, 'Elementary', 'reaction01', 'Unknown', {'k': 1.0})
+    try:
+        ReactionSystem([bad], data['species'])
+        assert False
+    except ValueError as err:
+        assert ('Unknown coefficient type' in str(err))
+
+def test_thermo_cache():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    args = (data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+            data['T_cutoff'], data['T_range'])
+    cached = ReactionSystem(*args, cache_size=2)
+    uncached = ReactionSystem(*args, cache_size=0)
+    assert (uncached.cache_info() is None)
+    concs = [2., 1., .5, 1., 1., .5, .5, .5]
+    expected = uncached.reaction_rate(concs, 900)
+    assert (np.allclose(cached.reaction_rate(concs, 900), expected))
+    misses = cached.cache_info().misses
+    assert (np.allclose(cached.reaction_rate(concs, 900), expected))
+    info = cached.cache_info()
+    assert (info.misses == misses and info.hits == 1 and info.currsize == 1)
+    for T in [500, 1500, 2500]:
+        cached.reaction_rate(concs, T)
+    assert (cached.cache_info().currsize == 2)
+    cached.cache_clear()
+    assert (cached.cache_info() == CacheInfo(0, 0, 2, 0))
+
+def test_thermo_cache_writable():
+    system = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    expected = system.H_over_RT(1500.).copy()
+    # results may be changed in place without altering the cached values
+    for _ in range(2):
+        h = system.H_over_RT(1500.)
+        h *= 2
+        ke = system.equilibrium_coeffs(1500.)
+        ke[:] = 0.
+        log_ke = system.log_equilibrium_coeffs(1500.)
+        log_ke += 1.
+        Cp_R, H_RT, S_R = system.thermo(1500.)
+        H_RT -= 1.
+    assert (np.array_equal(system.H_over_RT(1500.), expected))
+    assert (np.all(system.equilibrium_coeffs(1500.) > 0))
+    assert (system.cache_info().hits > 0)
+
+def test_thermo_cache_loop_mode():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                            data['T_cutoff'], data['T_range'], mode='loop')
+    system.reaction_rate([2., 1., .5, 1., 1., .5, .5, .5], 900)
+    # H/RT and S/R are computed once and reused by every reversible reaction
+    assert (system.cache_info().misses == 1)
+    assert (system.cache_info().hits == 2 * len(system) - 1)
+
+def test_thermo_fused():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                            data['T_cutoff'], data['T_range'], cache_size=0)
+    assert (system.nasa7_coeffs.shape == (2, len(data['species']), 7))
+    Ts = np.array([500., 999., 1000., 2500.])
+    Cp_R, H_RT, S_R = system.thermo(Ts)
+    assert (Cp_R.shape == (len(Ts), len(data['species'])))
+    for i, T in enumerate(Ts):
+        a = np.where((T < data['T_cutoff'])[:, np.newaxis], data['low'], data['high'])
+        assert (np.allclose(Cp_R[i], a[:, 0] + a[:, 1] * T + a[:, 2] * T**2 + a[:, 3] * T**3 + a[:, 4] * T**4))
+        assert (np.allclose(H_RT[i], system.H_over_RT(T)))
+        assert (np.allclose(S_R[i], a[:, 0] * np.log(T) + a[:, 1] * T + a[:, 2] * T**2 / 2 + a[:, 3] * T**3 / 3
+                            + a[:, 4] * T**4 / 4 + a[:, 6]))
+
+def _numerical_jacobian(system, concs, T):
+    x = np.append(concs, T)
+    J = np.zeros((len(concs), len(x)))
+    for k in range(len(x)):
+        h = 1e-6 * max(abs(x[k]), 1.)
+        xp, xm = x.copy(), x.copy()
+        xp[k] += h
+        xm[k] = max(xm[k] - h, 0.)
+        J[:, k] = (system.reaction_rate(xp[:-1], xp[-1]) - system.reaction_rate(xm[:-1], xm[-1])) / (xp[k] - xm[k])
+    return J
+
+def test_jacobian():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    rev_system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'],
+                                data['high'], data['T_cutoff'], data['T_range'])
+    for concs_, T_ in [([2., 1., .5, 1., 1., .5, .5, .5], 900.), ([2., 0., .5, 1., 1., 0., .5, .5], 1500.)]:
+        J = rev_system.jacobian(concs_, T_)
+        assert (J.shape == (8, 9))
+        assert (np.allclose(J, _numerical_jacobian(rev_system, np.array(concs_), T_), rtol=1e-5,
+                            atol=1e-6 * np.abs(J).max()))
+        assert (np.allclose(rev_system.jacobian(concs_, T_, sparse=True).toarray(), J))
+        assert (np.allclose(rev_system.jacobian(concs_, T_, temperature=False), J[:, :-1]))
+
+def test_jacobian_irreversible():
+    J = system.jacobian(concs, T)
+    assert (np.allclose(J, _numerical_jacobian(system, np.array(concs), T), rtol=1e-5, atol=1e-6 * np.abs(J).max()))
+
+def test_dense_matrices_lazy():
+    lazy = ReactionSystem(data['reactions']['test_mechanism'], data['species'])
+    assert (lazy._nu_dense is None)
+    lazy.reaction_rate(concs, T)
+    lazy.jacobian(concs, T)
+    assert (lazy._nu_dense is None)
+    assert (np.all(lazy.nu_react == system.nu_react))
+
+def test_read_data_stream():
+    for name in ['t.xml', 'rxns_reversible.xml', 'rxns.xml']:
+        test_file = os.path.join(test_data_dir, name)
+        expected = read_data(test_file, db_file)
+        streamed = read_data_stream(test_file, db_file)
+        assert (streamed['species'] == expected['species'])
+        for key in ['low', 'high', 'T_cutoff', 'T_range']:
+            assert (np.all(streamed[key] == expected[key]))
+        assert (streamed['reactions'].keys() == expected['reactions'].keys())
+        for mechanism in expected['reactions']:
+            for r_stream, r_tree in zip(streamed['reactions'][mechanism], expected['reactions'][mechanism]):
+                assert (r_stream == r_tree and r_stream.reac_id == r_tree.reac_id)
+                assert (r_stream.equation == r_tree.equation)
+
+def test_read_data_stream_bad_format(tmpdir):
+    bad_file = tmpdir.join('bad.xml')
+    bad_file.write('<ctml><reactionData id="m"><reaction id="r1"></reaction></reactionData></ctml>')
+    assert (read_data_stream(str(bad_file), db_file) == {})
+
+def test_get_coeffs_order_and_reuse():
+    species = ['H2O', 'O', 'H2', 'O']
+    low, high, T_cutoff, T_range = get_coeffs(db_file, species)
+    for i, s in enumerate(species):
+        low_s, high_s, cutoff_s, range_s = get_coeffs(db_file, [s])
+        assert (np.all(low[i] == low_s[0]) and np.all(high[i] == high_s[0]))
+        assert (T_cutoff[i] == cutoff_s[0] and np.all(T_range[i] == range_s[0]))
+    assert (np.all(T_range[0] == [200., 3500.]))
+    import chem3.parser
+    n_connections = len(chem3.parser._connections)
+    get_coeffs(db_file, species)
+    assert (len(chem3.parser._connections) == n_connections)
+
+def test_get_coeffs_missing_species():
+    try:
+        get_coeffs(db_file, ['H2', 'XY', 'O2" OR "1"="1', 'H2O'])
+        assert False
+    except MissingSpeciesError as err:
+        assert (isinstance(err, ValueError))
+        assert (err.species == ['XY', 'O2" OR "1"="1'])
+        assert (set(err.missing) == {'LOW', 'HIGH'})
+
+def test_profiling():
+    system = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    concs = [1.] * 8
+    assert (system.profile_stats() is None)
+    with system.profiling() as profiler:
+        system.reaction_rate(concs, 1500.)
+        system.reaction_rate(concs, 1500.)
+        system.reaction_rate_batch(np.ones((4, 8)), np.full(4, 1200.))
+    assert (system.profiler is None)
+    stats = profiler.stats()
+    assert (set(stats) == {'rate_constants', 'thermo', 'equilibrium', 'concentration_products', 'species_rates'})
+    assert (stats['rate_constants'].calls == 3)
+    assert (stats['equilibrium'].calls == 3)
+    # the second call at 1500 K hits the cache and skips thermo
+    assert (stats['thermo'].calls == 2)
+    assert (all(s.seconds >= 0 for s in stats.values()))
+    assert (profiler.as_dict()['species_rates']['calls'] == 3)
+    profiler.reset()
+    assert (profiler.stats() == {})
+
+def test_profiling_shared():
+    system = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    profiler = system.enable_profiling()
+    system.jacobian([1.] * 8, 1500.)
+    assert (system.profile_stats()['rate_constants'].calls == 1)
+    assert (system.disable_profiling() is profiler)
+    system.reaction_rate([1.] * 8, 1500.)
+    assert (profiler.stats()['rate_constants'].calls == 1)
+
+def test_profiling_memory():
+    system = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    n = 10000
+    with system.profiling() as profiler:
+        system.reaction_rate_batch(np.ones((n, 8)), np.full(n, 1200.))
+    # without tracemalloc only the calls and times are recorded
+    assert (profiler.stats()['species_rates'].peak_bytes == 0)
+    tracemalloc.start()
+    try:
+        with system.profiling() as profiler:
+            system.reaction_rate_batch(np.ones((n, 8)), np.full(n, 1500.))
+    finally:
+        tracemalloc.stop()
+    stats = profiler.stats()
+    # the batch of n x 8 floats returned by species_rates is a numpy buffer
+    assert (stats['species_rates'].allocated_bytes >= n * 8 * 8)
+    assert (stats['species_rates'].peak_bytes >= stats['species_rates'].allocated_bytes)
+    # the peaks of nested stages are seen by the enclosing stages
+    assert (stats['equilibrium'].peak_bytes >= stats['thermo'].peak_bytes > 0)
+
+def test_profiling_pressure_stage():
+    system = _pressure_system()
+    with system.profiling() as profiler:
+        system.reaction_rate(pressure_concs, 1500.)
+    stats = profiler.stats()
+    assert (stats['rate_constants'].calls == 1)
+    assert (stats['pressure_factor'].calls == 1)
+
+def test_log_mode():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    args = (data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+            data['T_cutoff'], data['T_range'])
+    vectorized = ReactionSystem(*args, mode='vectorized')
+    log = ReactionSystem(*args, mode='log')
+    for concs in ([2., 1., .5, 1., 1., .5, .5, .5], [2., 0., .5, 0., 1., .5, 0., .5]):
+        for T in [500, 900, 1500, 2500]:
+            assert (np.allclose(log.reaction_rate(concs, T), vectorized.reaction_rate(concs, T), rtol=1e-10))
+    batch = np.random.RandomState(0).rand(6, 8)
+    temps = np.linspace(400., 2800., 6)
+    assert (np.allclose(log.reaction_rate_batch(batch, temps), vectorized.reaction_rate_batch(batch, temps),
+                        rtol=1e-10))
+    assert (np.allclose(np.exp(log.log_equilibrium_coeffs(1200.)), vectorized.equilibrium_coeffs(1200.),
+                        rtol=1e-12))
+
+def test_log_mode_extreme():
+    # concs**nu underflows before it is multiplied by k
+    reactions = [Reaction({'H2': 2.0}, {'O2': 1.0}, False, 'Elementary', 'r1', 'Constant', {'k': 1e300})]
+    concs = [1e-200, 1e-100, 1., 1., 1.]
+    with np.errstate(under='ignore'):
+        assert (ReactionSystem(reactions, data['species']).reaction_rate(concs, 1000.)[0] == 0.0)
+    log_rates = ReactionSystem(reactions, data['species'], mode='log').reaction_rate(concs, 1000.)
+    assert (np.isclose(log_rates[0], -2e-100))
+    with pytest.raises(ValueError):
+        ReactionSystem([Reaction({'H2': 1.0}, {'O2': 1.0}, False, 'Elementary', 'r1', 'Constant', {'k': -1.})],
+                       data['species'], mode='log').reaction_rate(concs, 1000.)
+
+def test_write_data(tmpdir):
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    path = str(tmpdir.join('copy.xml'))
+    write_data(path, data['reactions']['hydrogen_air_mechanism'], data['species'], 'copy')
+    copy = read_data(path, db_file)
+    assert (copy['species'] == data['species'])
+    assert (copy['reactions']['copy'] == data['reactions']['hydrogen_air_mechanism'])
+
+def test_table_mode():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    exact = ReactionSystem(filename=test_file)
+    table = ReactionSystem(filename=test_file, mode='table')
+    concs = [2., 1., .5, 1., 1., .5, .5, .5]
+    for T in [300., 999.9, 1000., 1500., 3500.]:
+        assert (np.allclose(table.reaction_rate(concs, T), exact.reaction_rate(concs, T), rtol=1e-5))
+    batch = np.random.RandomState(0).rand(20, 8)
+    temps = np.linspace(250., 3400., 20)
+    assert (np.allclose(table.reaction_rate_batch(batch, temps), exact.reaction_rate_batch(batch, temps),
+                        rtol=1e-5, atol=1e-5 * np.abs(exact.reaction_rate_batch(batch, temps)).max()))
+    report = table.rate_table.accuracy_report(table)
+    assert (report['max_error'] <= 1e-6)
+    assert (report['kf_max_rel_error'] < 1e-5 and report['ke_max_rel_error'] < 1e-5)
+
+def test_table_mode_range():
+    test_file = os.path.join(test_data_dir, 't.xml')
+    exact = ReactionSystem(filename=test_file)
+    table = ReactionSystem(filename=test_file, mode='table')
+    coarse = table.build_rate_table(rtol=1e-3, T_min=1000., T_max=2000.)
+    assert (table.rate_table is coarse)
+    assert (coarse.max_error <= 1e-3)
+    assert (coarse.n_points < RateTable(exact, rtol=1e-8, T_min=1000., T_max=2000.).n_points)
+    concs = [2., 1., .5, 1., 1.]
+    # outside of the table, the exact coefficients are used
+    assert (np.array_equal(table.reaction_rate(concs, 500.), exact.reaction_rate(concs, 500.)))
+    assert (np.allclose(table.reaction_rate(concs, 1500.), exact.reaction_rate(concs, 1500.), rtol=1e-3))
+    with pytest.raises(ValueError):
+        RateTable(exact, T_min=2000., T_max=1000.)
+
+def test_table_segments():
+    exact = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    table = RateTable(exact)
+    # split at the NASA cutoff of 1000 K, each side refined on its own
+    assert (table.n_segments == 2)
+    assert (table.n_points == RateTable(exact, T_min=1000., T_max=3500.).n_points +
+            RateTable(exact, T_min=200., T_max=1000.).n_points)
+    assert (table.nbytes == table.accuracy_report(exact)['nbytes'])
+    assert (table.nbytes == 2 * 8 * (table.n_points - 2) * 2 * len(exact))
+    # the cutoff takes the high temperature coefficients, as the exact ones
+    for T in [200., 999.999, 1000., 1000.001, 3500.]:
+        log_kf, log_ke = table.lookup(T)
+        assert (np.allclose(log_kf, exact._log_forward_coeffs(T), rtol=0, atol=1e-6))
+        assert (np.allclose(log_ke, exact._log_equilibrium_coeffs(T), rtol=0, atol=1e-6))
+    with pytest.raises(ValueError):
+        RateTable(exact, max_bytes=table.nbytes // 2)
+    with pytest.raises(ValueError):
+        exact.build_rate_table(max_bytes=table.nbytes // 2)
+    # the tolerance is never silently missed
+    with pytest.raises(ValueError):
+        RateTable(exact, rtol=1e-12, max_points=table.n_points)
+    assert (RateTable(exact, rtol=1e-3, max_points=table.n_points).max_error <= 1e-3)
+
+def test_rate_sensitivities():
+    test_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+    data = read_data(test_file, db_file)
+    reactions = data['reactions']['hydrogen_air_mechanism']
+    args = (data['species'], data['low'], data['high'], data['T_cutoff'], data['T_range'])
+    system = ReactionSystem(reactions, *args)
+    concs = np.array([2., 1., .5, 1., 1., .5, .5, .5])
+    T = 1500.
+    dlnA, dE = system.rate_sensitivities(concs, T)
+    assert (dlnA.shape == dE.shape == (8, len(reactions)))
+    # finite differences on perturbed copies of each reaction
+    for j, reac in enumerate(reactions):
+        for param, sens, h in (('A', dlnA, 1e-6), ('E', dE, 1e-3)):
+            if param not in reac.coef:
+                continue
+            rates = []
+            for sign in (1, -1):
+                coef = dict(reac.coef)
+                coef[param] = coef[param] * np.exp(sign * h) if param == 'A' else coef[param] + sign * h
+                perturbed = list(reactions)
+                perturbed[j] = Reaction(reac.reactants, reac.products, reac.reversible, reac.reac_type,
+                                        reac.reac_id, reac.coef_type, coef, equation=reac.equation)
+                rates.append(ReactionSystem(perturbed, *args).reaction_rate(concs, T))
+            fd = (rates[0] - rates[1]) / (2 * h)
+            assert (np.allclose(sens[:, j], fd, rtol=1e-5, atol=1e-8 * np.abs(fd).max()))
+
+    batch = np.vstack([concs, concs * 2])
+    dlnA_batch, dE_batch = system.rate_sensitivities_batch(batch, [T, 900.])
+    assert (dlnA_batch.shape == (2, 8, len(reactions)))
+    assert (np.allclose(dlnA_batch[0], dlnA))
+    assert (np.allclose(dE_batch[1], system.rate_sensitivities(concs * 2, 900.)[1]))
+    # the dense stoichiometric matrices are not built
+    assert (system._nu_dense is None)
+    assert (np.allclose(dlnA, (system.nu_prod - system.nu_react) * system._progress(concs, T)))
+    # rates are the sums of the ln A sensitivities
+    assert (np.allclose(dlnA.sum(axis=1), system.reaction_rate(concs, T)))
+
+def test_rate_sensitivities_constant():
+    system = ReactionSystem(data['reactions']['test_mechanism'], data['species'])
+    concs = [2., 1., .5, 1., 1.]
+    dlnA, dE = system.rate_sensitivities(concs, 1500.)
+    assert (np.all(dE[:, 1] == 0))
+    assert (np.allclose(dlnA.sum(axis=1), system.reaction_rate(concs, 1500.)))
+
+def _pressure_system(**kwargs):
+    return ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_pressure.xml'), **kwargs)
+
+pressure_concs = np.array([1e-3, 2e-3, 3e-3, .4, .5, .2, 1e-4, 2e-4, 3.])
+
+def test_read_pressure_reactions():
+    reactions = _pressure_system().reactions
+    assert ([r.reac_type for r in reactions[:4]] == ['threeBody', 'falloff', 'falloff', 'falloff'])
+    assert (reactions[0].efficiencies == {'AR': .83, 'H2': 2.4, 'H2O': 15.4})
+    assert (reactions[0].falloff is None and reactions[0].third_body)
+    assert (reactions[1].falloff == ('Troe', (.5, 1e-30, 1e30)))
+    assert (reactions[1].low_coef == {'A': 6.37e8, 'b': -1.72, 'E': 2188.})
+    assert (reactions[3].falloff == ('Lindemann', ()) and reactions[3].default_efficiency == 0.)
+    assert ([r.duplicate for r in reactions] == [False] * 4 + [True, True, False])
+    assert (not reactions[6].third_body)
+
+def test_pressure_progress_rate():
+    system = _pressure_system()
+    T = 1200.
+    progress = system._progress(pressure_concs, T)
+    ke = system.equilibrium_coeffs(T)
+    x = dict(zip(system.order, pressure_concs))
+    total = pressure_concs.sum()
+
+    def arrhenius(A, b, E):
+        return A * T**b * np.exp(-E / 8.314 / T)
+
+    # three-body reaction
+    M = total + (.83 - 1) * x['AR'] + (2.4 - 1) * x['H2'] + (15.4 - 1) * x['H2O']
+    kf = 1.2e5 * M
+    assert (np.isclose(progress[0], kf * x['O']**2 - kf / ke[0] * x['O2']))
+
+    # Troe falloff reaction
+    M = total + (.67 - 1) * x['AR'] + (2. - 1) * x['H2'] + (14. - 1) * x['H2O'] + (.78 - 1) * x['O2']
+    kinf, k0 = arrhenius(4.65e6, .44, 0.), arrhenius(6.37e8, -1.72, 2188.)
+    pr = k0 * M / kinf
+    f_cent = .5 * np.exp(-T / 1e-30) + .5 * np.exp(-T / 1e30)
+    c, n = -.4 - .67 * np.log10(f_cent), .75 - 1.27 * np.log10(f_cent)
+    f1 = (np.log10(pr) + c) / (n - .14 * (np.log10(pr) + c))
+    kf = kinf * pr / (1 + pr) * 10**(np.log10(f_cent) / (1 + f1**2))
+    assert (np.isclose(progress[1], kf * x['H'] * x['O2'] - kf / ke[1] * x['HO2']))
+
+    # Lindemann falloff reaction with a zero default efficiency
+    M = .7 * x['AR'] + 6. * x['H2O']
+    kinf, k0 = arrhenius(7.4e7, 0., 0.), arrhenius(2.3e6, 0., -7.7e3)
+    pr = k0 * M / kinf
+    assert (np.isclose(progress[3], kinf * pr / (1 + pr) * x['OH']**2))
+
+    # duplicate reactions are summed in the species rates
+    rates = system.reaction_rate(pressure_concs, T)
+    assert (np.allclose(rates, system.stoich_net.scatter(progress)))
+    assert (np.isclose(progress[4] + progress[5],
+                       (arrhenius(1.45e7, 0., -2092.) + arrhenius(5e9, 0., 7.25e4)) *
+                       (x['HO2'] * x['OH'] - x['H2O'] * x['O2'] / ke[4])))
+
+def test_pressure_modes_match():
+    expected = _pressure_system().reaction_rate(pressure_concs, 1200.)
+    for mode in ['loop', 'log', 'table']:
+        assert (np.allclose(_pressure_system(mode=mode).reaction_rate(pressure_concs, 1200.), expected, rtol=1e-5))
+    batch = np.vstack([pressure_concs, 2 * pressure_concs, np.zeros(9)])
+    rates = _pressure_system().reaction_rate_batch(batch, [1200., 900., 1500.])
+    assert (np.allclose(rates[0], expected))
+    assert (np.allclose(rates[1], _pressure_system().reaction_rate(2 * pressure_concs, 900.)))
+    assert (np.all(rates[2] == 0))
+
+def test_pressure_jacobian():
+    system = _pressure_system()
+    for T_ in [900., 1500.]:
+        J = system.jacobian(pressure_concs, T_)
+        assert (np.allclose(J, _numerical_jacobian(system, pressure_concs, T_), rtol=1e-5,
+                            atol=1e-6 * np.abs(J).max()))
+        assert (np.allclose(system.jacobian(pressure_concs, T_, sparse=True).toarray(), J))
+
+def test_pressure_sensitivities():
+    system = _pressure_system()
+    T = 1200.
+    dlnA = system.rate_sensitivities(pressure_concs, T)[0]
+    for j in [0, 1, 2]:
+        rates = []
+        for sign in (1, -1):
+            perturbed = _pressure_system()
+            perturbed.A = perturbed.A.copy()
+            perturbed.A[j] *= np.exp(sign * 1e-6)
+            rates.append(perturbed.reaction_rate(pressure_concs, T))
+        fd = (rates[0] - rates[1]) / 2e-6
+        assert (np.allclose(dlnA[:, j], fd, rtol=1e-5, atol=1e-8 * np.abs(fd).max()))
+
+def test_pressure_write_data(tmpdir):
+    system = _pressure_system()
+    file_name = str(tmpdir.join('pressure.xml'))
+    write_data(file_name, system.reactions, system.order, 'pressure_mechanism')
+    copy = read_data(file_name, db_file)['reactions']['pressure_mechanism']
+    assert (copy == system.reactions)
+    assert ([r.duplicate for r in copy] == [r.duplicate for r in system.reactions])
+
+def test_falloff_needs_low_coef():
+    reac = Reaction({'H': 1., 'O2': 1.}, {'HO2': 1.}, True, 'falloff', 'r1', 'Arrhenius', {'A': 1., 'E': 0.})
+    with pytest.raises(ValueError):
+        ReactionSystem([reac], ['H', 'O2', 'HO2'])
+
+def test_reaction_compact():
+    reac = Reaction({'O2': 1.0, 'H2': 2.0}, {'OH': 2.0, 'H2': 1.0}, False, 'Elementary', 'reaction01',
+                    'modifiedArrhenius', {'E': 50000.0, 'b': 0.5, 'A': 100000000.0})
+    assert (not hasattr(reac, '__dict__'))
+    assert (reac.species_table is SPECIES_TABLE)
+    assert ([SPECIES_TABLE.names[i] for i in reac._species] == ['O2', 'H2', 'OH', 'H2'])
+    # dicts are rebuilt on access, and setters repack them
+    reac.reactants = {'O2': 2.0}
+    assert (reac.reactants == {'O2': 2.0} and reac.products == {'OH': 2.0, 'H2': 1.0})
+    assert (reac != r1)
+
+def test_reaction_hash():
+    copy = Reaction({'H2': 2.0, 'O2': 1.0}, {'H2': 1.0, 'OH': 2.0}, False, 'Elementary', 'other_id',
+                    'modifiedArrhenius', {'A': 100000000.0, 'b': 0.5, 'E': 50000.0}, species_table=SpeciesTable())
+    assert (copy == r1 and hash(copy) == hash(r1))
+    assert (list(dict.fromkeys([r1, r2, copy])) == [r1, r2])
+    assert (pickle.loads(pickle.dumps(copy)) == copy)
+    assert (r1 != 'reaction01')
+
+def test_reaction_hash_cache():
+    reac = Reaction({'H2': 2.0, 'O2': 1.0}, {'H2O': 2.0}, True, 'threeBody', 'reaction01', 'Arrhenius',
+                    {'A': 1e7, 'E': 1e4}, efficiencies={'H2O': 6.0}, species_table=SpeciesTable())
+    same = Reaction({'O2': 1.0, 'H2': 2.0}, {'H2O': 2.0}, True, 'threeBody', 'reaction02', 'Arrhenius',
+                    {'A': 1e7, 'E': 1e4}, efficiencies={'H2O': 6.0}, species_table=reac.species_table)
+    assert (reac._hash is None)
+    assert (hash(reac) == hash(same) and reac == same)
+    # only an int is cached, the compared tuples are not kept
+    assert (isinstance(reac._hash, int))
+    # the cached hash is not pickled, string hashes differ between processes
+    assert (pickle.loads(pickle.dumps(reac))._hash is None)
+    same.products = {'H2O': 1.0}
+    assert (same._hash is None)
+    assert (reac != same and hash(reac) != hash(same))
+
+def test_reaction_species_indices():
+    data = read_data(os.path.join(test_data_dir, 'rxns_reversible.xml'), db_file)
+    reactions = data['reactions']['hydrogen_air_mechanism']
+    table = reactions[0].species_table
+    assert (table.names == data['species'])
+    assert (all(reac.species_table is table for reac in reactions))
+    system = ReactionSystem(reactions, data['species'], data['low'], data['high'], data['T_cutoff'], data['T_range'])
+    index = {name: i for i, name in enumerate(data['species'])}
+    expected = (SparseStoichiometry.from_dicts([reac.reactants for reac in reactions], index),
+                SparseStoichiometry.from_dicts([reac.products for reac in reactions], index))
+    for sparse, dense in zip(expected, [system.stoich_react, system.stoich_prod]):
+        assert (np.array_equal(sparse.toarray(), dense.toarray()))
+    with pytest.raises(ValueError):
+        ReactionSystem(reactions, data['species'][:-1])
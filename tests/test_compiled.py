@@ -0,0 +1,99 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.compiled import *
+import os
+import shutil
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+rev_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+concs = [2., 1., .5, 1., 1., .5, .5, .5]
+
+def build(filename):
+    data = read_data(filename, db_file)
+    return ReactionSystem(next(iter(data['reactions'].values())), data['species'], data['low'], data['high'],
+                          data['T_cutoff'], data['T_range'])
+
+def test_save_and_load(tmpdir):
+    system = build(rev_file)
+    path = str(tmpdir.join('mech.chem3'))
+    save_compiled(system, path, key='abc')
+    loaded = load_compiled(path)
+    assert (read_header(path)[0]['key'] == 'abc')
+    assert (isinstance(loaded.A, np.memmap))
+    assert (loaded.order == system.order)
+    assert (len(loaded) == len(system))
+    for T in [500., 900., 2500.]:
+        assert (np.allclose(loaded.reaction_rate(concs, T), system.reaction_rate(concs, T), rtol=1e-14))
+    assert (np.all(loaded.nu_react == system.nu_react))
+    assert ([r.reac_id for r in loaded.reactions] == [r.reac_id for r in system.reactions])
+    assert (loaded.reactions == system.reactions)
+
+def test_save_and_load_constant(tmpdir):
+    system = build(os.path.join(test_data_dir, 't.xml'))
+    path = str(tmpdir.join('t.chem3'))
+    save_compiled(system, path)
+    loaded = load_compiled(path)
+    assert (np.allclose(loaded.reaction_rate([2., 1., .5, 1., 1.], 1500), system.reaction_rate([2., 1., .5, 1., 1.], 1500)))
+    assert ([r.coef_type for r in loaded.reactions] == ['modifiedArrhenius', 'Constant', 'Arrhenius'])
+
+def test_save_and_load_pressure(tmpdir):
+    system = build(os.path.join(test_data_dir, 'rxns_pressure.xml'))
+    path = str(tmpdir.join('pressure.chem3'))
+    save_compiled(system, path)
+    loaded = load_compiled(path)
+    pressure_concs = [1e-3, 2e-3, 3e-3, .4, .5, .2, 1e-4, 2e-4, 3.]
+    assert (np.allclose(loaded.reaction_rate(pressure_concs, 1200.), system.reaction_rate(pressure_concs, 1200.),
+                        rtol=1e-14))
+    assert (loaded.reactions == system.reactions)
+    assert ([r.duplicate for r in loaded.reactions] == [r.duplicate for r in system.reactions])
+
+def test_save_and_load_pressure_round_trip(tmpdir):
+    # an efficiency equal to the default and an explicit b = 0 of k0
+    with open(os.path.join(test_data_dir, 'rxns_pressure.xml')) as f:
+        content = f.read()
+    low = '<A>2.49e+18</A>\n          {0}<E>2.0376e+05</E>\n        </{1}>'
+    content = content.replace('AR:0.67 H2:2.0', 'AR:1.0 H2:2.0').replace(
+        '<Arrhenius name="k0">\n          ' + low.format('', 'Arrhenius'),
+        '<modifiedArrhenius name="k0">\n          ' + low.format('<b>0.0</b>\n          ', 'modifiedArrhenius'))
+    xml_file = str(tmpdir.join('pressure.xml'))
+    with open(xml_file, 'w') as f:
+        f.write(content)
+    system = build(xml_file)
+    assert (system.reactions[1].efficiencies['AR'] == 1.0)
+    assert (system.reactions[2].low_coef == {'A': 2.49e18, 'b': 0.0, 'E': 2.0376e5})
+
+    path = str(tmpdir.join('pressure.chem3'))
+    save_compiled(system, path)
+    loaded = load_compiled(path)
+    for attr in ('reactants', 'products', 'coef', 'efficiencies', 'default_efficiency', 'low_coef',
+                 'falloff', 'reac_type', 'coef_type', 'reac_id', 'equation', 'duplicate', 'reversible'):
+        assert ([getattr(r, attr) for r in loaded.reactions] == [getattr(r, attr) for r in system.reactions])
+    assert (loaded.reactions == system.reactions)
+
+def test_load_system_cache(tmpdir):
+    xml_file = str(tmpdir.join('mech.xml'))
+    shutil.copy(rev_file, xml_file)
+    cache_dir = str(tmpdir.join('cache'))
+    first = load_system(xml_file, cache_dir)
+    assert (len(os.listdir(cache_dir)) == 1)
+    second = load_system(xml_file, cache_dir)
+    assert (isinstance(second.A, np.memmap))
+    assert (np.allclose(first.reaction_rate(concs, 900.), second.reaction_rate(concs, 900.)))
+
+    # a modified input gets a new key
+    with open(xml_file) as f:
+        content = f.read()
+    with open(xml_file, 'w') as f:
+        f.write(content.replace('3.547e+15', '3.0e+15'))
+    third = load_system(xml_file, cache_dir)
+    assert (len(os.listdir(cache_dir)) == 2)
+    assert (not np.allclose(third.reaction_rate(concs, 900.), first.reaction_rate(concs, 900.)))
+
+def test_not_compiled(tmpdir):
+    try:
+        load_compiled(rev_file)
+        assert False
+    except ValueError as err:
+        assert (type(err) == ValueError)
@@ -0,0 +1,78 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.ensemble import *
+import json
+import os
+import pytest
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+data = read_data(os.path.join(test_data_dir, 'rxns_reversible.xml'), db_file)
+system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                        data['T_cutoff'], data['T_range'])
+conditions = [{'T': T, 'P': 1e5, 'X': {'H2': 2., 'O2': 1.}} for T in (1100., 1300., 1500.)]
+
+def test_initial_state():
+    concs, T = initial_state(system, {'T': 1000., 'P': 1e5, 'X': {'H2': 2., 'O2': 2.}})
+    assert (T == 1000.)
+    assert (np.isclose(concs.sum(), 1e5 / (system.R * 1000.)))
+    assert (concs[system.order.index('H2')] == concs[system.order.index('O2')])
+    concs, _ = initial_state(system, {'T': 1000., 'concs': [1.] * 8})
+    assert (np.all(concs == 1.))
+    with pytest.raises(ValueError):
+        initial_state(system, {'T': 1000., 'X': {'N2': 1.}})
+    with pytest.raises(ValueError):
+        initial_state(system, {'T': -1., 'X': {'H2': 1.}})
+
+def test_serial_ensemble(tmpdir):
+    path = str(tmpdir.join('results.jsonl'))
+    summaries = run_ensemble(system, conditions, 1e-2, results_file=path)
+    assert ([s['case'] for s in summaries] == [0, 1, 2])
+    for s, condition in zip(summaries, conditions):
+        assert (s['status'] == 0)
+        assert (s['T_final'] > condition['T'] + 200.)
+    # hotter mixtures ignite earlier
+    delays = [s['ignition_delay'] for s in summaries]
+    assert (delays[0] > delays[1] > delays[2] > 0)
+    with open(path) as f:
+        assert ([json.loads(line) for line in f] == summaries)
+    # a second run appends to the results file
+    again = run_ensemble(system, conditions[:1], 1e-2, results_file=path)
+    with open(path) as f:
+        assert ([json.loads(line) for line in f] == summaries + again)
+
+def test_modes_agree():
+    serial = run_ensemble(system, conditions, 1e-2, rtol=1e-8, atol=1e-14)
+    processes = run_ensemble(system, conditions, 1e-2, mode='processes', workers=2, rtol=1e-8, atol=1e-14)
+    batch = run_ensemble(system, conditions, 1e-2, mode='batch', rtol=1e-8, atol=1e-14)
+    assert (serial == processes)
+    for a, b in zip(serial, batch):
+        assert (np.isclose(a['T_final'], b['T_final'], rtol=1e-4))
+        assert (np.isclose(a['ignition_delay'], b['ignition_delay'], rtol=5e-2))
+
+def test_isothermal_ensemble():
+    for mode in ('serial', 'batch'):
+        summaries = run_ensemble(system, conditions[:2], 1e-3, energy='isothermal', mode=mode)
+        assert ([s['T_final'] for s in summaries] == [1100., 1300.])
+        assert (all(s['ignition_delay'] is None for s in summaries))
+        assert (all(len(s['peak_rates']) == 8 for s in summaries))
+
+def test_failed_case():
+    # 100 K is below the NASA range, the integration of that case raises
+    failing = [conditions[0], {'T': 100., 'P': 1e5, 'X': {'H2': 2., 'O2': 1.}}, conditions[2]]
+    for mode in ('serial', 'processes'):
+        summaries = run_ensemble(system, failing, 1e-3, energy='isothermal', mode=mode, workers=2)
+        assert ([s['status'] for s in summaries] == [0, -1, 0])
+        assert (summaries[1]['message'] == 'ValueError: This Temperature is out of range!')
+        assert (summaries[1]['T_final'] is None and summaries[2]['T_final'] == 1500.)
+        assert (set(summaries[1]) == set(summaries[0]))
+    summaries = run_ensemble(system, failing, 1e-3, energy='isothermal', mode='batch')
+    assert ([s['status'] for s in summaries] == [-1, -1, -1])
+
+def test_ensemble_errors():
+    with pytest.raises(ValueError):
+        run_ensemble(system, conditions, 1e-3, mode='threads')
+    with pytest.raises(ValueError):
+        run_ensemble(system, [{'T': 1000., 'concs': [1.] * 3}], 1e-3)
@@ -0,0 +1,71 @@
+import chem3
+import os
+import subprocess
+import sys
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(chem3.__file__)))
+
+HEAVY = ['pkg_resources', 'importlib.metadata', 'sqlite3', 'xml.etree.ElementTree', 'scipy']
+
+def _run(code):
+    """runs code in a fresh interpreter and returns its stdout"""
+    env = dict(os.environ, PYTHONPATH=package_dir + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                          check=True).stdout
+
+def _import_times(code):
+    """runs code under -X importtime and returns the cumulative import time,
+    in microseconds, of each module it imports
+    """
+    env = dict(os.environ, PYTHONPATH=package_dir + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            env=env, check=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+def _loaded(modules):
+    return "print([m for m in {0!r} if m in sys.modules])".format(modules)
+
+def test_import_package_is_lazy():
+    stdout = _run("import sys, chem3; print(sorted(m for m in sys.modules if m.startswith('chem3.'))); "
+                  + _loaded(HEAVY))
+    assert (stdout.split('\n')[:2] == ['[]', '[]'])
+
+def test_import_chemkin_without_parser():
+    stdout = _run("import sys, chem3.chemkin; " + _loaded(['chem3.parser'] + HEAVY))
+    assert (stdout.strip() == '[]')
+
+def test_submodules_load_on_access():
+    stdout = _run("import sys, chem3; chem3.registry; "
+                  + _loaded(['chem3.registry', 'chem3.parser', 'chem3.chemkin', 'chem3.integrate']))
+    assert (stdout.strip() == "['chem3.registry', 'chem3.parser', 'chem3.chemkin']")
+
+def test_lazy_attributes():
+    stdout = _run("import chem3; print(chem3.parser.__name__, type(chem3.__version__).__name__, "
+                  "'registry' in dir(chem3))")
+    assert (stdout.split() == ['chem3.parser', 'str', 'True'])
+    try:
+        chem3.not_a_module
+        assert False
+    except AttributeError as err:
+        assert (type(err) == AttributeError)
+
+def test_import_budget():
+    # budgets are an order of magnitude above the measured cost, so that
+    # they only catch eager imports of the submodules or their dependencies
+    startup = _import_times('pass')
+    times = _import_times('import chem3')
+    new = set(times) - set(startup)
+    assert (len(new) <= 10)
+    assert (times['chem3'] < 50000)
+
+    times = _import_times('import chem3.chemkin')
+    new = [name for name in set(times) - set(startup) if not name.startswith('numpy')]
+    assert (sorted(name for name in new if name.startswith('chem3')) ==
+            ['chem3', 'chem3.chemkin', 'chem3.profiling', 'chem3.stoich', 'chem3.tables'])
+    assert (len(new) <= 100)
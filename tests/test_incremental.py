@@ -0,0 +1,78 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.incremental import *
+import os
+import pytest
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+data = read_data(os.path.join(test_data_dir, 'rxns_reversible.xml'), db_file)
+system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                        data['T_cutoff'], data['T_range'])
+
+def test_incremental_matches_full():
+    evaluator = IncrementalEvaluator(system, full_fraction=1.0)
+    rng = np.random.RandomState(0)
+    concs = rng.rand(8)
+    T = 1500.
+    for step in range(20):
+        if step % 7 == 6:
+            T += 100.
+        else:
+            concs = concs.copy()
+            concs[rng.randint(8)] = rng.rand()
+        # partial updates add the change of the progress rates to the reaction rates
+        rates = system.reaction_rate(concs, T)
+        progress = system.progress_rate(T)
+        scale = np.abs(system.stoich_net.toarray()).dot(np.abs(progress))
+        assert (np.allclose(evaluator.reaction_rate(concs, T), rates, rtol=0, atol=1e-13 * scale.max()))
+        assert (np.array_equal(evaluator.progress_rate(concs, T), progress))
+    assert (evaluator.partial_evaluations > 0)
+    assert (evaluator.reused_evaluations == 20)
+
+def test_incremental_pressure():
+    pressure = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_pressure.xml'))
+    evaluator = IncrementalEvaluator(pressure, full_fraction=1.0)
+    concs = np.array([1e-3, 2e-3, 3e-3, .4, .5, .2, 1e-4, 2e-4, 3.])
+    evaluator.reaction_rate(concs, 1200.)
+    for k in [8, 2, 6]:
+        concs = concs.copy()
+        concs[k] *= 2
+        assert (np.allclose(evaluator.reaction_rate(concs, 1200.), pressure.reaction_rate(concs, 1200.),
+                            rtol=1e-12))
+    assert (evaluator.partial_evaluations == 3)
+
+def test_pressure_factor_subset():
+    pressure = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_pressure.xml'))
+    concs = np.array([1e-3, 2e-3, 3e-3, .4, .5, .2, 1e-4, 2e-4, 3.])
+    reactions = np.array([3, 1, 6])
+    full = pressure._pressure_factor(concs, 1200., derivatives=True)
+    subset = pressure._pressure_factor(concs, 1200., derivatives=True, reactions=reactions)
+    for f, s in zip(full, subset):
+        assert (np.array_equal(f[reactions], s))
+
+def test_incremental_counts():
+    evaluator = IncrementalEvaluator(system)
+    concs = np.ones(8)
+    evaluator.reaction_rate(concs, 1000.)
+    assert (evaluator.full_evaluations == 1)
+    # H2O2 only appears in a few reactions
+    concs[7] = 2.
+    evaluator.reaction_rate(concs, 1000.)
+    assert (evaluator.partial_evaluations == 1)
+    evaluator.reaction_rate(concs, 1200.)
+    assert (evaluator.full_evaluations == 2)
+    evaluator.reset()
+    evaluator.reaction_rate(concs, 1200.)
+    assert (evaluator.full_evaluations == 3)
+
+def test_incremental_validation():
+    evaluator = IncrementalEvaluator(system)
+    with pytest.raises(ValueError):
+        evaluator.reaction_rate([1.] * 3, 1000.)
+    with pytest.raises(ValueError):
+        evaluator.reaction_rate([-1.] * 8, 1000.)
+    with pytest.raises(ValueError):
+        evaluator.reaction_rate([1.] * 8, 0.)
@@ -0,0 +1,85 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.integrate import *
+import os
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+data = read_data(os.path.join(test_data_dir, 'rxns_reversible.xml'), db_file)
+system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                        data['T_cutoff'], data['T_range'])
+# species: H O OH H2 H2O O2 HO2 H2O2
+H_atoms = np.array([1, 0, 1, 2, 2, 0, 1, 2])
+O_atoms = np.array([0, 1, 1, 0, 1, 2, 2, 2])
+concs0 = np.array([0., 0., 0., 20., 0., 10., 0., 0.])
+
+def test_isothermal():
+    reactor = Reactor(system, 'isothermal')
+    sol = reactor.integrate(concs0, 1200, 1e-3)
+    assert (sol.success)
+    assert (np.all(sol.T == 1200))
+    assert (np.allclose(sol.concs @ H_atoms, concs0 @ H_atoms, rtol=1e-6))
+    assert (np.allclose(sol.concs @ O_atoms, concs0 @ O_atoms, rtol=1e-6))
+    # close to equilibrium at the end of the integration
+    rates = system.reaction_rate(np.maximum(sol.concs[-1], 0), 1200)
+    assert (np.max(np.abs(rates)) < 1e-6 * np.max(np.abs(system.reaction_rate(concs0 + 1e-3, 1200))))
+
+def test_adiabatic_energy_conservation():
+    reactor = Reactor(system, 'adiabatic')
+    sol = reactor.integrate(concs0, 1200, 1e-3, rtol=1e-8, atol=1e-14)
+    assert (sol.success)
+    assert (sol.T[-1] > 1400)
+    def internal_energy(concs, T):
+        return np.sum(concs * T * (system.H_over_RT(T) - 1.0))
+    U0 = internal_energy(concs0, 1200.)
+    assert (np.isclose(internal_energy(sol.concs[-1], sol.T[-1]), U0, rtol=1e-5))
+
+def test_dense_output_and_events():
+    reactor = Reactor(system, 'adiabatic', method='Radau')
+    def ignition(t, concs, T):
+        return T - 1300.
+    ignition.terminal = True
+    sol = reactor.integrate(concs0, 1200, 1e-3, events=ignition)
+    assert (sol.status == 1)
+    assert (len(sol.t_events[0]) == 1)
+    assert (np.isclose(sol.T_events[0][0], 1300., rtol=1e-3))
+    concs, T = sol(sol.t_events[0][0])
+    assert (np.isclose(T, 1300., rtol=1e-3))
+    concs, T = sol(np.linspace(0, sol.t[-1], 5))
+    assert (concs.shape == (5, len(system.order)) and T.shape == (5,))
+
+def test_invalid_reactor():
+    for args in [('constant_pressure', 'BDF'), ('isothermal', 'RK45')]:
+        try:
+            Reactor(system, *args)
+            assert False
+        except ValueError as err:
+            assert (type(err) == ValueError)
+    try:
+        Reactor(system).integrate(-concs0, 1200, 1e-3)
+        assert False
+    except ValueError as err:
+        assert (type(err) == ValueError)
+
+def test_adiabatic_jacobian():
+    reactor = Reactor(system, 'adiabatic')
+    y = np.append(concs0 + .3, 1300.)
+    J = reactor.jac(0., y)
+    Jn = np.zeros_like(J)
+    for k in range(len(y)):
+        h = 1e-6 * max(abs(y[k]), 1.)
+        yp, ym = y.copy(), y.copy()
+        yp[k] += h
+        ym[k] -= h
+        Jn[:, k] = (reactor.rhs(0., yp) - reactor.rhs(0., ym)) / (2 * h)
+    assert (np.allclose(J, Jn, rtol=1e-5, atol=1e-8 * np.abs(J).max()))
+
+def test_jacobian_options_agree():
+    final = []
+    for jacobian in Reactor.JACOBIANS:
+        sol = Reactor(system, 'adiabatic', jacobian=jacobian).integrate(concs0, 1200, 1e-3, t_eval=[1e-3])
+        assert (sol.success)
+        final.append(sol.T[-1])
+    assert (np.allclose(final, final[0], rtol=1e-4))
@@ -0,0 +1,64 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.parallel import *
+import os
+import pickle
+import pytest
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+rev_file = os.path.join(test_data_dir, 'rxns_reversible.xml')
+
+def build(filename):
+    data = read_data(filename, db_file)
+    return ReactionSystem(next(iter(data['reactions'].values())), data['species'], data['low'], data['high'],
+                          data['T_cutoff'], data['T_range'])
+
+def batch(n, seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.rand(n, 8), rng.uniform(400., 3000., n)
+
+def test_parallel_matches_serial():
+    system = build(rev_file)
+    concs, T = batch(50)
+    with ParallelEvaluator(system, workers=2, chunk_size=7) as evaluator:
+        rates = evaluator.reaction_rate_batch(concs, T)
+        scalar_T = evaluator.reaction_rate_batch(concs, 1500.)
+    assert (np.array_equal(rates, system.reaction_rate_batch(concs, T)))
+    assert (np.array_equal(scalar_T, system.reaction_rate_batch(concs, 1500.)))
+
+def test_parallel_out():
+    system = build(rev_file)
+    concs, T = batch(20)
+    out = np.empty((20, 8))
+    with ParallelEvaluator(system, workers=2, chunk_size=5) as evaluator:
+        assert (evaluator.reaction_rate_batch(concs, T, out=out) is out)
+        with pytest.raises(ValueError):
+            evaluator.reaction_rate_batch(concs, T, out=np.empty((5, 8)))
+    assert (np.array_equal(out, system.reaction_rate_batch(concs, T)))
+
+def test_parallel_serial_fallback():
+    system = build(rev_file)
+    concs, T = batch(20)
+    evaluator = ParallelEvaluator(system, workers=1, chunk_size=3)
+    assert (np.array_equal(evaluator.reaction_rate_batch(concs, T), system.reaction_rate_batch(concs, T)))
+    assert (evaluator._pool is None)
+    evaluator = ParallelEvaluator(system, workers=4)
+    evaluator.reaction_rate_batch(concs, T)
+    assert (evaluator._pool is None)
+
+def test_parallel_errors():
+    system = build(rev_file)
+    with pytest.raises(ValueError):
+        ParallelEvaluator(system, chunk_size=0)
+    with pytest.raises(ValueError):
+        ParallelEvaluator(system, workers=1).reaction_rate_batch(np.ones((3, 5)), 1500.)
+
+def test_system_pickle():
+    system = build(rev_file)
+    system.reaction_rate([1.] * 8, 1500.)
+    copy = pickle.loads(pickle.dumps(system))
+    assert (len(copy.thermo_cache) == 0)
+    assert (copy.cache_info().maxsize == system.cache_info().maxsize)
+    assert (np.array_equal(copy.reaction_rate([1.] * 8, 1500.), system.reaction_rate([1.] * 8, 1500.)))
@@ -0,0 +1,91 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.reduction import *
+import os
+import pytest
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+data = read_data(os.path.join(test_data_dir, 'rxns_reversible.xml'), db_file)
+system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                        data['T_cutoff'], data['T_range'])
+# species: H O OH H2 H2O O2 HO2 H2O2
+concs0 = np.array([0., 0., 0., 20., 0., 10., 0., 0.])
+concs, T = sample_states(system, [(concs0, 1200.), (concs0, 1500.)], 1e-3)
+targets = ['H2', 'O2', 'H2O']
+
+def test_sample_states():
+    assert (concs.shape == (40, 8))
+    assert (T.shape == (40,))
+    assert (np.all(concs >= 0))
+
+def test_interaction_coefficients():
+    for method in METHODS:
+        r = interaction_coefficients(system, concs, T, method)
+        assert (r.shape == (8, 8))
+        assert (np.all((r >= 0) & (r <= 1 + 1e-12)))
+    with pytest.raises(ValueError):
+        interaction_coefficients(system, concs, T, 'PFA')
+
+def dense_interaction_coefficients(system, concs, T, method):
+    progress = system._progress(concs, T)
+    nu = system.stoich_net.toarray()
+    delta = (system.stoich_react.toarray() + system.stoich_prod.toarray() > 0).astype(float)
+    r = np.zeros((len(system.order),) * 2)
+    for q in progress:
+        rates = nu * q
+        if method == 'DRG':
+            num, den = np.abs(rates).dot(delta.T), np.abs(rates).sum(axis=1)
+        else:
+            num = np.abs(rates.dot(delta.T))
+            den = np.maximum(np.clip(rates, 0.0, None).sum(axis=1), -np.clip(rates, None, 0.0).sum(axis=1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.maximum(r, np.where(den[:, np.newaxis] > 0, num / den[:, np.newaxis], 0.0))
+    np.fill_diagonal(r, 1.0)
+    return r
+
+def test_interaction_coefficients_dense():
+    pressure = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_pressure.xml'))
+    rng = np.random.RandomState(0)
+    # H2 is a reactant and a product of the first reaction of t.xml
+    small = ReactionSystem(filename=os.path.join(test_data_dir, 't.xml'))
+    for sys, c, temps in [(system, concs, T), (pressure, rng.rand(10, 9), np.linspace(800., 2000., 10)),
+                          (small, rng.rand(5, 5), np.full(5, 1500.))]:
+        for method in METHODS:
+            assert (np.allclose(interaction_coefficients(sys, c, temps, method),
+                                dense_interaction_coefficients(sys, c, temps, method), rtol=1e-12, atol=0))
+
+def test_reduce_mechanism():
+    for method in METHODS:
+        full = reduce_mechanism(system, concs, T, targets, threshold=0.0, method=method)
+        assert (len(full.system) == len(system))
+        assert (full.error_report(concs, T)['max_error'] == 0.0)
+
+        reduced = reduce_mechanism(system, concs, T, targets, threshold=0.1, method=method)
+        assert ('H2O2' not in reduced.system.order)
+        assert (all(name in reduced.system.order for name in targets))
+        assert (len(reduced.system) < len(system))
+        report = reduced.error_report(concs, T)
+        assert (report['n_reactions'] == len(reduced.system))
+        assert (report['n_reactions_full'] == len(system))
+        assert (report['max_error'] < 1e-2)
+    with pytest.raises(ValueError):
+        reduce_mechanism(system, concs, T, ['N2'])
+
+def test_reduce_mechanism_reactions():
+    reduced = reduce_mechanism(system, concs, T, targets, threshold=0.1)
+    involved = (system.stoich_react.toarray() + system.stoich_prod.toarray()) > 0
+    keep = np.isin(np.arange(len(system.order)), reduced.species)
+    # the kept reactions only involve kept species
+    assert (np.array_equal(reduced.reactions, np.flatnonzero(np.all(keep[:, np.newaxis] | ~involved, axis=0))))
+
+def test_reduced_xml(tmpdir):
+    reduced = reduce_mechanism(system, concs, T, targets, threshold=0.1)
+    path = str(tmpdir.join('reduced.xml'))
+    reduced.write_xml(path)
+    reread = ReactionSystem(filename=path)
+    assert (reread.order == reduced.system.order)
+    assert (np.allclose(reread.reaction_rate(concs[5, reduced.species], T[5]),
+                        reduced.system.reaction_rate(concs[5, reduced.species], T[5]), rtol=1e-12))
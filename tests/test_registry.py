@@ -0,0 +1,43 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.registry import *
+import os
+import pytest
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+multi_file = os.path.join(test_data_dir, 'rxns_multi.xml')
+concs = [2., 1., .5, 1., 1., .5, .5, .5]
+
+def test_registry_from_file():
+    registry = MechanismRegistry.from_file(multi_file, db_file)
+    assert (registry.names() == ['hydrogen_air_mechanism', 'chain_branching'])
+    assert (len(registry) == 2 and 'chain_branching' in registry)
+    full, branching = registry['hydrogen_air_mechanism'], registry['chain_branching']
+    assert (len(full) == 11 and len(branching) == 3)
+    # one copy of the species tables
+    for name in ('nasa7_coeffs', 'tmid', 'trange', 'order', 'species_thermo'):
+        assert (getattr(full, name) is getattr(branching, name))
+    # same results as systems built on their own
+    single = ReactionSystem(filename=os.path.join(test_data_dir, 'rxns_reversible.xml'))
+    assert (np.allclose(full.reaction_rate(concs, 1500.), single.reaction_rate(concs, 1500.), rtol=1e-14))
+    assert (not np.any(branching.reversible))
+    with pytest.raises(KeyError):
+        registry['unknown']
+
+def test_registry_add():
+    data = read_data(multi_file, db_file)
+    registry = MechanismRegistry(SpeciesThermo.from_data(data), mode='log', cache_size=0)
+    system = registry.add('subset', data['reactions']['chain_branching'][:2])
+    assert (system.mode == 'log' and system.cache_info() is None)
+    assert (list(registry) == ['subset'])
+    with pytest.raises(ValueError):
+        registry.add('subset', [])
+
+def test_system_mechanism_argument():
+    branching = ReactionSystem(filename=multi_file, mechanism='chain_branching')
+    assert (len(branching) == 3)
+    assert (len(ReactionSystem(filename=multi_file)) == 11)
+    with pytest.raises(ValueError):
+        ReactionSystem(filename=multi_file, mechanism='unknown')
@@ -0,0 +1,79 @@
+import chem3
+from chem3.chemkin import *
+from chem3.parser import *
+from chem3.service import *
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+test_data_dir = os.path.join(os.path.dirname(chem3.__file__), '../tests/test_data')
+db_file = os.path.join(os.path.dirname(chem3.__file__), 'nasa.sqlite')
+
+data = read_data(os.path.join(test_data_dir, 'rxns_reversible.xml'), db_file)
+system = ReactionSystem(data['reactions']['hydrogen_air_mechanism'], data['species'], data['low'], data['high'],
+                        data['T_cutoff'], data['T_range'])
+rng = np.random.RandomState(0)
+states = [(rng.rand(8), T) for T in rng.uniform(500., 2500., 50)]
+
+def test_batched_results():
+    async def main():
+        async with RateService(system, window=0.01, max_batch=16) as service:
+            rates = await asyncio.gather(*[service.reaction_rate(c, T) for c, T in states])
+        return rates, service.metrics()
+    rates, metrics = asyncio.run(main())
+    for (c, T), r in zip(states, rates):
+        assert (np.allclose(r, system.reaction_rate(c, T), rtol=1e-12))
+    assert (metrics['requests'] == 50)
+    assert (metrics['batches'] == 4)
+    assert (metrics['mean_batch_size'] == 12.5)
+    assert (metrics['latency_max'] >= metrics['latency_p95'] >= metrics['latency_p50'] >= 0)
+    assert (metrics['throughput'] > 0)
+
+def test_backpressure_and_executor():
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            service = RateService(system, window=0., max_batch=4, max_queue=2, executor=executor)
+            rates = await asyncio.gather(*[service.reaction_rate(c, T) for c, T in states[:10]])
+            assert (service.metrics()['queued'] <= 2)
+            await service.close()
+        return rates, service.metrics()
+    rates, metrics = asyncio.run(main())
+    assert (len(rates) == 10)
+    assert (metrics['requests'] == 10)
+    assert (metrics['batches'] >= 3)
+
+def test_failed_requests():
+    async def main():
+        async with RateService(system, window=0.01) as service:
+            return await asyncio.gather(service.reaction_rate(states[0][0], 1500.),
+                                        service.reaction_rate(states[1][0], 10000.),
+                                        return_exceptions=True), service.metrics()
+    (good, bad), metrics = asyncio.run(main())
+    assert (np.allclose(good, system.reaction_rate(states[0][0], 1500.)))
+    assert (isinstance(bad, ValueError))
+    assert (metrics['failures'] == 1)
+
+def test_service_errors():
+    with pytest.raises(ValueError):
+        RateService(system, max_batch=0)
+    async def main():
+        async with RateService(system) as service:
+            await service.reaction_rate([1.] * 3, 1000.)
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+def test_batch_failure_does_not_stop_service():
+    async def main():
+        executor = ThreadPoolExecutor(1)
+        executor.shutdown()
+        service = RateService(system, window=0., executor=executor)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(service.reaction_rate(*states[0]), 5.)
+        service.executor = None
+        rates = await asyncio.wait_for(service.reaction_rate(*states[1]), 5.)
+        await service.close()
+        return rates, service.metrics()
+    rates, metrics = asyncio.run(main())
+    assert (np.allclose(rates, system.reaction_rate(*states[1])))
+    assert (metrics['failures'] == 1 and metrics['requests'] == 2)
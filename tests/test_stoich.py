@@ -0,0 +1,47 @@
+from chem3.stoich import *
+
+dicts = [{'H2': 2.0, 'O2': 1.0}, {}, {'OH': 1.0, 'H2': 1.0}, {'H2O': 0.5}]
+index = {'H2': 0, 'O2': 1, 'OH': 2, 'H2O': 3}
+nu = SparseStoichiometry.from_dicts(dicts, index)
+dense = np.array([[2., 0., 1., 0.], [1., 0., 0., 0.], [0., 0., 1., 0.], [0., 0., 0., .5]])
+
+def test_from_dicts():
+    assert (nu.shape == (4, 4))
+    assert (len(nu) == 5)
+    assert (np.all(nu.toarray() == dense))
+
+def test_from_dicts_unknown_species():
+    try:
+        SparseStoichiometry.from_dicts([{'N2': 1.0}], index)
+        assert False
+    except ValueError as err:
+        assert (type(err) == ValueError)
+
+def test_product_reduce_scatter():
+    concs = np.array([[2., 3., 0., 4.], [1., .5, 2., 9.]])
+    assert (np.allclose(nu.product(concs), np.prod(concs[:, :, np.newaxis] ** dense, axis=1)))
+    assert (np.allclose(nu.reduce(concs), concs @ dense))
+    q = np.array([[1., 2., 3., 4.], [-1., 0., .5, 2.]])
+    assert (np.allclose(nu.scatter(q), q @ dense.T))
+    assert (np.allclose(nu.scatter(q[0]), dense @ q[0]))
+
+def test_sub_and_select():
+    other = SparseStoichiometry.from_dicts([{'OH': 2.0, 'H2': 1.0}, {}, {'H2O': 1.0}, {}], index)
+    assert (np.all((other - nu).toarray() == other.toarray() - dense))
+    assert (np.all(nu.select([3, 0]).toarray() == dense[:, [3, 0]]))
+
+def test_matmul_triplets():
+    M = np.array([[1., 0.], [0., 2.], [3., 4.], [0., 5.]])
+    rows, cols = np.nonzero(M)
+    i, k, vals = nu.matmul_triplets(rows, cols, M[rows, cols])
+    result = np.zeros((4, 2))
+    np.add.at(result, (i, k), vals)
+    assert (np.allclose(result, dense @ M))
+
+def test_product_subset_and_species_reactions():
+    nu = SparseStoichiometry.from_dicts([{'H2': 2.0, 'O2': 1.0}, {'OH': 1.0}, {'O2': 0.0, 'OH': 2.0}],
+                                        {'H2': 0, 'O2': 1, 'OH': 2})
+    concs = np.array([2., 3., 4.])
+    assert (np.array_equal(nu.product(concs, [2, 0]), nu.product(concs)[[2, 0]]))
+    assert (nu.species_reactions([1]).tolist() == [0])
+    assert (nu.species_reactions([2, 0]).tolist() == [0, 1, 2])